@@ -0,0 +1,351 @@
+"""
+Offline benchmarks of the hot paths of covid_modeling.py.
+
+Usage (from the root directory of the repository):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --only solve_path growth --repeat 3
+    python -m benchmarks.run --compare bench.json
+
+All inputs are generated by covid_model.synthetic, network access and Google Drive are not required.
+Runtime is the minimum of the repeats [sec], memory is the peak size of Python allocations traced
+with tracemalloc (NumPy arrays included) in a separate run [MiB].
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Registered benchmarks: list of (group, name, setup), setup() returns a callable to measure
+BENCHMARKS = []
+
+
+def benchmark(group, name=None, **params):
+    """
+    Register a benchmark.
+
+    Args:
+        group (str): group name, used with --only
+        name (str or None): name of the benchmark or None (function name)
+        params: keyword arguments of the setup function, added to the name like "[grid_size=1000]"
+    """
+    def _register(setup):
+        label = name or setup.__name__
+        if params:
+            label += "[" + ",".join(f"{k}={v}" for (k, v) in params.items()) + "]"
+        BENCHMARKS.append((group, label, lambda: setup(**params)))
+        return setup
+    return _register
+
+
+def _grid(grid_size=1000, t_length=550):
+    return np.linspace(0, t_length, grid_size)
+
+
+# SEIR model (the first model)
+for _grid_size in (250, 1000, 4000):
+    for _method in ("odeint", "rk4", "rk45"):
+        @benchmark("solve_path", name="solve_path", grid_size=_grid_size, method=_method)
+        def _solve_path(grid_size, method):
+            from covid_model.seir import solve_path, R0_mitigating
+            t_vec = _grid(grid_size)
+            return lambda: solve_path(R0_mitigating, t_vec, method=method)
+
+
+@benchmark("sweep")
+def r0_sweep():
+    from covid_model.seir import solve_paths
+    t_vec = _grid()
+    return lambda: solve_paths(np.linspace(1.6, 3.0, 6), t_vec)
+
+
+@benchmark("sweep")
+def eta_sweep():
+    from covid_model.seir import solve_paths
+    t_vec = _grid()
+    return lambda: solve_paths(3, t_vec, η=(1 / 5, 1 / 10, 1 / 20, 1 / 50, 1 / 100))
+
+
+@benchmark("sweep", name="r0_sweep_large", n=1000)
+def _r0_sweep_large(n):
+    from covid_model.seir import solve_paths
+    t_vec = _grid()
+    return lambda: solve_paths(np.linspace(1.1, 4.0, n), t_vec)
+
+
+@benchmark("sweep", name="r0_sweep_summary", n=1000)
+def _r0_sweep_summary(n):
+    from covid_model.seir import solve_paths
+    t_vec = _grid()
+    return lambda: solve_paths(np.linspace(1.1, 4.0, n), t_vec, summary=True, thresholds=(0.1, 0.5))
+
+
+@benchmark("lockdown")
+def lockdown():
+    from covid_model.schedules import Step
+    from covid_model.seir import pop_size, solve_path
+    t_vec = _grid()
+    x_0 = (1 - 100_000 / pop_size, 75_000 / pop_size, 25_000 / pop_size)
+    R0_paths = (Step(breakpoints=(30,), values=(0.5, 2)), Step(breakpoints=(120,), values=(0.5, 2)))
+    return lambda: [solve_path(R0, t_vec, x_init=x_0) for R0 in R0_paths]
+
+
+for _rtol in (1e-4, 1e-6):
+    @benchmark("lockdown", name="lockdown_adaptive", rtol=_rtol)
+    def _lockdown_adaptive(rtol):
+        from covid_model.schedules import Step
+        from covid_model.seir import pop_size, solve_adaptive
+        x_0 = (1 - 100_000 / pop_size, 75_000 / pop_size, 25_000 / pop_size)
+        R0_paths = (Step(breakpoints=(30,), values=(0.5, 2)), Step(breakpoints=(120,), values=(0.5, 2)))
+        return lambda: [solve_adaptive(R0, (0, 550), x_init=x_0, rtol=rtol) for R0 in R0_paths]
+
+
+# Metapopulation SEIR model
+for _n_regions in (1000, 10000):
+    for _processes in (1, 4):
+        @benchmark("metapop", name="solve_meta_paths", n_regions=_n_regions, processes=_processes)
+        def _solve_meta_paths(n_regions, processes):
+            from covid_model.metapop import coupling_matrix, solve_meta_paths
+            from covid_model.seir import R0_mitigating
+            from covid_model.synthetic import synthetic_mobility
+            population, trips = synthetic_mobility(n_regions=n_regions)
+            coupling = coupling_matrix(trips, population)
+            t_vec = _grid()
+            return lambda: solve_meta_paths(R0_mitigating, t_vec, coupling, population, processes=processes)
+
+
+# Population pyramid
+for _n_countries in (1, 50):
+    @benchmark("go_out", name="go_out", n_countries=_n_countries)
+    def _go_out(n_countries):
+        from covid_model.mobility import go_out
+        from covid_model.synthetic import SyntheticPyramid
+        countries = [f"C{i:03d}" for i in range(n_countries)]
+        pyramid_data = SyntheticPyramid(countries)
+        return lambda: [go_out(country, pyramid_data) for country in countries]
+
+    @benchmark("go_out", name="go_out_table", n_countries=_n_countries)
+    def _go_out_table(n_countries):
+        from covid_model.mobility import go_out
+        from covid_model.pyramid import PyramidTable
+        from covid_model.synthetic import SyntheticPyramid
+        countries = [f"C{i:03d}" for i in range(n_countries)]
+        pyramid_table = PyramidTable.from_pyramid(SyntheticPyramid(countries), countries)
+        return lambda: [go_out(country, pyramid_table) for country in countries]
+
+
+@benchmark("go_out", name="gs_policies", n_countries=200, n_policies=100)
+def _gs_policies(n_countries, n_policies):
+    from covid_model.mobility import out_days
+    from covid_model.pyramid import PyramidTable
+    from covid_model.synthetic import SyntheticPyramid
+    countries = [f"C{i:03d}" for i in range(n_countries)]
+    pyramid_table = PyramidTable.from_pyramid(SyntheticPyramid(countries), countries)
+    days = out_days()[["School", "Office", "Others"]].to_numpy(dtype=np.float64)
+    policies = days * np.random.default_rng(0).uniform(0, 1, (n_policies, 1, days.shape[1]))
+    return lambda: pyramid_table.gs(days=policies)
+
+
+@benchmark("go_out", name="policies", n_countries=200, n_policies=2000)
+def _policies(n_countries, n_policies):
+    from covid_model.policies import PolicySet, evaluate_policies
+    from covid_model.pyramid import PyramidTable
+    from covid_model.synthetic import SyntheticPyramid
+    countries = [f"C{i:03d}" for i in range(n_countries)]
+    pyramid_table = PyramidTable.from_pyramid(SyntheticPyramid(countries), countries)
+    scales = np.random.default_rng(0).uniform(0, 1, (n_policies, 3))
+    policies = PolicySet({
+        f"P{k}": {"School": f"*{school:.3f}", "Office": f"*{office:.3f}", "h_bar": f"*{h_bar:.3f}"}
+        for (k, (school, office, h_bar)) in enumerate(scales)})
+    return lambda: evaluate_policies(policies, pyramid_table, countries, 0.2, 0.075)
+
+
+# Growth factor
+for _n_countries in (50, 200):
+    @benchmark("growth", name="growth_factor", n_countries=_n_countries)
+    def _growth_factor(n_countries):
+        from covid_model.growth import growth_factor, classify_groups
+        from covid_model.synthetic import synthetic_records
+        covid_df = synthetic_records(n_countries=n_countries, n_days=400, n_provinces=2)
+        return lambda: classify_groups(growth_factor(covid_df, window=7), days=7)
+
+
+# Parameter estimation with CovsirPhy
+@benchmark("estimate", name="estimate", timeout=60)
+def _estimate(timeout):
+    import covsirphy as cs
+    model = cs.SIRF
+    area = {"country": "Full", "province": model.NAME}
+    example_data = cs.ExampleData(tau=1440, start_date="01Jan2020")
+    example_data.add(model, **area)
+    population_data = cs.PopulationData(filename=None)
+    population_data.update(model.EXAMPLE["population"], **area)
+
+    def _run():
+        snl = cs.Scenario(example_data, population_data, tau=1440, **area)
+        snl.clear(include_past=True)
+        snl.add()
+        snl.estimate(model, timeout=timeout, n_jobs=1)
+        return snl
+
+    return _run
+
+
+# What-if branches of a scenario
+def _branch_inputs(n_branches):
+    import covsirphy as cs
+    model = cs.SIRF
+    area = {"country": "Theoretical"}
+    example_data = cs.ExampleData(tau=1440, start_date="01Jan2020")
+    example_data.add(model, step_n=30, **area)
+    population_data = cs.PopulationData(filename=None)
+    population_data.update(model.EXAMPLE["population"], **area)
+    snl = cs.Scenario(example_data, population_data, tau=1440, **area)
+    snl.clear(include_past=True)
+    snl.add(end_date="31Jan2020", model=model, **model.EXAMPLE["param_dict"])
+    rho_values = model.EXAMPLE["param_dict"]["rho"] * np.linspace(0.2, 1.2, n_branches)
+    branches = {f"B{k}": {"end_date": "31Dec2020", "rho": rho} for (k, rho) in enumerate(rho_values)}
+    return snl, branches
+
+
+@benchmark("branches", name="simulate_branches", n_branches=500)
+def _simulate_branches(n_branches):
+    from covid_model.branching import simulate_branches
+    snl, branches = _branch_inputs(n_branches)
+    return lambda: simulate_branches(snl, branches)
+
+
+@benchmark("branches", name="summarize_branches", n_branches=500)
+def _summarize_branches(n_branches):
+    from covid_model.branching import summarize_branches
+    snl, branches = _branch_inputs(n_branches)
+    return lambda: summarize_branches(snl, branches, thresholds=(1_000_000,))
+
+
+def measure(func, repeat=5):
+    """
+    Measure runtime and peak memory of a function.
+
+    Args:
+        func (callable): function without arguments
+        repeat (int): the number of runs to measure runtime
+
+    Returns:
+        dict[str, object]: min/median runtime [sec], all runtime values [sec] and peak memory [MiB]
+    """
+    # Warm-up, including JIT compilation and imports
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"min": min(times), "median": float(np.median(times)), "times": times, "peak_mib": peak / 2 ** 20}
+
+
+def environment():
+    """
+    Return the information of the environment.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "datetime": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def run(only=None, repeat=5):
+    """
+    Run the benchmarks.
+
+    Args:
+        only (list[str] or None): group names or benchmark names to run, or None (all)
+        repeat (int): the number of runs to measure runtime
+
+    Returns:
+        dict[str, object]: {"environment": environment(), "results": {name: measure() or {"skipped": reason}}}
+    """
+    results = {}
+    for (group, name, setup) in BENCHMARKS:
+        if only and group not in only and name not in only:
+            continue
+        try:
+            func = setup()
+        except ImportError as e:
+            results[name] = {"group": group, "skipped": f"{type(e).__name__}: {e}"}
+        else:
+            results[name] = {"group": group, **measure(func, repeat=repeat)}
+        result = results[name]
+        if "skipped" in result:
+            print(f"{name:<45} skipped ({result['skipped']})", file=sys.stderr)
+        else:
+            print(f"{name:<45} {result['min']:>10.4f} sec {result['peak_mib']:>10.2f} MiB", file=sys.stderr)
+    return {"environment": environment(), "results": results}
+
+
+def compare(report, baseline):
+    """
+    Return the ratios of runtime and memory to a baseline.
+
+    Args:
+        report (dict[str, object]): output of run()
+        baseline (dict[str, object]): output of run(), like the JSON file of the previous commit
+
+    Returns:
+        pandas.DataFrame: index benchmark names, columns min/peak_mib of both and the ratios (report / baseline)
+    """
+    def _frame(results):
+        return pd.DataFrame(
+            {name: result for (name, result) in results.items() if "skipped" not in result}
+        ).T.loc[:, ["min", "peak_mib"]].astype(np.float64)
+
+    df = _frame(report["results"]).join(_frame(baseline["results"]), how="inner", rsuffix="_baseline")
+    df["min_ratio"] = df["min"] / df["min_baseline"]
+    df["peak_ratio"] = df["peak_mib"] / df["peak_mib_baseline"]
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks of covid_model.")
+    parser.add_argument("--output", "-o", help="JSON file to save the results")
+    parser.add_argument("--only", nargs="+", help="group names or benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=5, help="the number of runs to measure runtime")
+    parser.add_argument("--compare", help="JSON file of a previous run to compare with")
+    parser.add_argument("--list", action="store_true", help="show the names of benchmarks and exit")
+    args = parser.parse_args(argv)
+    if args.list:
+        for (group, name, _) in BENCHMARKS:
+            print(f"{group:<12} {name}")
+        return
+    report = run(only=args.only, repeat=args.repeat)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as fh:
+            baseline = json.load(fh)
+        print(compare(report, baseline).to_string(float_format="{:.4g}".format))
+
+
+if __name__ == "__main__":
+    main()
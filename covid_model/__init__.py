@@ -0,0 +1,68 @@
+"""
+Modeling code of Covid Modeling.ipynb, importable outside of the notebook.
+
+Modules:
+    seir: SEIR model of the first section and its solvers
+    schedules: R(t) schedules
+    events: peak, threshold crossings and final size of the SEIR model without the paths
+    integrators: fixed-step Runge-Kutta integrators
+    age_seir: age-structured SEIR model with contacts weighted by go_out()
+    metapop: metapopulation SEIR model of regions coupled by sparse trips
+    ensemble: Monte Carlo ensembles with streaming quantiles
+    fitting: fitting of the SEIR model to the records
+    data: loading of the records with compact data types
+    records: indexed view of the records
+    growth: growth factor and grouping of countries
+    mobility: the number of days people go out (go_out)
+    pyramid: population of the age groups of all countries as an array table
+    policies: intervention policies as declarative rules of the days to go out
+    plotting: line plots of the paths
+    runner, cache, incremental: scenario analysis of many countries with CovsirPhy
+    trend: S-R trend analysis of many countries, cached by records
+    service: asyncio service of the latest projections of the countries
+    store: columnar store of the results of the runs
+    branching: what-if branches of a scenario, solved from the shared state at the branch point
+    synthetic: synthetic datasets for benchmarks
+    profiling: instrumentation of the stages with per-country traces
+
+Note:
+    The names below are imported from their modules at the first access,
+    so that "import covid_model" does not import scipy, pandas, matplotlib or covsirphy.
+"""
+
+import importlib
+
+_lazy_dict = {
+    "covid_model.seir": [
+        "pop_size", "γ", "σ", "F", "x_0", "R0_mitigating", "F_vec", "integrate", "solve_path", "F_batch", "solve_paths",
+        "AdaptivePath", "solve_adaptive"],
+    "covid_model.events": ["summarize"],
+    "covid_model.schedules": ["RSchedule", "Constant", "Mitigating", "Step", "Tabulated"],
+    "covid_model.age_seir": ["contact_matrix", "F_age", "solve_age_paths"],
+    "covid_model.metapop": ["coupling_matrix", "F_meta", "solve_meta_paths"],
+    "covid_model.ensemble": ["sample", "StreamingQuantiles", "run_ensemble"],
+    "covid_model.fitting": ["fit_seir"],
+    "covid_model.mobility": ["out_days", "go_out"],
+    "covid_model.pyramid": ["PyramidTable", "load_pyramid"],
+    "covid_model.policies": ["PolicySet", "evaluate_policies"],
+    "covid_model.branching": ["simulate_branches", "summarize_branches", "policy_branches"],
+    "covid_model.trend": ["PhaseCache", "detect_phases", "apply_phases"],
+    "covid_model.store": ["ResultStore"],
+    "covid_model.profiling": ["Tracer", "tracing"],
+    "covid_model.plotting": ["plot_paths", "PathRenderer", "render_many"],
+}
+_module_dict = {name: module for (module, names) in _lazy_dict.items() for name in names}
+
+__all__ = list(_module_dict)
+
+
+def __getattr__(name):
+    if name not in _module_dict:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_module_dict[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
@@ -0,0 +1,127 @@
+"""
+Age-structured SEIR model with contacts weighted by the number of days people go out.
+
+The 13 age groups of out_days() mix in school, office and the other places, in proportion to the days
+they go out there. The force of infection of all groups is one matrix-vector product per evaluation,
+and countries are integrated together as a batch of contact matrices.
+"""
+
+import numpy as np
+
+from covid_model.integrators import rk4, schedule_grid
+from covid_model.seir import γ, σ, i_0, e_0
+
+SETTINGS = ("School", "Office", "Others")
+
+
+def _raw_contacts(out_df, settings):
+    """
+    Return contacts between age groups, before normalization.
+    """
+    days = out_df.loc[:, list(settings)].to_numpy(dtype=np.float64)
+    portion = out_df["Portion"].to_numpy(dtype=np.float64)
+    # Proportionate mixing in each place, weighted by the days of both groups
+    weights = days * portion[:, np.newaxis]
+    total = weights.sum(axis=0)
+    return np.einsum("ak,bk,k->ab", days, weights, np.divide(1, total, out=np.zeros_like(total), where=total > 0))
+
+
+def _spectral_radius(contacts, portion):
+    """
+    Return the spectral radius of a contact matrix C, where diag(√p) C diag(1/√p) is symmetric.
+    """
+    root = np.sqrt(portion)
+    symmetric = root[:, np.newaxis] * contacts / np.where(root > 0, root, 1)[np.newaxis, :]
+    return np.abs(np.linalg.eigvalsh((symmetric + symmetric.T) / 2)).max()
+
+
+def contact_matrix(out_df, baseline_df=None, settings=SETTINGS):
+    """
+    Return the contact matrix of age groups.
+
+    Args:
+        out_df (pandas.DataFrame): output of go_out(), with School, Office, Others and Portion columns
+        baseline_df (pandas.DataFrame or None): go_out() before interventions, or None (@out_df)
+        settings (tuple(str)): columns of the days to go out
+
+    Returns:
+        numpy.ndarray: contacts with shape (n_groups, n_groups),
+            element [a, b] is the relative rate of contacts of a person of group a with group b
+
+    Note:
+        The matrix is divided by the spectral radius of the matrix of @baseline_df, so that R0 has
+        the same meaning as the first model without interventions. With uniform days to go out,
+        the model is the same as F().
+    """
+    baseline_df = out_df if baseline_df is None else baseline_df
+    baseline = _raw_contacts(baseline_df, settings)
+    radius = _spectral_radius(baseline, baseline_df["Portion"].to_numpy(dtype=np.float64))
+    return _raw_contacts(out_df, settings) / radius
+
+
+def F_age(x, R0, contacts, γ=γ, σ=σ):
+    """
+    Time derivative of the states of age groups.
+
+        * x is the state array with shape (3, n_countries, n_groups), fractions of each group
+        * R0 is the value(s) of the transmission rate at that time, scalar or shape (n_countries,)
+        * contacts is the contact matrices with shape (n_countries, n_groups, n_groups)
+
+    """
+    s, e, i = x
+    β = np.reshape(R0, (-1, 1)) * γ
+    new_exposed = β * s * np.matmul(contacts, i[..., np.newaxis])[..., 0]
+    return np.array((- new_exposed, new_exposed - σ * e, σ * e - γ * i))
+
+
+def solve_age_paths(R0, t_vec, contacts, portion, x_init=None, method="rk4"):
+    """
+    Solve for i(t) and c(t) of age groups of one or many countries.
+
+    Args:
+        R0 (float or array_like or callable): R0 of each country, or a function of time (like R0_mitigating)
+        t_vec (numpy.ndarray): time grid
+        contacts (numpy.ndarray): contact matrix with shape (n_groups, n_groups) or
+            matrices of countries with shape (n_countries, n_groups, n_groups), like contact_matrix()
+        portion (numpy.ndarray): population portion of the groups with shape (n_groups,) or (n_countries, n_groups)
+        x_init (array_like or None): initial state (s, e, i) of all groups, or None (x_0 of the first model)
+        method (str): integration backend, "rk4" or "odeint"
+
+    Returns:
+        dict[str, numpy.ndarray]:
+            - "i_paths", "c_paths": paths of the groups with shape (n_countries, n_groups, len(t_vec))
+            - "i_path", "c_path": paths of the total population with shape (n_countries, len(t_vec))
+            when @contacts is a matrix, the first dimension (n_countries) is removed
+    """
+    contacts = np.asarray(contacts, dtype=np.float64)
+    single = contacts.ndim == 2
+    contacts = contacts[np.newaxis] if single else contacts
+    n, n_groups = contacts.shape[:2]
+    portion = np.broadcast_to(np.asarray(portion, dtype=np.float64), (n, n_groups))
+    x_init = (1 - i_0 - e_0, e_0, i_0) if x_init is None else x_init
+    x = np.broadcast_to(np.asarray(x_init, dtype=np.float64)[:, np.newaxis, np.newaxis], (3, n, n_groups)).copy()
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+
+    if method == "rk4":
+        R = schedule_grid(R0, t_vec, n=n)
+        s_paths, e_paths, i_paths = rk4(lambda x, r: F_age(x, r, contacts), x, t_vec, R).transpose(1, 2, 3, 0)
+    elif method == "odeint":
+        from scipy.integrate import odeint
+
+        def G(x, t):
+            r = R0(t) if callable(R0) else R0
+            return F_age(x.reshape(3, n, n_groups), np.broadcast_to(r, (n,)), contacts).ravel()
+
+        paths = odeint(G, x.ravel(), t_vec).reshape(len(t_vec), 3, n, n_groups)
+        s_paths, e_paths, i_paths = paths.transpose(1, 2, 3, 0)
+    else:
+        raise ValueError(f"@method must be one of ('rk4', 'odeint'), but {method} was applied.")
+
+    c_paths = 1 - s_paths - e_paths       # cumulative cases
+    result = {
+        "i_paths": i_paths,
+        "c_paths": c_paths,
+        "i_path": np.einsum("na,nat->nt", portion, i_paths),
+        "c_path": np.einsum("na,nat->nt", portion, c_paths),
+    }
+    return {name: values[0] for (name, values) in result.items()} if single else result
@@ -0,0 +1,375 @@
+"""
+What-if branches of a scenario, solved from the state shared at the branch point.
+
+Scenario.simulate(name=...) solves all phases of each series from the first date,
+so "Main" and "Lockdown" both solve the past phases again. Here the phases of the base series
+are solved once, and the future phases of each branch are solved from its last state.
+
+The phases are solved as covsirphy solves them (refer to covsirphy.ODEHandler.simulate()):
+the model class of covsirphy is the time derivative, solve_ivp() with its default settings steps tau by tau,
+the values are rounded at the end of each phase and the last value of the steps in a date is the record of the date.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import math
+import numpy as np
+import pandas as pd
+
+from covid_model import profiling
+
+# Parameters and variables of the SIR-F model of covsirphy
+PARAMETERS = ["theta", "kappa", "rho", "sigma"]
+VARIABLES = ["Susceptible", "Infected", "Fatal", "Recovered"]
+DATE_FORMAT = "%d%b%Y"
+
+
+def _solve_phases(model, tau, first_date, phases):
+    """
+    Solve the phases one by one, as covsirphy._MultiPhaseODESolver.simulate().
+
+    Args:
+        model (covsirphy.ModelBase): ODE model, like covsirphy.SIRF
+        tau (int): tau value [min]
+        first_date (pandas.Timestamp): the first date of the steps
+        phases (list[tuple(pandas.Timestamp, dict[str, float], numpy.ndarray or None)]):
+            the last date, parameter values and initial values (in the order of VARIABLES) of the phases,
+            None as the initial values means the last values of the previous phase
+
+    Returns:
+        numpy.ndarray: values of each step with shape (n_steps + 1, len(VARIABLES))
+    """
+    from scipy.integrate import solve_ivp
+
+    order = [model.VARIABLES.index(variable) for variable in VARIABLES]
+    solved, done = [], 0
+    for (end_date, param_dict, y0) in phases:
+        step_n = math.ceil((end_date - first_date) / timedelta(minutes=tau)) - done
+        y0 = solved[-1][-1] if y0 is None else np.asarray(y0)[np.argsort(order)]
+        initials = np.asarray(y0, dtype=np.int64)
+        sol = solve_ivp(
+            fun=model(population=int(initials.sum()), **param_dict),
+            t_span=[0, step_n],
+            y0=initials,
+            t_eval=np.arange(0, step_n + 1, 1),
+            dense_output=False,
+        )
+        values = np.round(sol.y.T)
+        solved.append(values[1:] if solved else values)
+        done += step_n
+    return np.concatenate(solved)[:, order]
+
+
+def _daily(steps, tau):
+    """
+    Return the last values of the steps in each date, as covsirphy.ModelBase._convert_reverse().
+
+    Args:
+        steps (numpy.ndarray): values of each step from 00:00 of the first date with shape (n_steps + 1, n)
+        tau (int): tau value [min]
+
+    Returns:
+        numpy.ndarray: values of each date with shape (n_dates, n)
+    """
+    days = np.arange(len(steps)) * tau // 1440
+    return steps[np.append(days[1:] != days[:-1], True)]
+
+
+def _branch_phases(name, phases, branch_date, last_dict):
+    """
+    Return the last dates and parameter values of the future phases of a branch.
+
+    Args:
+        name (str): branch name
+        phases (dict or list[dict]): phases, refer to simulate_branches()
+        branch_date (pandas.Timestamp): the last date of the base series
+        last_dict (dict[str, float]): parameter values of the last phase of the base series
+
+    Returns:
+        list[tuple(pandas.Timestamp, dict[str, float], None)]: phases of _solve_phases()
+    """
+    phases = [phases] if isinstance(phases, dict) else list(phases)
+    if not phases:
+        raise ValueError(f"Branch {name} must have one or more phases, but no phases were applied.")
+    phase_list = []
+    param_dict, end = dict(last_dict), 0
+    for phase_dict in phases:
+        unknown = set(phase_dict) - {"end_date", "days", *PARAMETERS}
+        if unknown:
+            raise ValueError(
+                f"Phases must have keys of end_date, days and {PARAMETERS}, but {sorted(unknown)} were applied.")
+        if "end_date" in phase_dict:
+            new_end = (pd.to_datetime(phase_dict["end_date"], format=DATE_FORMAT) - branch_date).days
+        elif "days" in phase_dict:
+            new_end = end + int(phase_dict["days"])
+        else:
+            raise ValueError(f"Phases of branch {name} must have either end_date or days.")
+        if new_end <= end:
+            raise ValueError(f"Phases of branch {name} must end after {(branch_date + pd.Timedelta(days=end)).date()}.")
+        param_dict.update({param: float(phase_dict[param]) for param in PARAMETERS if param in phase_dict})
+        end = new_end
+        phase_list.append((branch_date + pd.Timedelta(days=end), dict(param_dict), None))
+    return phase_list
+
+
+def _base_series(scenario, name):
+    """
+    Solve the phases of the base series once.
+
+    Returns:
+        dict[str, object]:
+            - model (covsirphy.ModelBase): covsirphy.SIRF
+            - tau (int): tau value [min]
+            - start_date, branch_date (pandas.Timestamp): the first and the last date of the base series
+            - last_dict (dict[str, float]): parameter values of the last phase
+            - last (numpy.ndarray): values at the last step with shape (len(VARIABLES),)
+            - records (numpy.ndarray): values of each date with shape (n_dates, len(VARIABLES))
+
+    Note:
+        As covsirphy.PhaseTracker.simulate(), the past phases start with the records at their start dates
+        and the future phases start with the last values of the previous phases.
+
+    Raises:
+        ValueError: the phases of @name do not use the SIR-F model
+    """
+    summary_df = scenario.summary(name=name)
+    models = summary_df["ODE"].unique().tolist() if "ODE" in summary_df else []
+    if set(models) - {"SIR-F"}:
+        raise ValueError(f"@scenario must have the SIR-F model in all phases of {name}, but {models} were applied.")
+    missing = [param for param in PARAMETERS if param not in summary_df]
+    if missing:
+        raise ValueError(
+            f"@scenario must have the parameter values of the SIR-F model in all phases of {name}, "
+            f"but {missing} were not included.")
+    import covsirphy as cs
+
+    tau = int(summary_df["tau"].iloc[0])
+    starts = pd.to_datetime(summary_df["Start"], format=DATE_FORMAT)
+    ends = pd.to_datetime(summary_df["End"], format=DATE_FORMAT)
+    is_past = (summary_df["Type"] == "Past").to_numpy() if "Type" in summary_df else np.zeros(len(summary_df), bool)
+    records_df = scenario.records(variables="all", show_figure=False).set_index("Date")
+    phases = []
+    for (k, (start, end, param_dict)) in enumerate(zip(starts, ends, summary_df[PARAMETERS].to_dict("records"))):
+        y0 = records_df.loc[start, VARIABLES].to_numpy(dtype=np.int64) if k == 0 or is_past[k] else None
+        phases.append((end, param_dict, y0))
+    steps = _solve_phases(cs.SIRF, tau, starts.iloc[0], phases)
+    return {
+        "model": cs.SIRF, "tau": tau, "start_date": starts.iloc[0], "branch_date": ends.iloc[-1],
+        "last_dict": phases[-1][1], "last": steps[-1], "records": _daily(steps, tau),
+    }
+
+
+def _future_phases(branches, base_dict):
+    """
+    Return the names and the future phases of the branches.
+
+    Returns:
+        tuple(list[str], list[list[tuple]]): branch names and the phases as returned by _branch_phases()
+    """
+    if not branches:
+        raise ValueError("@branches must have one or more branches, but no branches were applied.")
+    names = list(branches)
+    phase_list = [
+        _branch_phases(branch, branches[branch], base_dict["branch_date"], base_dict["last_dict"]) for branch in names]
+    return names, phase_list
+
+
+def _branch_records(model, tau, branch_date, last, phases):
+    """
+    Solve the future phases of a branch.
+
+    Returns:
+        numpy.ndarray: values of each date from @branch_date with shape (n_days + 1, len(VARIABLES))
+
+    Note:
+        The first row is the last value of the steps in @branch_date, as Scenario.simulate() of the branch.
+    """
+    first_phase = (phases[0][0], phases[0][1], last)
+    return _daily(_solve_phases(model, tau, branch_date, [first_phase, *phases[1:]]), tau)
+
+
+def _branch_summary(model, tau, branch_date, last, phases, thresholds):
+    """
+    Solve the future phases of a branch and return the peak, the threshold crossings and the last records.
+
+    Returns:
+        tuple(int, int, numpy.ndarray, numpy.ndarray):
+            - max of Infected
+            - the first day of the max, 0 means @branch_date
+            - the first day when Confirmed reaches the thresholds, -1 if not
+            - records at the last date with shape (len(VARIABLES),)
+    """
+    records = _branch_records(model, tau, branch_date, last, phases)
+    confirmed = records[:, 1:].sum(axis=1)
+    reached = confirmed >= thresholds[:, np.newaxis]
+    cross_day = np.where(reached.any(axis=1), reached.argmax(axis=1), -1)
+    peak_day = int(np.argmax(records[:, 1]))
+    return records[peak_day, 1], peak_day, cross_day, records[-1]
+
+
+def _starmap(func, args_list, batch_size, workers):
+    """
+    Call func(*args) for each element of the list, in processes when workers > 1.
+
+    Returns:
+        list[object]: returned values in the order of the list
+    """
+    if workers == 1:
+        return [func(*args) for args in args_list]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, *zip(*args_list), chunksize=batch_size))
+
+
+@profiling.traced()
+def simulate_branches(scenario, branches, name="Main", batch_size=16, workers=1, include_past=True):
+    """
+    Simulate what-if branches of a scenario with the SIR-F model.
+
+    Args:
+        scenario (covsirphy.Scenario): scenario with parameter values of the phases of @name
+        branches (dict[str, dict or list[dict]]): branch names and future phases after the last phase of @name,
+            each phase is a dict with
+                - end_date (str) or days (int): the last date of the phase, or the number of days of the phase
+                - theta, kappa, rho, sigma (float): parameter values, the values of the last phase if not included
+        name (str): phase series name of the base series, shared by all branches
+        batch_size (int): the number of branches sent to a worker process at once
+        workers (int): the number of worker processes
+        include_past (bool): if True, the records of the base series are included in each branch
+
+    Returns:
+        pandas.DataFrame:
+            Index
+                reset index
+            Columns
+                - Branch (str): branch name
+                - Date (pandas.Timestamp): date
+                - Confirmed (int): the number of confirmed cases
+                - Infected (int): the number of currently infected cases
+                - Fatal (int): the number of fatal cases
+                - Recovered (int): the number of recovered cases
+
+    Note:
+        The phases of @name are solved once, the branches start from its values at the last step.
+        The records of a branch are the same as Scenario.simulate() after snl.add(end_date=..., name=branch, ...)
+        with the same phases.
+
+    Note:
+        Each branch is a call of solve_ivp() for each phase, so branches are solved in processes
+        with @workers > 1.
+
+    Raises:
+        ValueError: the phases of @name do not use the SIR-F model
+    """
+    base_dict = _base_series(scenario, name)
+    names, phase_list = _future_phases(branches, base_dict)
+    args_list = [
+        (base_dict["model"], base_dict["tau"], base_dict["branch_date"], base_dict["last"], phases)
+        for phases in phase_list]
+    results = _starmap(_branch_records, args_list, batch_size, workers)
+    # The record of the branch date is replaced with that of the branch
+    base_records = base_dict["records"][:-1]
+    dataframes = []
+    for (branch, values) in zip(names, results):
+        dates = pd.date_range(base_dict["branch_date"], periods=len(values))
+        if include_past:
+            values = np.concatenate([base_records, values])
+            dates = pd.date_range(base_dict["start_date"], periods=len(values))
+        else:
+            values, dates = values[1:], dates[1:]
+        df = pd.DataFrame(values.astype(np.int64), columns=VARIABLES)
+        df.insert(0, "Date", dates)
+        df.insert(0, "Branch", branch)
+        dataframes.append(df)
+    df = pd.concat(dataframes, ignore_index=True)
+    df["Confirmed"] = df[VARIABLES[1:]].sum(axis=1)
+    return df.loc[:, ["Branch", "Date", "Confirmed", *VARIABLES[1:]]]
+
+
+@profiling.traced()
+def summarize_branches(scenario, branches, name="Main", thresholds=(), batch_size=16, workers=1):
+    """
+    Return the peak, the threshold crossings and the last records of what-if branches, without the daily records.
+
+    Args:
+        scenario (covsirphy.Scenario): scenario with parameter values of the phases of @name
+        branches (dict[str, dict or list[dict]]): branch names and future phases, refer to simulate_branches()
+        name (str): phase series name of the base series, shared by all branches
+        thresholds (list[int]): the numbers of confirmed cases to find the dates of
+        batch_size (int): the number of branches sent to a worker process at once
+        workers (int): the number of worker processes
+
+    Returns:
+        pandas.DataFrame:
+            Index
+                - Branch (str): branch name
+            Columns
+                - Peak_Date (pandas.Timestamp): the first date with the max number of currently infected cases
+                - Peak_Infected (int): the max number of currently infected cases
+                - End_Date (pandas.Timestamp): the last date of the branch
+                - Confirmed, Infected, Fatal, Recovered (int): the number of cases at End_Date
+                - Confirmed>={threshold} (pandas.Timestamp): the first date of the threshold, NaT if not reached
+
+    Note:
+        The records are the same as simulate_branches(), but the daily records of each branch are reduced
+        in the worker process, so that memory does not grow with the number of branches times the number of days.
+
+    Raises:
+        ValueError: the phases of @name do not use the SIR-F model
+    """
+    base_dict = _base_series(scenario, name)
+    names, phase_list = _future_phases(branches, base_dict)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    args_list = [
+        (base_dict["model"], base_dict["tau"], base_dict["branch_date"], base_dict["last"], phases, thresholds)
+        for phases in phase_list]
+    results = _starmap(_branch_summary, args_list, batch_size, workers)
+    peak, peak_day, cross_day, last = (np.stack(values, axis=-1) for values in zip(*results))
+    # Combine with the base series before the branch date, days from the branch date to days from the start date
+    base_records = base_dict["records"][:-1]
+    n_base = len(base_records)
+    if n_base:
+        base_peak_day = int(np.argmax(base_records[:, 1]))
+        use_base = base_records[base_peak_day, 1] >= peak
+        peak = np.where(use_base, base_records[base_peak_day, 1], peak)
+        peak_day = np.where(use_base, base_peak_day, peak_day + n_base)
+    else:
+        peak_day = peak_day + n_base
+    base_confirmed = base_records[:, 1:].sum(axis=1)
+    for (k, threshold) in enumerate(thresholds):
+        base_crossed = np.flatnonzero(base_confirmed >= threshold)
+        if len(base_crossed):
+            cross_day[k] = base_crossed[0]
+        else:
+            cross_day[k] = np.where(cross_day[k] < 0, -1, cross_day[k] + n_base)
+    start_date = base_dict["start_date"]
+    to_dates = lambda days: pd.DatetimeIndex(start_date + pd.to_timedelta(np.where(days < 0, np.nan, days), unit="D"))
+    end_dates = pd.DatetimeIndex([phases[-1][0] for phases in phase_list])
+    records = last.astype(np.int64)
+    df = pd.DataFrame(
+        {
+            "Peak_Date": to_dates(peak_day),
+            "Peak_Infected": peak.astype(np.int64),
+            "End_Date": end_dates,
+            "Confirmed": records[1:].sum(axis=0),
+            **dict(zip(VARIABLES[1:], records[1:])),
+            **{f"Confirmed>={threshold:.0f}": to_dates(days) for (threshold, days) in zip(thresholds, cross_day)},
+        },
+        index=pd.Index(names, name="Branch")
+    )
+    return df
+
+
+def policy_branches(policy_df, country, end_date):
+    """
+    Return branches with the parameter values of evaluate_policies().
+
+    Args:
+        policy_df (pandas.DataFrame): output of covid_model.policies.evaluate_policies()
+        country (str): country name
+        end_date (str): the last date of the branches, like 31Dec2020
+
+    Returns:
+        dict[str, list[dict]]: branches of simulate_branches(), one phase with rho and sigma for each policy
+    """
+    df = policy_df.loc[country, ["rho", "sigma"]]
+    return {policy: [{"end_date": end_date, **values}] for (policy, values) in df.to_dict("index").items()}
@@ -0,0 +1,182 @@
+"""
+On-disk cache of estimated phase parameters, so that unchanged phases are not optimized again.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import pandas as pd
+
+from covid_model import profiling
+
+
+class EstimateCache(object):
+    """
+    Cache of parameter values of phases, keyed by country, model, tau and a fingerprint of the records.
+
+    Args:
+        directory (str or pathlib.Path): directory to save the entries
+        max_entries (int): the max number of entries, the least recently used are removed over this
+
+    Note:
+        Each entry is a JSON file. Recency is the modification time of the file,
+        so that the cache can be shared by the worker processes of covid_model.runner.
+    """
+
+    def __init__(self, directory="kaggle/estimates", max_entries=10000):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(country, model, tau, records_df):
+        """
+        Return the key of a phase.
+
+        Args:
+            country (str): country name
+            model (covsirphy.ModelBase): ODE model
+            tau (int or None): tau value [min] or None (estimated)
+            records_df (pandas.DataFrame): records of the phase
+
+        Returns:
+            str: hexadecimal digest
+        """
+        fingerprint = pd.util.hash_pandas_object(records_df, index=True).to_numpy().tobytes()
+        digest = hashlib.sha1(f"{country}|{model.NAME}|{tau}|".encode("utf-8"))
+        digest.update(fingerprint)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory.joinpath(f"{key}.json")
+
+    def get(self, key):
+        """
+        Return the cached entry.
+
+        Args:
+            key (str): key returned by EstimateCache.key()
+
+        Returns:
+            dict[str, object] or None: the entry, or None when not cached
+        """
+        path = self._path(key)
+        try:
+            with path.open("r") as fh:
+                entry = json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # Mark as recently used
+        os.utime(path)
+        return entry
+
+    def put(self, key, country, model, tau, param_dict):
+        """
+        Save parameter values of a phase.
+
+        Args:
+            key (str): key returned by EstimateCache.key()
+            country (str): country name
+            model (covsirphy.ModelBase): ODE model
+            tau (int): tau value [min] used with the parameter values
+            param_dict (dict[str, float]): parameter values
+        """
+        entry = {"country": country, "model": model.NAME, "tau": int(tau), "param": param_dict}
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w") as fh:
+            json.dump(entry, fh)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used entries over the max number of entries.
+        """
+        paths = list(self.directory.glob("*.json"))
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=lambda path: path.stat().st_mtime)
+        for path in paths[:len(paths) - self.max_entries]:
+            path.unlink(missing_ok=True)
+
+    def invalidate(self, country=None, model=None):
+        """
+        Remove entries.
+
+        Args:
+            country (str or None): country name or None (all countries)
+            model (covsirphy.ModelBase or None): ODE model or None (all models)
+
+        Returns:
+            int: the number of removed entries
+        """
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            if country is not None or model is not None:
+                try:
+                    with path.open("r") as fh:
+                        entry = json.load(fh)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    continue
+                if country is not None and entry["country"] != country:
+                    continue
+                if model is not None and entry["model"] != model.NAME:
+                    continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def __len__(self):
+        return len(list(self.directory.glob("*.json")))
+
+
+def estimate_with_cache(scenario, country, model, cache, tau=None, name="Main", **kwargs):
+    """
+    Perform Scenario.estimate(), skipping optimization of the phases found in the cache.
+
+    Args:
+        scenario (covsirphy.Scenario): scenario with phases set by Scenario.trend() or Scenario.add()
+        country (str): country name of the scenario
+        model (covsirphy.ModelBase): ODE model
+        cache (covid_model.cache.EstimateCache): cache of the estimates
+        tau (int or None): tau value specified with Scenario(), or None (estimated)
+        name (str): phase series name
+        kwargs: keyword arguments of Scenario.estimate()
+
+    Returns:
+        covsirphy.Scenario: @scenario with parameter values of all past phases
+
+    Note:
+        When some phases were found, their tau value is used for the other phases too.
+    """
+    records_df = scenario.records(variables="all", show_figure=False).set_index("Date")
+    df = scenario.summary(name=name)
+    df = df.loc[df["Type"] == "Past"]
+    starts = pd.to_datetime(df["Start"], format="%d%b%Y")
+    ends = pd.to_datetime(df["End"], format="%d%b%Y")
+    keys = {
+        phase: cache.key(country, model, tau, records_df.loc[start:end])
+        for (phase, start, end) in zip(df.index, starts, ends)
+    }
+    hit_dict = {phase: cache.get(key) for (phase, key) in keys.items()}
+    hit_dict = {phase: entry for (phase, entry) in hit_dict.items() if entry is not None}
+    misses = [phase for phase in keys if phase not in hit_dict]
+    if hit_dict:
+        # Re-define the phases with the cached values, the others will be over-written by estimation
+        tau = tau or next(iter(hit_dict.values()))["tau"]
+        placeholder = next(iter(hit_dict.values()))["param"]
+        scenario.clear(name=name, include_past=True)
+        for (phase, end) in zip(df.index, df["End"]):
+            param_dict = hit_dict[phase]["param"] if phase in hit_dict else placeholder
+            scenario.add(name=name, end_date=end, model=model, tau=tau, **param_dict)
+    profiling.annotate(cached=len(hit_dict), estimated=len(misses))
+    if not misses:
+        return scenario
+    scenario.estimate(model, phases=misses if hit_dict else None, name=name, **kwargs)
+    est_df = scenario.summary(name=name)
+    for phase in misses:
+        param_dict = {param: float(est_df.loc[phase, param]) for param in model.PARAMETERS}
+        cache.put(keys[phase], country, model, est_df.loc[phase, "tau"], param_dict)
+    return scenario
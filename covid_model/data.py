@@ -0,0 +1,229 @@
+"""
+Loading of the records of COVID-19 Data Hub with compact data types.
+
+The local CSV file saved by covsirphy.DataLoader is read in chunks and cleaned chunk by chunk,
+as covsirphy.JHUData does with the whole file, and the chunks are written to a Feather file one by one.
+The next sessions memory-map the Feather file instead of parsing the CSV file again.
+"""
+
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from covid_model import profiling
+
+# Columns of covsirphy.JHUData.cleaned() (with ISO3 and Population)
+AREA_COLS = ["ISO3", "Country", "Province"]
+VALUE_COLS = ["Confirmed", "Fatal", "Recovered", "Population"]
+RAW_COLS = ["Date", "ISO3", "Country", "Province", "Confirmed", "Infected", "Fatal", "Recovered", "Population"]
+UNKNOWN = "-"
+
+
+def _clean_chunk(chunk_df, last_df):
+    """
+    Clean a chunk of records, as covsirphy.JHUData._cleaning() without the total of China.
+
+    Args:
+        chunk_df (pandas.DataFrame): chunk of the CSV file
+        last_df (pandas.DataFrame): the last values of each (Country, Province) in the previous chunks
+
+    Returns:
+        tuple(pandas.DataFrame, pandas.DataFrame): cleaned records with compact data types and updated @last_df
+    """
+    df = chunk_df
+    df["Date"] = pd.to_datetime(df["Date"]).dt.round("D")
+    if df["Date"].dt.tz is not None:
+        df["Date"] = df["Date"].dt.tz_convert(None)
+    df["Date"] = df["Date"].astype("datetime64[s]")
+    df["Province"] = df["Province"].fillna(UNKNOWN).astype("category")
+    # Forward-filling in each area, continued from the previous chunks
+    keys = pd.MultiIndex.from_arrays([df["Country"].astype(str), df["Province"].astype(str)])
+    df[VALUE_COLS] = df.groupby(["Country", "Province"], observed=True)[VALUE_COLS].ffill()
+    df[VALUE_COLS] = df[VALUE_COLS].fillna(last_df.reindex(keys).set_axis(df.index))
+    last_df = df[VALUE_COLS].set_axis(keys).groupby(level=[0, 1]).last().combine_first(last_df)
+    df[VALUE_COLS] = df[VALUE_COLS].fillna(0).astype(np.int32)
+    df["Infected"] = (df["Confirmed"] - df["Fatal"] - df["Recovered"]).astype(np.int32)
+    return df.loc[:, RAW_COLS], last_df
+
+
+def _area_categories(filename, chunksize):
+    """
+    Return the sorted categories of the area columns, reading only these columns.
+    """
+    values = {col: set() for col in AREA_COLS}
+    values["Province"].add(UNKNOWN)
+    for chunk_df in pd.read_csv(filename, usecols=AREA_COLS, dtype="category", chunksize=chunksize):
+        for col in AREA_COLS:
+            values[col].update(chunk_df[col].cat.categories.astype(str))
+    if "China" in values["Country"]:
+        values["ISO3"].add("CHN")
+    return {col: sorted(col_values) for (col, col_values) in values.items()}
+
+
+def iter_records(filename, chunksize=200_000):
+    """
+    Read the CSV file of COVID-19 Data Hub in chunks and yield the cleaned records chunk by chunk.
+
+    Args:
+        filename (str or pathlib.Path): CSV file saved by covsirphy.DataLoader, like kaggle/input/covid19dh.csv
+        chunksize (int): the number of rows of a chunk
+
+    Yields:
+        pandas.DataFrame: cleaned records of a chunk, with the columns of read_records()
+
+    Note:
+        The area columns of all chunks have the same categories, read with the area columns only before the chunks.
+        The country level records of China are replaced with the total values of provinces, yielded at the end.
+    """
+    categories = _area_categories(filename, chunksize)
+    dtype = {"ISO3": "category", "Country": "category", "Province": "object"}
+    dtype.update({col: np.float64 for col in VALUE_COLS})
+    last_df = pd.DataFrame(
+        columns=VALUE_COLS, index=pd.MultiIndex.from_arrays([[], []], names=["Country", "Province"]), dtype=np.float64)
+    value_cols = ["Confirmed", "Infected", "Fatal", "Recovered", "Population"]
+    chn_df = None
+    for chunk_df in pd.read_csv(filename, usecols=["Date", *AREA_COLS, *VALUE_COLS], dtype=dtype, chunksize=chunksize):
+        df, last_df = _clean_chunk(chunk_df, last_df)
+        for col in AREA_COLS:
+            df[col] = pd.Categorical(df[col].astype(str), categories=categories[col])
+        # As country level data in China, use the total values of provinces
+        is_china = df["Country"] == "China"
+        is_province = df["Province"] != UNKNOWN
+        sum_df = df.loc[is_china & is_province].groupby("Date")[value_cols].sum()
+        chn_df = sum_df if chn_df is None else chn_df.add(sum_df, fill_value=0)
+        yield df.loc[~is_china | is_province].reset_index(drop=True)
+    if chn_df is not None and not chn_df.empty:
+        chn_df = chn_df.astype(np.int32).reset_index()
+        chn_df["ISO3"], chn_df["Country"], chn_df["Province"] = "CHN", "China", UNKNOWN
+        for col in AREA_COLS:
+            chn_df[col] = pd.Categorical(chn_df[col], categories=categories[col])
+        yield chn_df.loc[:, RAW_COLS]
+
+
+def _record_batches(filename, chunksize):
+    """
+    Yield the cleaned chunks of iter_records() as pyarrow.RecordBatch with the same schema.
+    """
+    import pyarrow as pa
+
+    schema = None
+    for df in iter_records(filename, chunksize=chunksize):
+        batch = pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+        schema = batch.schema
+        yield batch
+
+
+@profiling.traced()
+def read_records(filename, chunksize=200_000):
+    """
+    Read the CSV file of COVID-19 Data Hub in chunks and clean the records.
+
+    Args:
+        filename (str or pathlib.Path): CSV file saved by covsirphy.DataLoader, like kaggle/input/covid19dh.csv
+        chunksize (int): the number of rows of a chunk
+
+    Returns:
+        pandas.DataFrame
+            Index
+                reset index
+            Columns
+                - Date (numpy.datetime64[s]): observation date
+                - ISO3, Country, Province (pandas.Category): area names
+                - Confirmed, Infected, Fatal, Recovered, Population (numpy.int32): the number of cases
+
+    Note:
+        The country level records of China are the total values of provinces, as covsirphy.JHUData.
+
+    Note:
+        pyarrow is required. The chunks are kept as compact Arrow batches and converted to pandas column by column,
+        releasing each column of the batches after its conversion, so that the peak is about one copy of the records.
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_batches(_record_batches(filename, chunksize))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _cache_path(filename):
+    return Path(filename).with_suffix(".feather")
+
+
+def _write_cache(filename, cache_path, chunksize):
+    """
+    Write the cleaned records to the Feather cache as a single record batch, so that it can be read without copies.
+    """
+    import pyarrow as pa
+    from pyarrow import feather
+
+    # The chunks are streamed to a temporary file first, so only one chunk is in memory while the CSV is parsed
+    stream_path = cache_path.with_suffix(f".{os.getpid()}.stream")
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        batches = _record_batches(filename, chunksize)
+        first = next(batches)
+        with pa.ipc.new_file(stream_path, first.schema) as writer:
+            writer.write_batch(first)
+            del first
+            for batch in batches:
+                writer.write_batch(batch)
+        table = feather.read_table(stream_path, memory_map=True).combine_chunks()
+        feather.write_feather(table, tmp_path, compression="uncompressed", chunksize=max(table.num_rows, 1))
+        del table
+        # The file is replaced (not over-written), because the previous cache may be memory-mapped
+        os.replace(tmp_path, cache_path)
+    finally:
+        stream_path.unlink(missing_ok=True)
+        tmp_path.unlink(missing_ok=True)
+
+
+def _read_cache(cache_path):
+    """
+    Memory-map the Feather cache and return the records without copying the columns of counts and dates.
+    """
+    from pyarrow import feather
+
+    table = feather.read_table(cache_path, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+@profiling.traced()
+def load_records(filename="kaggle/input/covid19dh.csv", chunksize=200_000, force=False):
+    """
+    Return the cleaned records, using the Feather cache when it is newer than the CSV file.
+
+    Args:
+        filename (str or pathlib.Path): CSV file saved by covsirphy.DataLoader
+        chunksize (int): the number of rows of a chunk when the CSV file is parsed
+        force (bool): if True, the CSV file is always parsed and the cache is over-written
+
+    Returns:
+        pandas.DataFrame: as read_records()
+
+    Note:
+        pyarrow is required. The cache is saved next to the CSV file with suffix ".feather", uncompressed
+        and as a single record batch. The columns of counts and dates are read-only views of the memory-mapped file,
+        so the pages are loaded when they are used. Use DataFrame.copy() before changing values in place.
+    """
+    cache_path = _cache_path(filename)
+    if force or not cache_path.exists() or cache_path.stat().st_mtime < Path(filename).stat().st_mtime:
+        _write_cache(filename, cache_path, chunksize)
+    return _read_cache(cache_path)
+
+
+@profiling.traced()
+def load_jhu(filename="kaggle/input/covid19dh.csv", directory="kaggle/input", **kwargs):
+    """
+    Return the records as covsirphy.JHUData, without parsing the whole CSV file at once.
+
+    Args:
+        filename (str or pathlib.Path): CSV file saved by covsirphy.DataLoader
+        directory (str): directory to save geometry information (for JHUData.map())
+        kwargs: keyword arguments of load_records()
+
+    Returns:
+        covsirphy.JHUData
+    """
+    import covsirphy as cs
+
+    return cs.JHUData.from_dataframe(load_records(filename, **kwargs), directory=directory)
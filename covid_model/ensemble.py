@@ -0,0 +1,203 @@
+"""
+Monte Carlo ensembles of the SEIR model with uncertainty bands.
+
+Parameter sets are sampled and integrated batch by batch, and each batch is added to
+streaming quantile estimators, so that memory does not grow with the number of members.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from covid_model.schedules import R0_mitigating
+from covid_model.seir import pop_size, i_0, _integrate_rk4
+
+# Distributions of the parameters: a constant, or a function (rng, size) -> values
+DEFAULT_DRAWS = {
+    "γ": lambda rng, n: 1 / rng.uniform(14, 22, n),
+    "σ": lambda rng, n: 1 / rng.uniform(4.2, 6.2, n),
+    "R0": lambda rng, n: rng.uniform(1.6, 3.0, n),
+    "η": None,
+    "r_bar": 1.6,
+    "i_0": lambda rng, n: i_0 * rng.lognormal(0, 0.5, n),
+    "e_0": None,
+    "ν": 0.01,
+}
+
+
+def sample(n, draws=None, rng=None):
+    """
+    Sample parameter sets.
+
+    Args:
+        n (int): the number of parameter sets
+        draws (dict[str, object] or None): distributions to update DEFAULT_DRAWS,
+            values are constants, functions (rng, size) -> values or None (refer to Note)
+        rng (numpy.random.Generator or None): random generator
+
+    Returns:
+        dict[str, numpy.ndarray]: values with shape (n,) of γ, σ, R0, η, r_bar, i_0, e_0 and ν
+
+    Note:
+        "η": None means constant R0 values, else R(t) is R0_mitigating(t, r0=R0, η=η, r_bar=r_bar).
+        "e_0": None means 4 * i_0, as the initial conditions of the first model.
+    """
+    rng = rng or np.random.default_rng()
+    draw_dict = {**DEFAULT_DRAWS, **(draws or {})}
+    unknown = set(draw_dict) - set(DEFAULT_DRAWS)
+    if unknown:
+        raise ValueError(f"@draws must have keys of {list(DEFAULT_DRAWS)}, but {sorted(unknown)} were applied.")
+    param_dict = {}
+    for (name, draw) in draw_dict.items():
+        if draw is None:
+            param_dict[name] = None
+            continue
+        values = draw(rng, n) if callable(draw) else draw
+        param_dict[name] = np.broadcast_to(np.asarray(values, dtype=np.float64), (n,))
+    if param_dict["e_0"] is None:
+        param_dict["e_0"] = 4 * param_dict["i_0"]
+    return param_dict
+
+
+class StreamingQuantiles(object):
+    """
+    Quantiles of values at many points (like time points), updated with batches of samples.
+
+    Args:
+        probs (tuple(float)): probabilities of the quantiles
+        bins (int): the number of bins of the histograms at each point
+        margin (float): margin of the range of the histograms, relative to the range of the first batch
+
+    Note:
+        Each point has a histogram with fixed bins over the range of the first batch with margins,
+        so that memory is (n_points, bins) and does not depend on the number of samples.
+        The quantiles are interpolated in the bins, with error up to (range with margins) / bins.
+        Values out of the range are counted in the first/last bins.
+    """
+
+    def __init__(self, probs=(0.05, 0.5, 0.95), bins=1024, margin=0.25):
+        self.probs = tuple(probs)
+        self.bins = bins
+        self.margin = margin
+        self.n = 0
+        self._counts = None
+
+    def update(self, values):
+        """
+        Add samples.
+
+        Args:
+            values (numpy.ndarray): samples with shape (n_samples, n_points)
+        """
+        # (n_points, n_samples), contiguous for the transposed paths of the Runge-Kutta backend
+        values = np.asarray(values, dtype=np.float64).T
+        n_points = values.shape[0]
+        if self._counts is None:
+            low, high = values.min(axis=1), values.max(axis=1)
+            span = np.maximum(high - low, np.finfo(np.float64).eps * np.maximum(np.abs(high), 1))
+            self._low = low - self.margin * span
+            self._width = (1 + 2 * self.margin) * span / self.bins
+            self._min, self._max = low, high
+            self._counts = np.zeros((n_points, self.bins), dtype=np.int64)
+        idx = ((values - self._low[:, np.newaxis]) / self._width[:, np.newaxis]).clip(0, self.bins - 1)
+        flat = idx.astype(np.intp) + (np.arange(n_points) * self.bins)[:, np.newaxis]
+        self._counts += np.bincount(flat.ravel(), minlength=self.bins * n_points).reshape(n_points, self.bins)
+        self._min = np.minimum(self._min, values.min(axis=1))
+        self._max = np.maximum(self._max, values.max(axis=1))
+        self.n += values.shape[1]
+
+    def quantiles(self):
+        """
+        Return the quantiles.
+
+        Returns:
+            numpy.ndarray: quantiles with shape (len(probs), n_points)
+        """
+        if self._counts is None:
+            raise ValueError("No samples were registered with StreamingQuantiles.update().")
+        cdf = np.cumsum(self._counts, axis=1)
+        points = np.arange(cdf.shape[0])
+        results = []
+        for p in self.probs:
+            target = p * self.n
+            b = np.argmax(cdf >= target, axis=1)
+            before = np.where(b > 0, cdf[points, b - 1], 0)
+            frac = (target - before) / np.maximum(self._counts[points, b], 1)
+            q = self._low + (b + frac) * self._width
+            results.append(np.clip(q, self._min, self._max))
+        return np.array(results)
+
+
+def _solve_batch(param_dict, t_vec, pop_size):
+    """
+    Integrate a batch of parameter sets with the Runge-Kutta backend.
+
+    Returns:
+        tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray): i_paths, c_paths and deaths with shape (n, len(t_vec))
+    """
+    i_init, e_init = param_dict["i_0"], param_dict["e_0"]
+    x_init = np.array([1 - i_init - e_init, e_init, i_init])
+    if param_dict["η"] is None:
+        R = param_dict["R0"]
+    else:
+        r0, η, r_bar = param_dict["R0"], param_dict["η"], param_dict["r_bar"]
+        R = lambda t: R0_mitigating(t, r0=r0, η=η, r_bar=r_bar)
+    s_paths, e_paths, i_paths = _integrate_rk4(R, t_vec, x_init, γ=param_dict["γ"], σ=param_dict["σ"])
+    c_paths = 1 - s_paths - e_paths       # cumulative cases
+    deaths = c_paths * (param_dict["ν"] * pop_size)[:, np.newaxis]
+    return i_paths, c_paths, deaths
+
+
+def run_ensemble(n, t_vec, draws=None, probs=(0.05, 0.5, 0.95), batch_size=1024, workers=1, seed=None,
+                 pop_size=pop_size, bins=1024):
+    """
+    Run a Monte Carlo ensemble of the SEIR model and return the quantiles of the paths.
+
+    Args:
+        n (int): the number of members
+        t_vec (numpy.ndarray): time grid
+        draws (dict[str, object] or None): distributions of the parameters (refer to sample())
+        probs (tuple(float)): probabilities of the quantiles
+        batch_size (int): the number of members integrated at once
+        workers (int): the number of threads to integrate batches
+        seed (int or None): seed of random numbers
+        pop_size (float): population size to calculate the number of deaths
+        bins (int): the number of bins of StreamingQuantiles
+
+    Returns:
+        dict[str, numpy.ndarray]: quantiles with shape (len(probs), len(t_vec)) of
+            "i_path" (active infected), "c_path" (cumulative cases) and "deaths" (ν * pop_size * c_path)
+
+    Note:
+        Memory is proportional to batch_size * workers, not to @n.
+        Each batch has its own random stream derived from @seed, so results do not depend on @workers.
+
+    Note:
+        Batches run in threads because the compiled Runge-Kutta kernel releases the GIL.
+        Without numba, the NumPy engine holds the GIL for the most part and workers > 1 does not help.
+    """
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+    sizes = [min(batch_size, n - start) for start in range(0, n, batch_size)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    estimators = {name: StreamingQuantiles(probs=probs, bins=bins) for name in ("i_path", "c_path", "deaths")}
+
+    def _run(size, stream):
+        return _solve_batch(sample(size, draws=draws, rng=np.random.default_rng(stream)), t_vec, pop_size)
+
+    def _add(results):
+        for (estimator, values) in zip(estimators.values(), results):
+            estimator.update(values)
+
+    if workers == 1:
+        for (size, stream) in zip(sizes, streams):
+            _add(_run(size, stream))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Submit a limited number of batches ahead, so that memory stays bounded
+            pending = []
+            for (size, stream) in zip(sizes, streams):
+                pending.append(executor.submit(_run, size, stream))
+                if len(pending) > workers:
+                    _add(pending.pop(0).result())
+            for future in pending:
+                _add(future.result())
+    return {name: estimator.quantiles() for (name, estimator) in estimators.items()}
@@ -0,0 +1,117 @@
+"""
+Summary metrics of the SEIR model (peak, threshold crossings and final size) found while integrating.
+
+The notebook finds the peak with idxmax() of the full paths. Here the state is advanced step by step
+and only the running metrics are kept, so that memory is (n_scenarios,) whatever the length of the time grid.
+Event times are found between grid points with cubic Hermite interpolation of the Runge-Kutta steps.
+"""
+
+import numpy as np
+
+from covid_model import profiling
+from covid_model.schedules import RSchedule
+from covid_model.seir import γ, σ, x_0, F_vec
+
+
+def _hermite(y0, y1, m0, m1, θ):
+    """
+    Cubic Hermite interpolation at θ in [0, 1], with the derivatives m0 and m1 scaled by the step.
+    """
+    θ2, θ3 = θ * θ, θ * θ * θ
+    return (2 * θ3 - 3 * θ2 + 1) * y0 + (θ3 - 2 * θ2 + θ) * m0 + (- 2 * θ3 + 3 * θ2) * y1 + (θ3 - θ2) * m1
+
+
+def _hermite_root(y0, y1, m0, m1, target):
+    """
+    Return θ in [0, 1] where the Hermite interpolation crosses target, a linear guess refined with Newton steps.
+    """
+    θ = np.clip((target - y0) / np.where(y1 != y0, y1 - y0, 1), 0, 1)
+    for _ in range(2):
+        θ2 = θ * θ
+        slope = (6 * θ2 - 6 * θ) * y0 + (3 * θ2 - 4 * θ + 1) * m0 + (- 6 * θ2 + 6 * θ) * y1 + (3 * θ2 - 2 * θ) * m1
+        θ = np.clip(θ - (_hermite(y0, y1, m0, m1, θ) - target) / np.where(slope != 0, slope, 1), 0, 1)
+    return θ
+
+
+@profiling.traced()
+def summarize(R0, t_vec, x_init=x_0, thresholds=(), γ=γ, σ=σ):
+    """
+    Integrate the SEIR model with the Runge-Kutta method on t_vec and return summary metrics, without the paths.
+
+    Args:
+        R0 (float or array_like or callable): constant R0 of each scenario, or a function of time
+            returning a scalar or the values of the scenarios (e.g. covid_model.RSchedule)
+        t_vec (numpy.ndarray): time grid
+        x_init (array_like): initial state with shape (3,) or (3, n_scenarios)
+        thresholds (list[float]): values of c(t) (cumulative cases) to find the crossing times of
+        γ (float or numpy.ndarray): recovery rate, scalar or shape (n_scenarios,)
+        σ (float or numpy.ndarray): infection rate, scalar or shape (n_scenarios,)
+
+    Returns:
+        dict[str, numpy.ndarray]: values with shape (n_scenarios,), unless noted
+            - peak_i: max of i(t)
+            - peak_t: time of the max of i(t)
+            - peak_s: s(t) at the peak, 1/R0 for constant R0 (herd immunity)
+            - final_i: i(t) at the end of t_vec
+            - final_c: c(t) at the end of t_vec (final size when the epidemic ended before)
+            - t_cross: the first times when c(t) reaches the thresholds with shape (n_scenarios, len(thresholds)),
+                NaN if not reached
+
+    Note:
+        The peak is where di/dt changes from positive to non-positive between grid points,
+        or the first/last point when i(t) is monotonic.
+
+    Note:
+        With RSchedule, the steps restart at the breakpoints of the schedule.
+    """
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+    t_start = t_vec[0]
+    if isinstance(R0, RSchedule):
+        segments = R0.segments(t_start, t_vec[-1])
+    else:
+        segments = [(t_start, t_vec[-1], R0)]
+    r_start = segments[0][2](t_start) if callable(segments[0][2]) else segments[0][2]
+    x = np.asarray(x_init, dtype=np.float64).reshape(3, -1)
+    n = int(np.prod(np.broadcast_shapes(x.shape[1:], np.shape(r_start), np.shape(γ), np.shape(σ))))
+    x = np.broadcast_to(x, (3, n)).copy()
+    target = np.asarray(thresholds, dtype=np.float64)[:, np.newaxis]
+    peak_i, peak_t, peak_s = x[2].copy(), np.full(n, t_start), x[0].copy()
+    c = 1 - x[0] - x[1]
+    t_cross = np.where(c >= target, t_start, np.nan)
+    n_calls = 0
+    # Steps restart at the breakpoints of the schedule, as integrate() does
+    for (start, end, R_seg) in segments:
+        R = R_seg if callable(R_seg) else (lambda t, value=R_seg: value)
+        inside = (t_vec > start) & (t_vec < end)
+        t_seg = np.concatenate(([start], t_vec[inside], [end]))
+        # Derivative at the start of the step, shared with the end of the previous step
+        dx = F_vec(x, R(start), γ=γ, σ=σ)
+        n_calls += 4 * (len(t_seg) - 1) + 1
+        for (t0, t1) in zip(t_seg[:-1].tolist(), t_seg[1:].tolist()):
+            h = t1 - t0
+            r_mid, r_end = R(t0 + h / 2), R(t1)
+            k2 = F_vec(x + h / 2 * dx, r_mid, γ=γ, σ=σ)
+            k3 = F_vec(x + h / 2 * k2, r_mid, γ=γ, σ=σ)
+            k4 = F_vec(x + h * k3, r_end, γ=γ, σ=σ)
+            x_new = x + h / 6 * (dx + 2 * (k2 + k3) + k4)
+            dx_new = F_vec(x_new, r_end, γ=γ, σ=σ)
+            # Peak of i(t): di/dt crosses zero downward in the step, else the end of the step when higher
+            turned = (dx[2] > 0) & (dx_new[2] <= 0)
+            θ = np.where(turned, dx[2] / np.where(turned, dx[2] - dx_new[2], 1), 1)
+            i_peak = _hermite(x[2], x_new[2], h * dx[2], h * dx_new[2], θ)
+            higher = i_peak > peak_i
+            peak_i = np.where(higher, i_peak, peak_i)
+            peak_t = np.where(higher, t0 + θ * h, peak_t)
+            peak_s = np.where(higher, _hermite(x[0], x_new[0], h * dx[0], h * dx_new[0], θ), peak_s)
+            # Threshold crossings of c(t) = 1 - s(t) - e(t)
+            c_new = 1 - x_new[0] - x_new[1]
+            crossed = np.isnan(t_cross) & (c_new >= target)
+            if crossed.any():
+                dc, dc_new = - dx[0] - dx[1], - dx_new[0] - dx_new[1]
+                θ_c = _hermite_root(c, c_new, h * dc, h * dc_new, target)
+                t_cross = np.where(crossed, t0 + θ_c * h, t_cross)
+            x, dx, c = x_new, dx_new, c_new
+    profiling.count("F", n_calls)
+    return {
+        "peak_i": peak_i, "peak_t": peak_t, "peak_s": peak_s, "final_i": x[2], "final_c": c, "t_cross": t_cross.T,
+    }
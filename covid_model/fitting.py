@@ -0,0 +1,179 @@
+"""
+Fitting of the SEIR model of the first section to the records of a country.
+
+The Jacobian of the residuals is calculated with forward differences, integrating the parameter set and
+its perturbations as one batch with the Runge-Kutta backend. Starting points are screened in one batch too.
+Without numba, the batches are integrated with odeint instead, because the NumPy Runge-Kutta engine is
+a loop in Python over the steps.
+"""
+
+import numpy as np
+import pandas as pd
+
+from covid_model import profiling
+from covid_model.integrators import seir_kernel
+from covid_model.schedules import R0_mitigating
+from covid_model.seir import _integrate_rk4
+
+# Parameters of each schedule of R0, e_ratio is the ratio of exposed to infected cases at the first date
+PARAMETERS = {
+    "constant": ("R0", "σ", "γ", "e_ratio"),
+    "mitigating": ("r0", "η", "r_bar", "σ", "γ", "e_ratio"),
+}
+# Lower/upper bounds of the parameters
+BOUNDS = {
+    "R0": (0.1, 20), "r0": (0.1, 20), "η": (1e-4, 1), "r_bar": (0.1, 10),
+    "σ": (1 / 30, 2), "γ": (1 / 60, 2), "e_ratio": (1e-2, 1e2),
+}
+
+
+def _integrate_odeint(R, t_vec, x_init, γ, σ):
+    """
+    Integrate parameter sets as one system with odeint, the alternative of the compiled Runge-Kutta kernel.
+
+    Returns:
+        numpy.ndarray: paths with shape (3, n, len(t_vec))
+
+    Note:
+        The parameter sets share the steps of the solver, so that the forward differences of the Jacobian
+        are not affected by different step sizes of the perturbations.
+    """
+    from scipy.integrate import odeint
+
+    n = x_init.shape[1]
+
+    def G(y, t):
+        s, e, i = y.reshape(n, 3).T
+        new_exposed = (R(t) if callable(R) else R) * γ * s * i
+        return np.stack((- new_exposed, new_exposed - σ * e, σ * e - γ * i), axis=1).ravel()
+
+    # Parameter sets are independent, so the Jacobian is banded within each row of 3
+    paths = odeint(profiling.counted(G, "F"), x_init.T.ravel(), t_vec, ml=2, mu=2, rtol=1e-8, atol=1e-14)
+    return paths.reshape(len(t_vec), n, 3).transpose(2, 1, 0)
+
+
+def _simulate(log_values, schedule, t_vec, i_init, substeps):
+    """
+    Return i_paths and c_paths of parameter sets at the dates.
+
+    Args:
+        log_values (numpy.ndarray): log of parameter values with shape (n, len(PARAMETERS[schedule]))
+        schedule (str): "constant" or "mitigating"
+        t_vec (numpy.ndarray): dates [day]
+        i_init (float): active infected cases per population at the first date
+        substeps (int): the number of Runge-Kutta steps per day (not used without numba)
+
+    Returns:
+        tuple(numpy.ndarray, numpy.ndarray): i_paths and c_paths with shape (n, len(t_vec))
+    """
+    value_dict = dict(zip(PARAMETERS[schedule], np.exp(log_values).T))
+    e_init = i_init * value_dict["e_ratio"]
+    x_init = np.array([1 - i_init - e_init, e_init, np.full_like(e_init, i_init)])
+    if schedule == "constant":
+        R = value_dict["R0"]
+    else:
+        r0, η, r_bar = value_dict["r0"], value_dict["η"], value_dict["r_bar"]
+        R = lambda t: R0_mitigating(t, r0=r0, η=η, r_bar=r_bar)
+    if seir_kernel() is None:
+        s_paths, e_paths, i_paths = _integrate_odeint(R, t_vec, x_init, value_dict["γ"], value_dict["σ"])
+        return i_paths, 1 - s_paths - e_paths
+    t_fine = np.linspace(t_vec[0], t_vec[-1], (len(t_vec) - 1) * substeps + 1)
+    s_paths, e_paths, i_paths = _integrate_rk4(R, t_fine, x_init, γ=value_dict["γ"], σ=value_dict["σ"])
+    c_paths = 1 - s_paths - e_paths       # cumulative cases
+    return i_paths[:, ::substeps], c_paths[:, ::substeps]
+
+
+@profiling.traced()
+def fit_seir(records_df, population=None, schedule="constant", n_starts=256, n_refine=3, substeps=4,
+             max_nfev=100, seed=0):
+    """
+    Fit the parameters of the SEIR model to the records with least squares.
+
+    Args:
+        records_df (pandas.DataFrame): records, like Scenario.records(variables="all")
+            Index
+                reset index
+            Columns
+                - Date (pandas.Timestamp): observation date
+                - Confirmed (int): the number of confirmed cases
+                - Infected (int): the number of currently infected cases
+                - Susceptible (int): the number of susceptible cases, used when @population is None
+        population (int or None): population value, or None (Susceptible + Confirmed at the first date)
+        schedule (str): "constant" (R0) or "mitigating" (R0_mitigating() with r0, η and r_bar)
+        n_starts (int): the number of random starting points, screened in one batch
+        n_refine (int): the number of the best starting points to optimize
+        substeps (int): the number of Runge-Kutta steps per day
+        max_nfev (int): the max number of evaluations of the residuals for each starting point
+        seed (int or None): seed of random numbers of the starting points
+
+    Returns:
+        dict[str, float]: parameter values (refer to PARAMETERS), β (R0 * γ at the first date),
+            "rmsle" (root mean squared log error of Infected and Confirmed) and "nfev" (the number of evaluations)
+
+    Note:
+        The model is fitted to Infected / population with i(t)
+        and Confirmed / population with c(t) = 1 - s(t) - e(t).
+        i(0) is the first value of Infected, e(0) is fitted as i(0) * e_ratio.
+        The records before the first date with Infected > 0 are not used.
+
+    Note:
+        With numba (refer to requirements.txt), a fit of 400 days takes 0.1-0.3 sec.
+        Without it, the batches are integrated with odeint (refer to _integrate_odeint()), which is slower.
+    """
+    from scipy.optimize import least_squares
+
+    if schedule not in PARAMETERS:
+        raise ValueError(f"@schedule must be one of {list(PARAMETERS)}, but {schedule} was applied.")
+    df = records_df.sort_values("Date")
+    df = df.loc[(df["Infected"] > 0).cummax().to_numpy()]
+    if df.empty:
+        raise ValueError("@records_df must have at least one date with Infected > 0.")
+    if population is None:
+        population = int(df["Susceptible"].iloc[0] + df["Confirmed"].iloc[0])
+    t_vec = ((df["Date"] - df["Date"].iloc[0]) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+    if np.any(np.diff(t_vec) != 1):
+        # Fill missing dates so that the dates are on the grid of the integration
+        t_full = np.arange(t_vec[-1] + 1)
+    else:
+        t_full = t_vec
+    on_grid = np.isin(t_full, t_vec)
+    observed = np.log1p(df[["Infected", "Confirmed"]].to_numpy(dtype=np.float64))
+    i_init = df["Infected"].iloc[0] / population
+    names = PARAMETERS[schedule]
+    lower, upper = (np.log([BOUNDS[name][k] for name in names]) for k in (0, 1))
+
+    def residuals_batch(log_values):
+        i_paths, c_paths = _simulate(log_values, schedule, t_full, i_init, substeps)
+        simulated = np.log1p(np.clip(np.stack([i_paths, c_paths], axis=-1)[:, on_grid] * population, 0, None))
+        return (simulated - observed).reshape(len(log_values), -1)
+
+    step = 1e-6
+
+    def fun(log_values):
+        return residuals_batch(log_values[np.newaxis, :])[0]
+
+    def jac(log_values):
+        # The parameter set and its perturbations as one batch
+        batch = log_values + np.vstack([np.zeros(len(names)), step * np.eye(len(names))])
+        res = residuals_batch(batch)
+        return (res[1:] - res[0]).T / step
+
+    # Screening of random starting points, log-uniform in the bounds
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(lower, upper, (n_starts, len(names)))
+    costs = np.sum(residuals_batch(starts) ** 2, axis=1)
+    costs[~np.isfinite(costs)] = np.inf
+    best = None
+    nfev = n_starts
+    for x0 in starts[np.argsort(costs)[:n_refine]]:
+        result = least_squares(fun, x0, jac=jac, bounds=(lower, upper), max_nfev=max_nfev, method="trf")
+        nfev += result.nfev + result.njev * (len(names) + 1)
+        if best is None or result.cost < best.cost:
+            best = result
+    param_dict = dict(zip(names, np.exp(best.x).tolist()))
+    r0 = param_dict.get("R0", param_dict.get("r0"))
+    param_dict["β"] = r0 * param_dict["γ"]
+    param_dict["rmsle"] = float(np.sqrt(2 * best.cost / best.fun.size))
+    param_dict["nfev"] = int(nfev)
+    profiling.annotate(nfev=int(nfev), rmsle=param_dict["rmsle"])
+    return param_dict
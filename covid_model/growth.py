@@ -0,0 +1,124 @@
+"""
+Growth factor of confirmed cases and grouping of countries/provinces with it.
+
+Where C is the number of confirmed cases,
+  Growth Factor = ΔCn/ΔCn−1
+"""
+
+import numpy as np
+import pandas as pd
+
+GROUPS = ("Outbreaking", "Stopping", "Crossroad")
+MORE_COL, LESS_COL = "GF > 1 [straight days]", "GF < 1 [straight days]"
+
+
+def _area_keys(covid_df, level):
+    """
+    Return the records of the level and the names of their areas.
+    """
+    if level == "Country":
+        return covid_df, covid_df["Country"].astype(str)
+    if level == "Province":
+        df = covid_df.loc[covid_df["Province"].astype(str) != "-"]
+        return df, df["Country"].astype(str) + "/" + df["Province"].astype(str)
+    raise ValueError(f"@level must be 'Country' or 'Province', but {level} was applied.")
+
+
+def confirmed_values(covid_df, n_dates=None, level="Country"):
+    """
+    Return the number of confirmed cases of each area on the last dates.
+
+    Args:
+        covid_df (pandas.DataFrame): records as covsirphy.JHUData.cleaned()
+        n_dates (int or None): the number of the last dates or None (all dates)
+        level (str): "Country" or "Province" (named "Country/Province")
+
+    Returns:
+        pandas.DataFrame: index Date, columns area names, values Confirmed
+
+    Note:
+        This is the same as pivot_table(index="Date", columns=level, values="Confirmed", aggfunc="sum")
+        with forward-filling, but only the last dates are made dense.
+    """
+    df, keys = _area_keys(covid_df, level)
+    area_codes, areas = pd.factorize(keys, sort=True)
+    dates = np.sort(df["Date"].unique())
+    date_codes = np.searchsorted(dates, df["Date"].to_numpy())
+    # Sum of records for each (area, date), sorted by area and date
+    flat = area_codes.astype(np.int64) * len(dates) + date_codes
+    order = np.argsort(flat, kind="stable")
+    keys_sorted, starts = np.unique(flat[order], return_index=True)
+    sums = np.add.reduceat(df["Confirmed"].to_numpy(dtype=np.float64)[order], starts)
+    # The last record on or before the target dates of each area, 0 before the first record
+    targets = np.arange(len(dates))[-(n_dates or len(dates)):]
+    query = np.arange(len(areas), dtype=np.int64)[np.newaxis, :] * len(dates) + targets[:, np.newaxis]
+    found = np.searchsorted(keys_sorted, query, side="right") - 1
+    valid = (found >= 0) & (keys_sorted[found.clip(0)] // len(dates) == np.arange(len(areas)))
+    values = np.where(valid, sums[found.clip(0)], 0.0)
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates[targets], name="Date"), columns=areas.rename(level))
+
+
+def growth_factor(covid_df, window=7, days=None, level="Country"):
+    """
+    Calculate rolling mean of growth factor.
+
+    Args:
+        covid_df (pandas.DataFrame): records as covsirphy.JHUData.cleaned()
+        window (int): window of rolling mean [days]
+        days (int or None): the number of the last dates to calculate, or None (all dates)
+        level (str): "Country" or "Province"
+
+    Returns:
+        pandas.DataFrame: index Date, columns area names, values growth factor rounded to 0.01
+
+    Note:
+        Growth factor is 1.0 when not defined, i.e. divided by zero or at the first two dates.
+    """
+    values = confirmed_values(covid_df, None if days is None else days + window + 1, level=level)
+    diff = np.diff(values.to_numpy(), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gf = diff[1:] / diff[:-1]
+    if days is None:
+        gf = np.concatenate([np.full((2, gf.shape[1]), np.nan), gf])
+    gf[~np.isfinite(gf)] = 1.0
+    rolling = np.lib.stride_tricks.sliding_window_view(gf, window, axis=0).mean(axis=-1)
+    return pd.DataFrame(rolling.round(2), index=values.index[-len(rolling):], columns=values.columns)
+
+
+def _streak(mask):
+    """
+    Return the number of straight True values at the end of each column.
+    """
+    reverse = mask[::-1]
+    return np.where(reverse.all(axis=0), len(mask), reverse.argmin(axis=0))
+
+
+def classify_groups(growth_value_df, days=7):
+    """
+    Group areas with growth factor.
+
+    Args:
+        growth_value_df (pandas.DataFrame): output of growth_factor()
+        days (int): the number of days to decide groups and to show
+
+    Returns:
+        pandas.DataFrame:
+            Index
+                area names
+            Columns
+                - Group (str): "Outbreaking" (growth factor > 1 for the last days),
+                    "Stopping" (< 1 for the last days) or "Crossroad" (the others)
+                - GF > 1 [straight days] (int): the number of straight days with growth factor > 1
+                - GF < 1 [straight days] (int): the number of straight days with growth factor < 1
+                - growth factor of the last days, like 31Dec2020
+    """
+    values = growth_value_df.to_numpy()
+    more, less = _streak(values > 1), _streak(values < 1)
+    group = np.where(more >= days, GROUPS[0], np.where(less >= days, GROUPS[1], GROUPS[2]))
+    df = growth_value_df.iloc[-days:, :].T
+    day_cols = df.columns.strftime("%d%b%Y")
+    df.columns = day_cols
+    df.insert(0, "Group", group)
+    df.insert(1, MORE_COL, more)
+    df.insert(2, LESS_COL, less)
+    return df.sort_values(["Group", MORE_COL, LESS_COL], ascending=False)
@@ -0,0 +1,107 @@
+"""
+Incremental re-estimation of a scenario when new records arrive.
+
+Phases with the same date range as the last run keep their parameter values,
+and only the last (open) phase is fitted again, starting from the last values.
+"""
+
+import numpy as np
+import pandas as pd
+
+from covid_model import profiling
+
+
+@profiling.traced()
+def refit_phase(model, data_df, tau, seed_dict, max_nfev=200):
+    """
+    Fit parameter values of a phase with local optimization from a starting point.
+
+    Args:
+        model (covsirphy.ModelBase): ODE model
+        data_df (pandas.DataFrame): records of the phase
+            Index
+                reset index
+            Columns
+                - Date (pandas.Timestamp): observation date
+                - Susceptible, Infected, Fatal, Recovered (int): the number of cases
+        tau (int): tau value [min]
+        seed_dict (dict[str, float]): starting values of the parameters, like the last estimates
+        max_nfev (int): the max number of evaluations of the residuals
+
+    Returns:
+        dict[str, float]: parameter values
+
+    Note:
+        Residuals are the differences of log1p values of the variables except Susceptible,
+        as RMSLE of covsirphy.Scenario.estimate().
+    """
+    from scipy.integrate import odeint
+    from scipy.optimize import least_squares
+
+    taufree_df = model.convert(data_df, tau)
+    t = taufree_df.index.to_numpy(dtype=np.float64)
+    actual = taufree_df[model.VARIABLES].to_numpy(dtype=np.float64)
+    population = actual[0].sum()
+
+    def residuals(values):
+        ode = model(population, **dict(zip(model.PARAMETERS, values)))
+        simulated = odeint(ode, actual[0], t, tfirst=True)
+        return (np.log1p(np.clip(simulated[:, 1:], 0, None)) - np.log1p(actual[:, 1:])).ravel()
+
+    x0 = np.clip([seed_dict[param] for param in model.PARAMETERS], 0, 1)
+    result = least_squares(residuals, x0, bounds=(0, 1), max_nfev=max_nfev)
+    profiling.annotate(nfev=int(result.nfev), cost=float(result.cost))
+    return dict(zip(model.PARAMETERS, result.x.tolist()))
+
+
+@profiling.traced()
+def refresh(scenario, model, previous_df, name="Main", retrend=False, **kwargs):
+    """
+    Re-estimate a scenario incrementally, using the summary of the last run.
+
+    Args:
+        scenario (covsirphy.Scenario): scenario registered with the latest records
+        model (covsirphy.ModelBase): ODE model
+        previous_df (pandas.DataFrame): Scenario.summary() of the last run, with estimated values
+        name (str): phase series name
+        retrend (bool): if True, phases are set with Scenario.trend(),
+            else the phases of the last run are kept and the last one is extended to the last record
+        kwargs: keyword arguments of Scenario.estimate() for the phases changed by S-R trend analysis
+
+    Returns:
+        covsirphy.Scenario: @scenario with parameter values of all past phases
+
+    Note:
+        The last phase is fitted with refit_phase() from the values of the last run,
+        the other phases are kept when their start/end dates did not change.
+    """
+    previous_df = previous_df.loc[previous_df["Type"] == "Past"]
+    tau = int(previous_df["tau"].iloc[-1])
+    records_df = scenario.records(variables="all", show_figure=False)
+    if retrend:
+        scenario.trend(name=name, show_figure=False)
+        df = scenario.summary(name=name)
+        df = df.loc[df["Type"] == "Past", ["Start", "End"]]
+    else:
+        df = previous_df.loc[:, ["Start", "End"]].copy()
+        df.iloc[-1, df.columns.get_loc("End")] = records_df["Date"].max().strftime("%d%b%Y")
+    # Parameter values of the phases whose date range did not change
+    previous_dict = {
+        (start, end): param_dict for (start, end, param_dict)
+        in zip(previous_df["Start"], previous_df["End"], previous_df[model.PARAMETERS].to_dict("records"))
+    }
+    param_dicts = [previous_dict.get((start, end)) for (start, end) in zip(df["Start"], df["End"])]
+    # Warm-started fit of the last phase
+    seed_dict = previous_df[model.PARAMETERS].iloc[-1].to_dict()
+    start, end = pd.to_datetime(df.iloc[-1], format="%d%b%Y")
+    data_df = records_df.loc[records_df["Date"].between(start, end)]
+    param_dicts[-1] = refit_phase(model, data_df, tau, seed_dict)
+    # Re-define the phases, changed phases other than the last one are estimated with the placeholder
+    scenario.clear(name=name, include_past=True)
+    for (end, param_dict) in zip(df["End"], param_dicts):
+        scenario.add(name=name, end_date=end, model=model, tau=tau, **(param_dict or seed_dict))
+    phases = scenario.summary(name=name).index.tolist()
+    changed = [phase for (phase, param_dict) in zip(phases, param_dicts) if param_dict is None]
+    if changed:
+        scenario.estimate(model, phases=changed, name=name, **kwargs)
+    return scenario
@@ -0,0 +1,140 @@
+"""
+Fixed-step integrators, alternatives to the adaptive odeint of scipy.
+
+The time derivative is evaluated with R0 values computed ahead of time on the grid,
+so no Python callable is called inside the integration loop.
+"""
+
+import functools
+import numpy as np
+
+
+def half_grid(t_vec):
+    """
+    Return t_vec with the midpoints of its steps inserted, as used by the Runge-Kutta stages.
+
+    Args:
+        t_vec (numpy.ndarray): time grid
+
+    Returns:
+        numpy.ndarray: t_vec[0], (t_vec[0] + t_vec[1]) / 2, t_vec[1], ... with length 2 * len(t_vec) - 1
+    """
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+    t_half = np.empty(2 * len(t_vec) - 1)
+    t_half[::2] = t_vec
+    t_half[1::2] = (t_vec[:-1] + t_vec[1:]) / 2
+    return t_half
+
+
+def schedule_grid(R0, t_vec, n=None):
+    """
+    Evaluate R0 once on half_grid(t_vec).
+
+    Args:
+        R0 (float or array_like or callable): constant value(s) or a function of time
+        t_vec (numpy.ndarray): time grid
+        n (int or None): the number of scenarios or None (single scenario)
+
+    Returns:
+        numpy.ndarray: values with shape (2 * len(t_vec) - 1,) or (2 * len(t_vec) - 1, n)
+
+    Note:
+        Callables are evaluated with an array of times when they accept one,
+        and point by point otherwise (e.g. lambda t: 0.5 if t < 30 else 2).
+    """
+    t_half = half_grid(t_vec)
+    shape = (len(t_half),) if n is None else (len(t_half), n)
+    if not callable(R0):
+        return np.broadcast_to(np.asarray(R0, dtype=np.float64), shape)
+    t_col = t_half if n is None else t_half[:, np.newaxis]
+    try:
+        values = np.asarray(R0(t_col), dtype=np.float64)
+    except (TypeError, ValueError):
+        values = np.array([R0(t) for t in t_half], dtype=np.float64)
+        values = values if n is None else values.reshape(len(t_half), -1)
+    return np.broadcast_to(values, shape)
+
+
+def rk4(f, x_init, t_vec, R):
+    """
+    Integrate dx/dt = f(x, R) with the classic Runge-Kutta method, one step per interval of t_vec.
+
+    Args:
+        f (callable): time derivative f(x, R) of the state for the value R of the schedule
+        x_init (array_like): initial state
+        t_vec (numpy.ndarray): time grid
+        R (numpy.ndarray): schedule evaluated on half_grid(t_vec), as returned by schedule_grid()
+
+    Returns:
+        numpy.ndarray: states with shape (len(t_vec), *x_init.shape)
+    """
+    x = np.array(x_init, dtype=np.float64)
+    paths = np.empty((len(t_vec), *x.shape))
+    paths[0] = x
+    for k, h in enumerate(np.diff(t_vec).tolist()):
+        r_start, r_mid, r_end = R[2 * k], R[2 * k + 1], R[2 * k + 2]
+        k1 = f(x, r_start)
+        k2 = f(x + h / 2 * k1, r_mid)
+        k3 = f(x + h / 2 * k2, r_mid)
+        k4 = f(x + h * k3, r_end)
+        x = x + h / 6 * (k1 + 2 * (k2 + k3) + k4)
+        paths[k + 1] = x
+    return paths
+
+
+def _rk4_seir(x_init, t_vec, R, γ, σ):
+    """
+    Scalar-loop version of rk4() specialized to the SEIR model, compiled with numba.
+
+    Args:
+        x_init (numpy.ndarray): initial states with shape (3, n)
+        t_vec (numpy.ndarray): time grid
+        R (numpy.ndarray): schedule with shape (2 * len(t_vec) - 1, n)
+        γ (numpy.ndarray): recovery rate of each scenario with shape (n,)
+        σ (numpy.ndarray): infection rate of each scenario with shape (n,)
+
+    Returns:
+        numpy.ndarray: states with shape (len(t_vec), 3, n)
+    """
+    n = x_init.shape[1]
+    paths = np.empty((len(t_vec), 3, n))
+    paths[0] = x_init
+    for k in range(len(t_vec) - 1):
+        h = t_vec[k + 1] - t_vec[k]
+        for j in range(n):
+            s, e, i = paths[k, 0, j], paths[k, 1, j], paths[k, 2, j]
+            γ_j, σ_j = γ[j], σ[j]
+            β_start, β_mid, β_end = R[2 * k, j] * γ_j, R[2 * k + 1, j] * γ_j, R[2 * k + 2, j] * γ_j
+            new1 = β_start * s * i
+            ds1, de1, di1 = - new1, new1 - σ_j * e, σ_j * e - γ_j * i
+            s2, e2, i2 = s + h / 2 * ds1, e + h / 2 * de1, i + h / 2 * di1
+            new2 = β_mid * s2 * i2
+            ds2, de2, di2 = - new2, new2 - σ_j * e2, σ_j * e2 - γ_j * i2
+            s3, e3, i3 = s + h / 2 * ds2, e + h / 2 * de2, i + h / 2 * di2
+            new3 = β_mid * s3 * i3
+            ds3, de3, di3 = - new3, new3 - σ_j * e3, σ_j * e3 - γ_j * i3
+            s4, e4, i4 = s + h * ds3, e + h * de3, i + h * di3
+            new4 = β_end * s4 * i4
+            ds4, de4, di4 = - new4, new4 - σ_j * e4, σ_j * e4 - γ_j * i4
+            paths[k + 1, 0, j] = s + h / 6 * (ds1 + 2 * (ds2 + ds3) + ds4)
+            paths[k + 1, 1, j] = e + h / 6 * (de1 + 2 * (de2 + de3) + de4)
+            paths[k + 1, 2, j] = i + h / 6 * (di1 + 2 * (di2 + di3) + di4)
+    return paths
+
+
+@functools.lru_cache(maxsize=None)
+def seir_kernel():
+    """
+    Return _rk4_seir() compiled with numba, or None when numba is not installed.
+
+    Note:
+        numba is listed in requirements.txt (pre-installed on Colab). Without it, the NumPy engine is used,
+        which is slower than odeint for a single path.
+        numba is imported at the first call, because the import takes longer than the other modules.
+        The kernel releases the GIL, so that batches can be integrated in threads.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True, nogil=True)(_rk4_seir)
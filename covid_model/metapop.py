@@ -0,0 +1,237 @@
+"""
+Metapopulation SEIR model: the first model in each region, with travel between the regions.
+
+Residents of a region spend a part of their time in the other regions, as given by a sparse matrix of trips,
+and meet the people present there. The contacts are folded into a sparse coupling matrix once, so that
+the force of infection of all regions is one sparse matrix-vector product per evaluation of the time derivative.
+Large models can be integrated in processes, each of them with a block of regions.
+"""
+
+import numpy as np
+
+from covid_model import profiling
+from covid_model.integrators import rk4, schedule_grid
+from covid_model.seir import γ, σ, x_0
+
+METHODS = ("rk4", "odeint")
+
+
+def coupling_matrix(trips, population):
+    """
+    Return the coupling matrix of regions.
+
+    Args:
+        trips (scipy.sparse.spmatrix or numpy.ndarray): people of region r in region q at a time with shape
+            (n_regions, n_regions), like daily commuters, the diagonal is ignored
+        population (array_like): population of the regions with shape (n_regions,)
+
+    Returns:
+        scipy.sparse.csr_matrix: coupling with shape (n_regions, n_regions),
+            element [r, q] is the portion of the contacts of a resident of r with residents of q
+
+    Note:
+        With P[r, q] the portion of time residents of r spend in q (1 - the sum of the row at home),
+        the coupling is P diag(1 / N_q) P^T diag(N), where N_q is the number of people present in q.
+        Rows sum to 1, and the model of a region without trips is the same as F().
+    """
+    from scipy import sparse
+
+    population = np.asarray(population, dtype=np.float64)
+    trips = sparse.csr_matrix(trips, dtype=np.float64)
+    trips.setdiag(0)
+    trips.eliminate_zeros()
+    away = np.asarray(trips.sum(axis=1)).ravel()
+    if np.any(away > population):
+        raise ValueError("The number of people away from a region must not exceed its population.")
+    P = sparse.diags(1 / population) @ trips + sparse.diags(1 - away / population)
+    present = P.T @ population
+    coupling = P @ sparse.diags(1 / present) @ P.T @ sparse.diags(population)
+    return sparse.csr_matrix(coupling)
+
+
+def F_meta(x, R0, coupling, γ=γ, σ=σ):
+    """
+    Time derivative of the states of the regions.
+
+        * x is the state array with shape (3, n_regions), fractions of each region
+        * R0 is the value(s) of the transmission rate at that time, scalar or shape (n_regions,)
+        * coupling is the sparse coupling matrix with shape (n_regions, n_regions), like coupling_matrix()
+
+    """
+    s, e, i = x
+    new_exposed = R0 * γ * s * (coupling @ i)
+    return np.array((- new_exposed, new_exposed - σ * e, σ * e - γ * i))
+
+
+def _blocks(coupling, processes):
+    """
+    Return the boundaries of row blocks with about the same number of non-zero elements.
+    """
+    n = coupling.shape[0]
+    bounds = np.searchsorted(coupling.indptr, np.linspace(0, coupling.nnz, processes + 1), side="left")
+    bounds[0], bounds[-1] = 0, n
+    return np.unique(np.clip(bounds, 0, n))
+
+
+def _block_worker(lo, hi, block, t_vec, R, names, shape, barrier):
+    """
+    Integrate the regions lo:hi in a worker process, exchanging the states with the other blocks at each stage.
+
+    Args:
+        lo, hi (int): the first and the next of the last region of the block
+        block (scipy.sparse.csr_matrix): rows lo:hi of the coupling matrix
+        t_vec (numpy.ndarray): time grid
+        R (numpy.ndarray): schedule of the block with shape (2 * len(t_vec) - 1, hi - lo)
+        names (tuple(str, str, str)): names of the shared memory of the two stage buffers and the paths
+        shape (tuple(int, int)): shape of the states (3, n_regions)
+        barrier (multiprocessing.Barrier): barrier of all workers
+    """
+    from multiprocessing import shared_memory
+
+    memories = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        buffers = [np.ndarray(shape, dtype=np.float64, buffer=memory.buf) for memory in memories[:2]]
+        paths = np.ndarray((len(t_vec), *shape), dtype=np.float64, buffer=memories[2].buf)
+
+        def f(y, r):
+            s, e, i = y[:, lo:hi]
+            new_exposed = r * γ * s * (block @ y[2])
+            return np.array((- new_exposed, new_exposed - σ * e, σ * e - γ * i))
+
+        x = buffers[0][:, lo:hi].copy()
+        for k, h in enumerate(np.diff(t_vec).tolist()):
+            r_start, r_mid, r_end = R[2 * k], R[2 * k + 1], R[2 * k + 2]
+            # Stages read one buffer and write the other, a barrier after each stage
+            k1 = f(buffers[0], r_start)
+            buffers[1][:, lo:hi] = x + h / 2 * k1
+            barrier.wait()
+            k2 = f(buffers[1], r_mid)
+            buffers[0][:, lo:hi] = x + h / 2 * k2
+            barrier.wait()
+            k3 = f(buffers[0], r_mid)
+            buffers[1][:, lo:hi] = x + h * k3
+            barrier.wait()
+            k4 = f(buffers[1], r_end)
+            x = x + h / 6 * (k1 + 2 * (k2 + k3) + k4)
+            buffers[0][:, lo:hi] = x
+            paths[k + 1, :, lo:hi] = x
+            barrier.wait()
+        del buffers, paths
+    finally:
+        for memory in memories:
+            memory.close()
+
+
+def _rk4_blocks(x, t_vec, R, coupling, processes):
+    """
+    rk4() of F_meta() in processes, each of them with a block of regions.
+
+    Returns:
+        numpy.ndarray: states with shape (len(t_vec), 3, n_regions)
+    """
+    import multiprocessing
+    from multiprocessing import shared_memory
+    from multiprocessing.connection import wait
+
+    bounds = _blocks(coupling, processes)
+    ctx = multiprocessing.get_context()
+    barrier = ctx.Barrier(len(bounds) - 1)
+    sizes = (x.nbytes, x.nbytes, len(t_vec) * x.nbytes)
+    memories = [shared_memory.SharedMemory(create=True, size=size) for size in sizes]
+    try:
+        np.ndarray(x.shape, dtype=np.float64, buffer=memories[0].buf)[:] = x
+        paths = np.ndarray((len(t_vec), *x.shape), dtype=np.float64, buffer=memories[2].buf)
+        paths[0] = x
+        names = tuple(memory.name for memory in memories)
+        workers = [
+            ctx.Process(
+                target=_block_worker,
+                args=(lo, hi, coupling[lo:hi], t_vec, np.ascontiguousarray(R[:, lo:hi]), names, x.shape, barrier))
+            for (lo, hi) in zip(bounds[:-1].tolist(), bounds[1:].tolist())
+        ]
+        for worker in workers:
+            worker.start()
+        running = {worker.sentinel: worker for worker in workers}
+        while running:
+            for sentinel in wait(list(running)):
+                worker = running.pop(sentinel)
+                worker.join()
+                if worker.exitcode != 0:
+                    # The other workers would wait for the failed one at the barrier forever
+                    barrier.abort()
+        if any(worker.exitcode != 0 for worker in workers):
+            raise RuntimeError("A worker process of a block of regions failed.")
+        result = paths.copy()
+        # Views of the shared memory must be released before it is closed
+        del paths
+        return result
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+@profiling.traced()
+def solve_meta_paths(R0, t_vec, coupling, population, x_init=x_0, method="rk4", processes=1):
+    """
+    Solve for i(t) and c(t) of the regions.
+
+    Args:
+        R0 (float or array_like or callable): R0 of all regions or of each region with shape (n_regions,),
+            or a function of time (like R0_mitigating)
+        t_vec (numpy.ndarray): time grid
+        coupling (scipy.sparse.spmatrix or numpy.ndarray): coupling with shape (n_regions, n_regions),
+            like coupling_matrix()
+        population (array_like): population of the regions with shape (n_regions,)
+        x_init (array_like): initial state (s, e, i) of all regions with shape (3,) or of each region
+            with shape (3, n_regions)
+        method (str): integration backend, "rk4" or "odeint" (small models only, the Jacobian is dense)
+        processes (int): the number of processes of "rk4", each of them integrates a block of regions
+
+    Returns:
+        dict[str, numpy.ndarray]:
+            - "i_paths", "c_paths": paths of the regions with shape (n_regions, len(t_vec))
+            - "i_path", "c_path": paths of the total population with shape (len(t_vec),)
+
+    Note:
+        With @processes > 1, the blocks exchange the states at each stage of Runge-Kutta steps through
+        shared memory, and the paths are the same as a single process. The exchange costs four barriers
+        a step, so processes pay off with tens of thousands of regions or more, or long trips.
+    """
+    from scipy import sparse
+
+    coupling = sparse.csr_matrix(coupling, dtype=np.float64)
+    n = coupling.shape[0]
+    population = np.broadcast_to(np.asarray(population, dtype=np.float64), (n,))
+    x = np.asarray(x_init, dtype=np.float64)
+    x = np.broadcast_to(x[:, np.newaxis] if x.ndim == 1 else x, (3, n)).copy()
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+
+    if method == "rk4":
+        R = schedule_grid(R0, t_vec, n=n)
+        if processes > 1:
+            paths = _rk4_blocks(x, t_vec, R, coupling, processes)
+        else:
+            paths = rk4(lambda x, r: F_meta(x, r, coupling), x, t_vec, R)
+        profiling.count("F", 4 * (len(t_vec) - 1))
+        s_paths, e_paths, i_paths = paths.transpose(1, 2, 0)
+    elif method == "odeint":
+        from scipy.integrate import odeint
+
+        def G(x, t):
+            r = R0(t) if callable(R0) else R0
+            return F_meta(x.reshape(3, n), np.asarray(r, dtype=np.float64), coupling).ravel()
+
+        paths = odeint(profiling.counted(G, "F"), x.ravel(), t_vec).reshape(len(t_vec), 3, n)
+        s_paths, e_paths, i_paths = paths.transpose(1, 2, 0)
+    else:
+        raise ValueError(f"@method must be one of {METHODS}, but {method} was applied.")
+
+    c_paths = 1 - s_paths - e_paths       # cumulative cases
+    weights = population / population.sum()
+    return {
+        "i_paths": i_paths,
+        "c_paths": c_paths,
+        "i_path": weights @ i_paths,
+        "c_path": weights @ c_paths,
+    }
@@ -0,0 +1,96 @@
+"""
+The number of days people of each age group usually go out, weighted with population pyramid.
+"""
+
+import functools
+import numpy as np
+import pandas as pd
+
+# The number of days persons of each age group usually go out.
+_period_of_life_list = [
+    "nursery", "nursery school", "elementary school", "middle school",
+    "high school", "university/work", "work", "work", "work", "work",
+    "retired", "retired", "retired"
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _out_days():
+    df = pd.DataFrame(
+        {
+            "Age_first": [0, 3, 6, 11, 14, 19, 26, 36, 46, 56, 66, 76, 86],
+            "Age_last": [2, 5, 10, 13, 18, 25, 35, 45, 55, 65, 75, 85, 95],
+            "Period_of_life": _period_of_life_list,
+            "Days": [3, 5, 6, 6, 7, 7, 6, 5, 5, 5, 4, 3, 2]
+        }
+    )
+    # Adjustment by author
+    df["Types"] = df["Period_of_life"].replace(
+        {
+            "nursery": "school",
+            "nursery school": "school",
+            "elementary school": "school",
+            "middle school": "school",
+            "high school": "school",
+            "university/work": "school/work"
+        }
+    )
+    df["School"] = df[["Types", "Days"]].apply(lambda x: x.iloc[1] if "school" in x.iloc[0] else 0, axis=1)
+    df["Office"] = df[["Types", "Days"]].apply(lambda x: x.iloc[1] if "work" in x.iloc[0] else 0, axis=1)
+    df["Others"] = df["Days"] - df[["School", "Office"]].sum(axis=1)
+    df.loc[df["Others"] < 0, "Others"] = 0
+    df.loc[df.index[1:5], "School"] -= 1
+    df.loc[df.index[1:5], "Others"] += 1
+    df.loc[df.index[5], ["School", "Office", "Others"]] = [3, 3, 1]
+    df[["School", "Office", "Others"]] = df[["Days", "School", "Office", "Others"]].apply(
+        lambda x: x.iloc[1:] / sum(x.iloc[1:]) * x.iloc[0], axis=1
+    ).astype(np.int64)
+    df.loc[df.index[6:10], "Others"] += 1
+    return df.drop(["Days", "Types"], axis=1)
+
+
+def out_days():
+    """
+    Return the number of days persons of each age group usually go out in a week.
+
+    Returns:
+        pandas.DataFrame:
+            Index
+                reset index
+            Columns
+                - Age_first (int): the first age of the group
+                - Age_last (int): the last age of the group
+                - Period_of_life (str): like "nursery", "work" and "retired"
+                - School (int): the number of days to go to school
+                - Office (int): the number of days to go to office
+                - Others (int): the number of days to go out for the other reasons
+    """
+    return _out_days().copy()
+
+
+def go_out(country, pyramid_data):
+    """
+    Return the estimated number of days people usually go out.
+
+    Args:
+        country (str): coutry name
+        pyramid_data (covsirphy.PopulationPyramidData or covid_model.pyramid.PyramidTable): pyramid dataset
+
+    Returns:
+        pandas.DataFrame: out_days() with Age, Population and Portion columns
+
+    Note:
+        With PyramidTable, the values are looked up from the table without calculation.
+    """
+    from covid_model.pyramid import PyramidTable
+
+    if isinstance(pyramid_data, PyramidTable):
+        return pyramid_data.go_out(country)
+    p_df = pyramid_data.subset(country)
+    p_df["Cumsum"] = p_df["Population"].cumsum()
+    df = pd.merge(_out_days(), p_df, left_on="Age_last", right_on="Age", how="left")
+    df["Population"] = df["Cumsum"].diff()
+    df.loc[df.index[0], "Population"] = df.loc[df.index[0], "Cumsum"]
+    df["Population"] = df["Population"].astype(np.int64)
+    df["Portion"] = df["Population"] / df["Population"].sum()
+    return df.drop(["Per_total", "Cumsum"], axis=1)
@@ -0,0 +1,237 @@
+"""
+Line plots of the paths of the first model and of the records.
+
+matplotlib is imported when a figure is drawn, not when this module is imported.
+For batch jobs, PathRenderer draws without pyplot on one Agg figure which is re-used for all charts.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import threading
+import numpy as np
+
+from covid_model import profiling
+
+# A renderer for each thread (and so for each process), created by _local_renderer()
+_local = threading.local()
+
+
+@profiling.traced()
+def plot_paths(paths, labels, ylabel, times, filename=None):
+    """
+    Show paths in a figure.
+
+    Args:
+        paths (list[numpy.ndarray]): values of the paths
+        labels (list[str]): legend labels of the paths
+        ylabel (str): label of y-axis
+        times (numpy.ndarray or list[numpy.ndarray]): time values [day], or time values of each path
+            (like the points of covid_model.seir.solve_adaptive())
+        filename (str or pathlib.Path or None): filename to save the figure or None (display)
+
+    Note:
+        When @filename is specified, the figure is drawn headless with PathRenderer and pyplot is not used.
+    """
+    if filename is not None:
+        _local_renderer().render(paths, labels, ylabel, times, filename)
+        return
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+
+    for path, label, t in zip(paths, labels, _path_times(times, len(paths))):
+        ax.plot(t, path, label=label)
+
+    ax.legend(loc='upper left')
+    plt.xlabel('time in days')
+    plt.ylabel(ylabel)
+
+    plt.show()
+
+
+def _path_times(times, n_paths):
+    """
+    Return time values of each path, from the values shared by the paths or a list of values for each path.
+    """
+    if isinstance(times, (list, tuple)) and len(times) == n_paths and all(np.ndim(t) == 1 for t in times):
+        return list(times)
+    return [times] * n_paths
+
+
+class PathRenderer(object):
+    """
+    Headless renderer which re-uses one Agg figure, updating the data of its lines in place.
+
+    Args:
+        figsize (tuple(float, float)): size of the figure [inch]
+        dpi (int): resolution of raster images
+        xlabel (str): label of x-axis of render()
+        png_compression (int): zlib compression level of PNG files, 0 (fastest) - 9 (smallest)
+
+    Note:
+        A renderer is not thread-safe. Use one renderer for each thread, as render_many() does.
+    """
+
+    def __init__(self, figsize=(11, 5), dpi=100, xlabel="time in days", png_compression=1):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self._fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self._fig)
+        self._ax = self._fig.add_subplot()
+        self._xlabel = xlabel
+        self._png_compression = png_compression
+        self._lines = []
+
+    @property
+    def figure(self):
+        """
+        matplotlib.figure.Figure: the figure
+        """
+        return self._fig
+
+    def draw(self, paths, labels, ylabel, times, title=None, xlabel=None, legend_loc="upper left", ylim=None):
+        """
+        Update the figure with paths.
+
+        Args:
+            paths (list[numpy.ndarray]): values of the paths
+            labels (list[str]): legend labels of the paths
+            ylabel (str): label of y-axis
+            times (numpy.ndarray or list[numpy.ndarray]): x values, numbers or dates (numpy.datetime64),
+                or x values of each path
+            title (str or None): title of the figure
+            xlabel (str or None): label of x-axis, None means the default of the renderer
+            legend_loc (str): location of the legend
+            ylim (tuple(float or None, float or None) or None): limit of y-axis or None (automatic)
+        """
+        import matplotlib.dates as mdates
+        from matplotlib.ticker import AutoLocator, ScalarFormatter
+
+        ax = self._ax
+        times_list = [np.asarray(t) for t in _path_times(times, len(paths))]
+        is_date = any(np.issubdtype(t.dtype, np.datetime64) for t in times_list)
+        for (k, (path, label, t)) in enumerate(zip(paths, labels, times_list)):
+            x = mdates.date2num(t) if is_date else t
+            if k < len(self._lines):
+                line = self._lines[k]
+                line.set_data(x, path)
+                line.set_label(label)
+                line.set_visible(True)
+            else:
+                line, = ax.plot(x, path, label=label)
+                self._lines.append(line)
+        for line in self._lines[len(paths):]:
+            line.set_visible(False)
+            # Labels starting with an underscore are not shown in legends
+            line.set_label("_hidden")
+        if is_date:
+            locator = mdates.AutoDateLocator()
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        else:
+            ax.xaxis.set_major_locator(AutoLocator())
+            ax.xaxis.set_major_formatter(ScalarFormatter())
+        ax.relim(visible_only=True)
+        ax.set_ylim(auto=True)
+        ax.autoscale_view()
+        if ylim is not None:
+            ax.set_ylim(*ylim)
+        ax.set_xlabel(self._xlabel if xlabel is None else xlabel)
+        ax.set_ylabel(ylabel)
+        ax.set_title(title or "")
+        ax.legend(loc=legend_loc)
+
+    def save(self, filename, **kwargs):
+        """
+        Save the figure as a file.
+
+        Args:
+            filename (str or pathlib.Path): filename, the format is decided with the suffix, like .png and .svg
+            kwargs: keyword arguments of matplotlib.figure.Figure.savefig()
+        """
+        if str(filename).lower().endswith(".png"):
+            kwargs.setdefault("pil_kwargs", {"compress_level": self._png_compression})
+        self._fig.savefig(filename, **kwargs)
+
+    @profiling.traced("render")
+    def render(self, paths, labels, ylabel, times, filename, title=None, **kwargs):
+        """
+        Draw paths and save the figure.
+
+        Args:
+            paths (list[numpy.ndarray]): values of the paths
+            labels (list[str]): legend labels of the paths
+            ylabel (str): label of y-axis
+            times (numpy.ndarray): x values, numbers or dates (numpy.datetime64)
+            filename (str or pathlib.Path): filename to save the figure
+            title (str or None): title of the figure
+            kwargs: keyword arguments of PathRenderer.draw()
+        """
+        self.draw(paths, labels, ylabel, times, title=title, **kwargs)
+        self.save(filename)
+
+    def render_frame(self, df, filename, title=None, ylabel="Cases", **kwargs):
+        """
+        Draw the columns of a dataframe and save the figure, as covsirphy.line_plot(df, title, filename=...).
+
+        Args:
+            df (pandas.DataFrame): index x values like Date, columns variables to show
+            filename (str or pathlib.Path): filename to save the figure
+            title (str or None): title of the figure
+            ylabel (str): label of y-axis
+            kwargs: keyword arguments of PathRenderer.draw()
+        """
+        kwargs.setdefault("xlabel", df.index.name)
+        kwargs.setdefault("ylim", (0, None))
+        paths = [df[col].to_numpy(dtype=np.float64) for col in df.columns]
+        self.render(paths, df.columns.tolist(), ylabel, df.index.to_numpy(), filename, title=title, **kwargs)
+
+
+def _local_renderer():
+    """
+    Return the renderer of the current thread.
+    """
+    if not hasattr(_local, "renderer"):
+        _local.renderer = PathRenderer()
+    return _local.renderer
+
+
+def _render_job(job):
+    """
+    Render a job of render_many() with the renderer of the current thread.
+    """
+    job = dict(job)
+    if "df" in job:
+        _local_renderer().render_frame(job.pop("df"), **job)
+    else:
+        _local_renderer().render(**job)
+    return job["filename"]
+
+
+def render_many(jobs, workers=1, executor="thread", chunksize=16):
+    """
+    Render figures in bulk.
+
+    Args:
+        jobs (iterable[dict[str, object]]): keyword arguments of PathRenderer.render(),
+            or PathRenderer.render_frame() when "df" is included
+        workers (int): the number of threads/processes, 1 means the current thread
+        executor (str): "thread" or "process"
+        chunksize (int): the number of jobs sent to a process at once (used with "process")
+
+    Returns:
+        list[str or pathlib.Path]: filenames of the saved figures
+
+    Note:
+        Each thread/process re-uses its own renderer. Drawing holds the GIL for the most part,
+        so use "process" to render with many CPUs.
+    """
+    if workers == 1:
+        return [_render_job(job) for job in jobs]
+    if executor == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_render_job, jobs))
+    if executor == "process":
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_render_job, jobs, chunksize=chunksize))
+    raise ValueError(f"@executor must be 'thread' or 'process', but {executor} was applied.")
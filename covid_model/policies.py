@@ -0,0 +1,203 @@
+"""
+Intervention policies as declarative rules of the days to go out, evaluated as arrays.
+
+A policy is a dict of rules, like {"School": 0, "Office": "*0.5", "Others": "+1 if commuting", "h_bar": "*0.1"}.
+All policies are compiled into arrays of scales and shifts, so that thousands of policies of many countries
+are evaluated with a few array operations.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+from covid_model.mobility import _out_days
+from covid_model.pyramid import SETTINGS
+
+# Groups to apply the rules of the days to go out
+CONDITIONS = ("all", "going", "commuting")
+# Parameters of sigma (h_bar: the rate of hospitalization, s_bar: the rate of susceptible cases in hospitals)
+SIGMA_PARAMETERS = ("h_bar", "s_bar")
+_RULE_PATTERN = re.compile(r"^\s*([=*+-]?)\s*([-+]?(?:\d+(?:\.\d*)?|\.\d+))\s*(?:if\s+(\w+))?\s*$")
+
+
+def parse_rule(rule):
+    """
+    Parse a rule of a policy.
+
+    Args:
+        rule (int or float or str): a value to set, or a str like "=1", "*0.5", "+1", "-1", "=1 if going"
+            and "=-0.3 if going" (signed values)
+
+    Returns:
+        tuple(float, float, str): scale, shift and condition, the new value is (value * scale + shift)
+            for the groups selected with the condition
+
+    Note:
+        Conditions:
+            - "all" (default): all groups
+            - "going": groups which go to the place before the policy (days > 0)
+            - "commuting": groups which go to school or office before the policy
+    """
+    if isinstance(rule, (int, float, np.number)) and not isinstance(rule, bool):
+        return (0.0, float(rule), "all")
+    match = _RULE_PATTERN.match(str(rule))
+    if match is None:
+        raise ValueError(f"@rule must be a number or a str like '*0.5' and '+1 if commuting', but {rule} was applied.")
+    operator, value, condition = match.group(1) or "=", float(match.group(2)), match.group(3) or "all"
+    if condition not in CONDITIONS:
+        raise ValueError(f"Condition of @rule must be one of {CONDITIONS}, but {condition} was applied.")
+    return {"=": (0.0, value), "*": (value, 0.0), "+": (1.0, value), "-": (1.0, -value)}[operator] + (condition,)
+
+
+class PolicySet(object):
+    """
+    Intervention policies, compiled into arrays.
+
+    Args:
+        policies (dict[str, dict[str, object]]): policy names and rules, keys of rules are
+            School, Office, Others (the days to go out), h_bar and s_bar (parameters of sigma)
+        settings (tuple(str)): columns of the days to go out
+
+    Note:
+        The rules of a policy are applied at the same time, and conditions are decided with the days before the policy.
+        The settings without rules are not changed.
+    """
+
+    def __init__(self, policies, settings=SETTINGS):
+        self._names = list(policies)
+        self._settings = tuple(settings)
+        keys = (*self._settings, *SIGMA_PARAMETERS)
+        n = len(self._names)
+        self._scale = np.ones((n, len(keys)))
+        self._shift = np.zeros((n, len(keys)))
+        self._condition = np.zeros((n, len(keys)), dtype=np.intp)
+        for (p, name) in enumerate(self._names):
+            unknown = set(policies[name]) - set(keys)
+            if unknown:
+                raise ValueError(f"Rules of policy {name} must have keys of {keys}, but {sorted(unknown)} were applied.")
+            for (k, key) in enumerate(keys):
+                if key not in policies[name]:
+                    continue
+                scale, shift, condition = parse_rule(policies[name][key])
+                if key in SIGMA_PARAMETERS and condition != "all":
+                    raise ValueError(f"Rules of {key} must not have conditions, but {condition} was applied.")
+                self._scale[p, k], self._shift[p, k] = scale, shift
+                self._condition[p, k] = CONDITIONS.index(condition)
+
+    @property
+    def settings(self):
+        """
+        tuple(str): columns of the days to go out
+        """
+        return self._settings
+
+    @property
+    def names(self):
+        """
+        list[str]: policy names
+        """
+        return self._names[:]
+
+    def __len__(self):
+        return len(self._names)
+
+    def days(self, out_df=None):
+        """
+        Return the days to go out of the age groups with the policies.
+
+        Args:
+            out_df (pandas.DataFrame or None): days before the policies, like go_out(), or None (out_days())
+
+        Returns:
+            numpy.ndarray: days with shape (len(policies), n_groups, len(settings))
+        """
+        out_df = _out_days() if out_df is None else out_df
+        before = out_df.loc[:, list(self._settings)].to_numpy(dtype=np.float64)
+        n_groups, n_settings = before.shape
+        commuting = before[:, [self._settings.index(col) for col in ("School", "Office")]].sum(axis=1) > 0
+        masks = np.array([
+            np.ones_like(before, dtype=np.bool_), before > 0, np.broadcast_to(commuting[:, np.newaxis], before.shape)])
+        condition = self._condition[:, np.newaxis, :n_settings]
+        selected = masks[condition, np.arange(n_groups)[:, np.newaxis], np.arange(n_settings)]
+        after = before * self._scale[:, np.newaxis, :n_settings] + self._shift[:, np.newaxis, :n_settings]
+        return np.where(selected, after, before)
+
+    def frames(self, out_df):
+        """
+        Return the output of go_out() with the policies.
+
+        Args:
+            out_df (pandas.DataFrame): days before the policies, like go_out()
+
+        Returns:
+            dict[str, pandas.DataFrame]: policy names and @out_df with the updated days
+        """
+        days = self.days(out_df)
+        return {
+            name: out_df.assign(**dict(zip(self._settings, values.T))) for (name, values) in zip(self._names, days)}
+
+    def sigma_parameters(self, h_bar=0.5, s_bar=0.5):
+        """
+        Return h_bar and s_bar with the policies.
+
+        Args:
+            h_bar (float): the rate of hospitalization before the policies
+            s_bar (float): the rate of susceptible cases in hospitals before the policies
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): h_bar and s_bar with shape (len(policies),)
+        """
+        before = np.array([h_bar, s_bar], dtype=np.float64)
+        n_settings = len(self._settings)
+        return tuple((before * self._scale[:, n_settings:] + self._shift[:, n_settings:]).T)
+
+
+def evaluate_policies(policies, pyramid_table, countries, rho_before, sigma_before, h_bar=0.5, s_bar=0.5,
+                      out_df=None):
+    """
+    Return the parameter values of the countries with the policies.
+
+    Args:
+        policies (PolicySet or dict[str, dict[str, object]]): policies
+        pyramid_table (covid_model.pyramid.PyramidTable): population of the age groups
+        countries (list[str]): country names
+        rho_before (float or array_like): rho values before the policies, scalar or shape (len(countries),)
+        sigma_before (float or array_like): sigma values before the policies, scalar or shape (len(countries),)
+        h_bar (float): the rate of hospitalization before the policies
+        s_bar (float): the rate of susceptible cases in hospitals before the policies
+        out_df (pandas.DataFrame or None): days to go out before the policies, or None (out_days())
+
+    Returns:
+        pandas.DataFrame:
+            Index
+                - Country (str): country names
+                - Policy (str): policy names
+            Columns
+                - gs_before (float): days in a week susceptible people go out before the policies
+                - gs_after (float): days in a week susceptible people go out with the policies
+                - rho (float): rho_before * (gs_after / gs_before)
+                - sigma (float): sigma_before * (1 - h_bar_after * s_bar_after) / (1 - h_bar * s_bar)
+
+    Note:
+        Scenarios can be added with snl.add(end_date=..., name=policy, **df.loc[(country, policy), ["rho", "sigma"]]).
+    """
+    policies = policies if isinstance(policies, PolicySet) else PolicySet(policies)
+    out_df = _out_days() if out_df is None else out_df
+    rows = pyramid_table.rows(countries)
+    n = len(rows)
+    gs_before = pyramid_table.portions[rows] @ out_df.loc[:, list(policies.settings)].to_numpy(dtype=np.float64).sum(axis=1)
+    gs_after = pyramid_table.portions[rows] @ policies.days(out_df).sum(axis=2).T
+    rho_before = np.broadcast_to(np.asarray(rho_before, dtype=np.float64), (n,))
+    sigma_before = np.broadcast_to(np.asarray(sigma_before, dtype=np.float64), (n,))
+    h_bar_after, s_bar_after = policies.sigma_parameters(h_bar=h_bar, s_bar=s_bar)
+    sigma_ratio = (1 - h_bar_after * s_bar_after) / (1 - h_bar * s_bar)
+    index = pd.MultiIndex.from_product([list(countries), policies.names], names=["Country", "Policy"])
+    return pd.DataFrame(
+        {
+            "gs_before": np.repeat(gs_before, len(policies)),
+            "gs_after": gs_after.ravel(),
+            "rho": (rho_before[:, np.newaxis] * gs_after / gs_before[:, np.newaxis]).ravel(),
+            "sigma": (sigma_before[:, np.newaxis] * sigma_ratio[np.newaxis, :]).ravel(),
+        },
+        index=index
+    )
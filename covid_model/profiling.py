@@ -0,0 +1,322 @@
+"""
+Instrumentation of the stages of the modeling pipeline: wall time, counters and peak memory.
+
+Tracing is disabled by default. Then span() returns a shared no-op context, traced() calls the function directly
+and counted() returns the function itself, so the hooks cost an attribute lookup and a check.
+
+Usage:
+    with profiling.tracing(memory=True) as tracer:
+        run_countries(countries, jhu_data, population_data)
+    tracer.to_chrome_trace("trace.json")   # open with chrome://tracing or https://ui.perfetto.dev
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# The active tracer, or None (disabled)
+_tracer = None
+
+
+class Tracer(object):
+    """
+    Recorder of spans, like the stages of a country (trend, estimate, simulate...).
+
+    Args:
+        memory (bool): if True, peak memory of each span is traced with tracemalloc (slower)
+
+    Note:
+        Each span is a dict with keys
+            - name (str): stage name
+            - country (str or None): country name, inherited from the outer span when not specified
+            - start (float): start time, seconds since the epoch (comparable between processes)
+            - duration (float): wall time [sec]
+            - counters (dict[str, int]): counts like the evaluations of F, added with count()
+            - peak_memory (int or None): peak size of Python allocations in the span [byte], if @memory
+            - args (dict[str, object]): the other values, like the trials of the optimizer of a phase
+            - pid, tid (int): process and thread IDs
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name, country=None, **kwargs):
+        """
+        Record a span.
+
+        Args:
+            name (str): stage name
+            country (str or None): country name, or None (the country of the outer span)
+            kwargs: values saved as "args" of the span
+
+        Yields:
+            dict: the span
+        """
+        stack = self._stack()
+        record = {
+            "name": name,
+            "country": country if country is not None else (stack[-1]["country"] if stack else None),
+            "start": time.time(),
+            "duration": None,
+            "counters": {},
+            "peak_memory": None,
+            "args": dict(kwargs),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.memory:
+            # tracemalloc has a single peak, so the peak so far is kept by the outer span before it is reset
+            if stack:
+                stack[-1]["_peak"] = max(stack[-1]["_peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            record["_base"] = record["_peak"] = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        stack.append(record)
+        try:
+            yield record
+        finally:
+            stack.pop()
+            record["duration"] = time.perf_counter() - started
+            if self.memory:
+                record["_peak"] = max(record["_peak"], tracemalloc.get_traced_memory()[1])
+                record["peak_memory"] = record["_peak"] - record["_base"]
+                if stack:
+                    stack[-1]["_peak"] = max(stack[-1]["_peak"], record["_peak"])
+            with self._lock:
+                self.spans.append(record)
+
+    def count(self, name, n=1):
+        """
+        Add to a counter of the innermost span of the current thread.
+
+        Args:
+            name (str): counter name, like "F" (evaluations of the time derivative)
+            n (int): the value to add
+        """
+        stack = self._stack()
+        if stack:
+            counters = stack[-1]["counters"]
+            counters[name] = counters.get(name, 0) + n
+
+    def annotate(self, **kwargs):
+        """
+        Add values to "args" of the innermost span of the current thread.
+
+        Args:
+            kwargs: values, like the number of trials of the optimizer
+        """
+        stack = self._stack()
+        if stack:
+            stack[-1]["args"].update(kwargs)
+
+    def extend(self, spans):
+        """
+        Add spans recorded by another tracer, like the tracer of a worker process.
+
+        Args:
+            spans (list[dict]): spans of Tracer.records()
+        """
+        with self._lock:
+            self.spans.extend(spans)
+
+    def records(self):
+        """
+        Return the spans in the order of the start time.
+
+        Returns:
+            list[dict]: spans (refer to the note of Tracer)
+        """
+        spans = sorted(self.spans, key=lambda span: (span["pid"], span["start"]))
+        return [{k: v for (k, v) in span.items() if not k.startswith("_")} for span in spans]
+
+    def by_country(self):
+        """
+        Return the spans of each country.
+
+        Returns:
+            dict[str or None, list[dict]]: spans of each country, None for spans without countries
+        """
+        country_dict = {}
+        for span in self.records():
+            country_dict.setdefault(span["country"], []).append(span)
+        return country_dict
+
+    def to_json(self, filename=None):
+        """
+        Export the spans of each country as JSON.
+
+        Args:
+            filename (str or pathlib.Path or None): filename or None (return the string)
+
+        Returns:
+            str or None: JSON string when @filename is None
+        """
+        country_dict = {str(country): spans for (country, spans) in self.by_country().items()}
+        if filename is None:
+            return json.dumps(country_dict, indent=2, default=str)
+        with open(filename, "w", encoding="utf-8") as fh:
+            json.dump(country_dict, fh, indent=2, default=str)
+
+    def to_chrome_trace(self, filename=None):
+        """
+        Export the spans in Chrome trace event format, one track for each process/thread.
+
+        Args:
+            filename (str or pathlib.Path or None): filename or None (return the dict)
+
+        Returns:
+            dict or None: trace events when @filename is None
+        """
+        events = [
+            {
+                "name": span["name"],
+                "cat": span["country"] or "",
+                "ph": "X",
+                "ts": span["start"] * 1e6,
+                "dur": span["duration"] * 1e6,
+                "pid": span["pid"],
+                "tid": span["tid"],
+                "args": {
+                    "country": span["country"], **span["counters"], **span["args"],
+                    **({} if span["peak_memory"] is None else {"peak_memory": span["peak_memory"]}),
+                },
+            }
+            for span in self.records()
+        ]
+        trace = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if filename is None:
+            return trace
+        with open(filename, "w", encoding="utf-8") as fh:
+            json.dump(trace, fh, default=str)
+
+
+def enabled():
+    """
+    Return whether tracing is enabled.
+
+    Returns:
+        bool
+    """
+    return _tracer is not None
+
+
+def current():
+    """
+    Return the active tracer.
+
+    Returns:
+        Tracer or None: the tracer, or None (disabled)
+    """
+    return _tracer
+
+
+@contextlib.contextmanager
+def tracing(memory=False, tracer=None):
+    """
+    Enable tracing in the context.
+
+    Args:
+        memory (bool): if True, peak memory of each span is traced with tracemalloc
+        tracer (Tracer or None): tracer to add the spans to, or None (new tracer)
+
+    Yields:
+        Tracer: the active tracer
+    """
+    global _tracer
+    previous = _tracer
+    _tracer = tracer or Tracer(memory=memory)
+    started = _tracer.memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield _tracer
+    finally:
+        if started:
+            tracemalloc.stop()
+        _tracer = previous
+
+
+_null_span = contextlib.nullcontext()
+
+
+def span(name, country=None, **kwargs):
+    """
+    Record a span with the active tracer, refer to Tracer.span().
+
+    Returns:
+        contextlib.AbstractContextManager: context yielding the span, or None when tracing is disabled
+    """
+    if _tracer is None:
+        return _null_span
+    return _tracer.span(name, country=country, **kwargs)
+
+
+def count(name, n=1):
+    """
+    Add to a counter of the innermost span with the active tracer, refer to Tracer.count().
+    """
+    if _tracer is not None:
+        _tracer.count(name, n)
+
+
+def annotate(**kwargs):
+    """
+    Add values to the innermost span with the active tracer, refer to Tracer.annotate().
+    """
+    if _tracer is not None:
+        _tracer.annotate(**kwargs)
+
+
+def traced(name=None):
+    """
+    Decorator to record calls of a function as spans.
+
+    Args:
+        name (str or None): span name or None (function name)
+    """
+    def _decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(label):
+                return func(*args, **kwargs)
+        return _wrapper
+    return _decorator
+
+
+def counted(func, name):
+    """
+    Return a function which counts its calls with the active tracer, or @func itself when tracing is disabled.
+
+    Args:
+        func (callable): function, like the time derivative of the model
+        name (str): counter name
+
+    Note:
+        Use it where the function is passed to a solver, so that the function has no hook when tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return func
+
+    @functools.wraps(func)
+    def _wrapper(*args, **kwargs):
+        tracer.count(name)
+        return func(*args, **kwargs)
+    return _wrapper
@@ -0,0 +1,225 @@
+"""
+Population of the age groups of out_days() in all countries, as arrays.
+
+The table is built once from the population pyramid dataset and saved as a NumPy file. After that,
+go_out() of a country is a row lookup and the number of days people go out is a dot product,
+for many countries and many policies (days to go out of the age groups) at once.
+"""
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from covid_model.mobility import _out_days
+
+SETTINGS = ("School", "Office", "Others")
+
+
+def _band_populations(ages, populations, age_last):
+    """
+    Return the population of age groups, as go_out() does with cumsum and diff.
+
+    Args:
+        ages (numpy.ndarray): ages in ascending order
+        populations (numpy.ndarray): population of the ages
+        age_last (numpy.ndarray): the last ages of the groups
+
+    Returns:
+        numpy.ndarray: population of the groups
+    """
+    cumsum = np.concatenate([[0], np.cumsum(populations, dtype=np.int64)])
+    return np.diff(cumsum[np.searchsorted(ages, age_last, side="right")], prepend=0)
+
+
+def _total_days(days, settings=SETTINGS):
+    """
+    Return the total number of days to go out of age groups.
+
+    Args:
+        days (pandas.DataFrame or array_like or None): refer to PyramidTable.gs()
+        settings (tuple(str)): columns of the days to go out, when @days is a dataframe
+
+    Returns:
+        numpy.ndarray: total days with shape (n_groups,) or (n_policies, n_groups)
+    """
+    if days is None:
+        days = _out_days()
+    if isinstance(days, pd.DataFrame):
+        return days.loc[:, list(settings)].to_numpy(dtype=np.float64).sum(axis=1)
+    days = np.asarray(days, dtype=np.float64)
+    return days if days.ndim == 1 else days.sum(axis=-1)
+
+
+class PyramidTable(object):
+    """
+    Population of the age groups of out_days() in countries.
+
+    Args:
+        countries (list[str]): country names
+        populations (numpy.ndarray): population with shape (len(countries), the number of age groups)
+    """
+
+    def __init__(self, countries, populations):
+        self._countries = [str(country) for country in countries]
+        self._index = {country: k for (k, country) in enumerate(self._countries)}
+        self._populations = np.asarray(populations, dtype=np.int64)
+        totals = self._populations.sum(axis=1, keepdims=True)
+        self._portions = self._populations / np.where(totals > 0, totals, 1)
+        self._populations.flags.writeable = False
+        self._portions.flags.writeable = False
+        self._out_df = _out_days().assign(Age=lambda x: x["Age_last"])
+
+    @classmethod
+    def from_pyramid(cls, pyramid_data, countries):
+        """
+        Build the table with the population pyramid dataset.
+
+        Args:
+            pyramid_data (covsirphy.PopulationPyramidData): pyramid dataset
+            countries (list[str]): country names
+
+        Returns:
+            PyramidTable
+        """
+        age_last = _out_days()["Age_last"].to_numpy()
+        populations = np.empty((len(countries), len(age_last)), dtype=np.int64)
+        for (k, country) in enumerate(countries):
+            p_df = pyramid_data.subset(country).sort_values("Age")
+            populations[k] = _band_populations(
+                p_df["Age"].to_numpy(), p_df["Population"].to_numpy(dtype=np.int64), age_last)
+        return cls(countries, populations)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load the table saved with PyramidTable.save().
+
+        Args:
+            filename (str or pathlib.Path): NumPy file (.npz)
+
+        Returns:
+            PyramidTable
+        """
+        with np.load(filename, allow_pickle=False) as npz:
+            return cls(npz["countries"].tolist(), npz["populations"])
+
+    def save(self, filename):
+        """
+        Save the table as a NumPy file.
+
+        Args:
+            filename (str or pathlib.Path): NumPy file (.npz)
+        """
+        Path(filename).parent.mkdir(exist_ok=True, parents=True)
+        with Path(filename).open("wb") as fh:
+            np.savez(fh, countries=np.array(self._countries, dtype=str), populations=self._populations)
+
+    @property
+    def countries(self):
+        """
+        list[str]: country names
+        """
+        return self._countries[:]
+
+    @property
+    def populations(self):
+        """
+        numpy.ndarray: population of the age groups with shape (n_countries, n_groups), read-only
+        """
+        return self._populations
+
+    @property
+    def portions(self):
+        """
+        numpy.ndarray: portion of the age groups with shape (n_countries, n_groups), read-only
+        """
+        return self._portions
+
+    def __contains__(self, country):
+        return country in self._index
+
+    def rows(self, countries):
+        """
+        Return the row numbers of countries.
+
+        Args:
+            countries (str or list[str]): country name(s)
+
+        Returns:
+            int or numpy.ndarray: row number(s)
+        """
+        try:
+            if isinstance(countries, str):
+                return self._index[countries]
+            return np.array([self._index[country] for country in countries], dtype=np.intp)
+        except KeyError as e:
+            raise KeyError(f"{e.args[0]} is not registered in the pyramid table.") from None
+
+    def go_out(self, country):
+        """
+        Return the estimated number of days people usually go out, as covid_model.mobility.go_out().
+
+        Args:
+            country (str): country name
+
+        Returns:
+            pandas.DataFrame: out_days() with Age, Population and Portion columns
+        """
+        row = self.rows(country)
+        return self._out_df.assign(Population=self._populations[row], Portion=self._portions[row])
+
+    def gs(self, countries=None, days=None):
+        """
+        Return the number of days in a week susceptible people go out, weighted with the portion of age groups.
+
+        Args:
+            countries (str or list[str] or None): country name(s) or None (all countries)
+            days (pandas.DataFrame or array_like or None): days to go out of the age groups
+                - None: out_days()
+                - pandas.DataFrame: with School, Office and Others columns, like go_out()
+                - array with shape (n_groups,): total days
+                - array with shape (n_groups, n_settings): days of the settings
+                - array with shape (n_policies, n_groups, n_settings): days of policies
+
+        Returns:
+            float or numpy.ndarray: values with shape (n_countries,), (n_policies,) or (n_countries, n_policies)
+                the dimension of countries is removed when @countries is a str
+
+        Note:
+            This is (out_df[["School", "Office", "Others"]].sum(axis=1) * out_df["Portion"]).sum() of the notebook.
+        """
+        portions = self._portions if countries is None else self._portions[self.rows(countries)]
+        totals = _total_days(days)
+        return portions @ totals.T
+
+
+def load_pyramid(filename="kaggle/input/pyramid.npz", pyramid_data=None, countries=None, force=False):
+    """
+    Return the pyramid table, using the saved file and adding the countries which are not saved.
+
+    Args:
+        filename (str or pathlib.Path): NumPy file (.npz) to save the table
+        pyramid_data (covsirphy.PopulationPyramidData or None): pyramid dataset, required to build the table
+        countries (list[str] or None): country names or None (all countries of the saved table)
+        force (bool): if True, the table is always built with @pyramid_data and the file is over-written
+
+    Returns:
+        PyramidTable
+    """
+    table = PyramidTable.load(filename) if not force and Path(filename).exists() else None
+    if table is not None:
+        missing = [country for country in countries or [] if country not in table]
+        if not missing:
+            return table
+    elif countries is None:
+        raise ValueError("@countries must be applied when the pyramid table has not been saved.")
+    else:
+        missing = list(countries)
+    if pyramid_data is None:
+        raise ValueError(f"@pyramid_data must be applied to add {missing} to the pyramid table.")
+    # Only the missing countries are retrieved from the dataset
+    added = PyramidTable.from_pyramid(pyramid_data, missing)
+    if table is not None:
+        added = PyramidTable([*table.countries, *added.countries], np.vstack([table.populations, added.populations]))
+    added.save(filename)
+    return added
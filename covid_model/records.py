@@ -0,0 +1,195 @@
+"""
+Indexed view of the records, so that subsets and totals are not searched with boolean masks each time.
+
+The records are sorted by (Country, Province, Date) once, and the rows of each area are sliced with offsets.
+"""
+
+import numpy as np
+import pandas as pd
+
+AREA_COLS = ["ISO3", "Country", "Province"]
+VALUE_COLS = ["Confirmed", "Infected", "Fatal", "Recovered"]
+RATE_COLS = ["Fatal per Confirmed", "Recovered per Confirmed", "Fatal per (Fatal or Recovered)"]
+UNKNOWN = "-"
+
+
+class RecordIndex(object):
+    """
+    Records sorted by area and date with offsets of the areas.
+
+    Args:
+        data (covsirphy.JHUData or pandas.DataFrame): records or cleaned records
+            Index
+                reset index
+            Columns
+                - Date (pandas.Timestamp): observation date
+                - Country, Province (str or pandas.Category): area names ("-" for country level)
+                - Confirmed, Infected, Fatal, Recovered (int): the number of cases
+                - ISO3, Population (int): optional
+
+    Note:
+        Derived views (cleaned(), total(), group_total()) are memoized and cleared by update().
+    """
+
+    def __init__(self, data):
+        self.update(data)
+
+    def update(self, data):
+        """
+        Set new records and clear the memoized views.
+
+        Args:
+            data (covsirphy.JHUData or pandas.DataFrame): records or cleaned records
+        """
+        df = data.cleaned() if hasattr(data, "cleaned") else data
+        df = df.sort_values(["Country", "Province", "Date"], kind="stable", ignore_index=True)
+        self._df = df
+        self._memo = {}
+        # Offsets of (Country, Province) and Country, rows of an area are contiguous after sorting
+        countries, provinces = df["Country"].astype(str).to_numpy(), df["Province"].astype(str).to_numpy()
+        new = np.ones(len(df), dtype=bool)
+        new[1:] = (countries[1:] != countries[:-1]) | (provinces[1:] != provinces[:-1])
+        starts = np.flatnonzero(new)
+        stops = np.append(starts[1:], len(df))
+        self._offsets = {
+            (countries[start], provinces[start]): (start, stop) for (start, stop) in zip(starts, stops)}
+        self._country_offsets = {}
+        for (country, _), (start, stop) in self._offsets.items():
+            first, _ = self._country_offsets.get(country, (start, stop))
+            self._country_offsets[country] = (first, stop)
+        if "ISO3" in df.columns:
+            self._iso3_dict = dict(zip(df["ISO3"].astype(str).to_numpy()[starts], countries[starts]))
+        else:
+            self._iso3_dict = {}
+
+    def _memoize(self, key, func):
+        if key not in self._memo:
+            self._memo[key] = func()
+        return self._memo[key]
+
+    def countries(self):
+        """
+        Return the country names.
+
+        Returns:
+            list[str]: country names, sorted
+        """
+        return sorted(self._country_offsets)
+
+    def cleaned(self):
+        """
+        Return the records sorted by Country, Province and Date.
+
+        Returns:
+            pandas.DataFrame: as covsirphy.JHUData.cleaned(), but sorted
+
+        Note:
+            This is a shallow copy: with copy-on-write of pandas, changes made by the caller do not change the index.
+        """
+        return self._df.copy(deep=False)
+
+    def area(self, country, province=None):
+        """
+        Return the start/stop row numbers of an area.
+
+        Args:
+            country (str): country name or ISO3 code
+            province (str or None): province name, None means country level records
+
+        Returns:
+            tuple(int, int): start (included) and stop (excluded) row numbers of cleaned()
+        """
+        country = self._iso3_dict.get(country, country) if country not in self._country_offsets else country
+        try:
+            return self._offsets[(country, province or UNKNOWN)]
+        except KeyError:
+            raise ValueError(f"No records were found for country={country}, province={province}.") from None
+
+    def subset(self, country, province=None, start_date=None, end_date=None):
+        """
+        Return the records of an area without copying them.
+
+        Args:
+            country (str): country name or ISO3 code
+            province (str or None): province name, None means country level records
+            start_date (str or None): start date, like 22Jan2020
+            end_date (str or None): end date, like 01Feb2020
+
+        Returns:
+            pandas.DataFrame
+                Index
+                    reset index
+                Columns
+                    without ISO3, Country, Province column, as covsirphy.CleaningBase.subset()
+
+        Note:
+            Unlike covsirphy.JHUData.subset(), the records with Recovered = 0 are included
+            and Susceptible is not calculated.
+        """
+        start, stop = self.area(country, province)
+        dates = self._df["Date"].to_numpy()[start:stop]
+        if start_date is not None:
+            start += np.searchsorted(dates, pd.to_datetime(start_date, format="%d%b%Y").to_datetime64(), side="left")
+        if end_date is not None:
+            stop -= len(dates) - np.searchsorted(
+                dates, pd.to_datetime(end_date, format="%d%b%Y").to_datetime64(), side="right")
+        df = self._df.iloc[start:stop]
+        return df.drop([col for col in AREA_COLS if col in df.columns], axis=1).reset_index(drop=True)
+
+    def total(self):
+        """
+        Calculate total number of cases and rates.
+
+        Returns:
+            pandas.DataFrame: as covsirphy.JHUData.total()
+                Index
+                    Date (pandas.Timestamp): observation date
+                Columns
+                    - Confirmed, Infected, Fatal, Recovered (int): the number of cases
+                    - Fatal per Confirmed, Recovered per Confirmed, Fatal per (Fatal or Recovered) (float)
+        """
+        return self._memoize("total", self._total).copy(deep=False)
+
+    def _total(self):
+        ranges = [offset for ((_, province), offset) in self._offsets.items() if province == UNKNOWN]
+        df = self._df.iloc[_rows(ranges)].groupby("Date")[VALUE_COLS].sum()
+        df[RATE_COLS[0]] = df["Fatal"] / df["Confirmed"]
+        df[RATE_COLS[1]] = df["Recovered"] / df["Confirmed"]
+        df[RATE_COLS[2]] = df["Fatal"] / (df["Fatal"] + df["Recovered"])
+        return df
+
+    def group_total(self, groups, group):
+        """
+        Return the total values of the countries of a group.
+
+        Args:
+            groups (pandas.Series): group names indexed by country names, like growth_df["Group"]
+            group (str): group name
+
+        Returns:
+            pandas.DataFrame: index Date, columns Confirmed, Infected, Fatal and Recovered (int)
+
+        Note:
+            All records of the countries are summed, including province level records,
+            as the merged dataframe with "Group" column of the notebook.
+        """
+        key = ("group_total", tuple(groups.astype(str).items()))
+        group_df = self._memoize(key, lambda: self._group_total(groups))
+        if group not in group_df.index.get_level_values(0):
+            return pd.DataFrame(columns=VALUE_COLS, index=pd.DatetimeIndex([], name="Date"), dtype=np.int64)
+        return group_df.loc[group].copy(deep=False)
+
+    def _group_total(self, groups):
+        group_dict = groups.astype(str).to_dict()
+        countries = [country for country in self._country_offsets if country in group_dict]
+        ranges = [self._country_offsets[country] for country in countries]
+        df = self._df.iloc[_rows(ranges)].loc[:, ["Date", *VALUE_COLS]]
+        df.insert(0, "Group", np.repeat([group_dict[country] for country in countries], [b - a for (a, b) in ranges]))
+        return df.groupby(["Group", "Date"])[VALUE_COLS].sum()
+
+
+def _rows(ranges):
+    """
+    Return the row numbers of the (start, stop) ranges.
+    """
+    return np.concatenate([np.arange(start, stop, dtype=np.int64) for (start, stop) in ranges] or [[]]).astype(np.int64)
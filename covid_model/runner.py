@@ -0,0 +1,270 @@
+"""
+Scenario analysis of many countries with CovsirPhy in a pool of processes.
+
+Each country runs register -> trend -> estimate -> add -> simulate,
+as the Italy/Japan/China/US sections of the notebook do one after another.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import contextlib
+import time
+import pandas as pd
+from covid_model import profiling
+from covid_model.cache import estimate_with_cache
+from covid_model.incremental import refresh
+
+# Datasets shared by all tasks of a worker process, set once by _init_worker()
+_shared = {}
+
+
+def _init_worker(jhu_data, population_data):
+    """
+    Keep the datasets in the worker process, so that they are not pickled for each task.
+    """
+    _shared["jhu_data"] = jhu_data
+    _shared["population_data"] = population_data
+
+
+def _run_pool(task, countries, args_dict, jhu_data, population_data, processes, results):
+    """
+    Run a task of each country in a new pool of processes, adding the results to @results.
+
+    Returns:
+        list[str]: countries not finished because a worker process died and broke the pool
+    """
+    broken = set()
+    with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(jhu_data, population_data)) as executor:
+        futures = {executor.submit(task, *args_dict[country]): country for country in countries}
+        for future in as_completed(futures):
+            country = futures[future]
+            try:
+                results[country] = future.result()
+            except BrokenProcessPool as e:
+                broken.add(country)
+                results[country] = e
+            except Exception as e:
+                results[country] = e
+    return [country for country in countries if country in broken]
+
+
+def _map_countries(task, args_dict, jhu_data, population_data, processes=None):
+    """
+    Run task(*args) of each country in a pool of processes.
+
+    Args:
+        task (callable): function run in the worker processes, with the datasets in _shared
+        args_dict (dict[str, tuple]): arguments of @task of each country
+        jhu_data (covsirphy.JHUData): records
+        population_data (covsirphy.PopulationData): population values
+        processes (int or None): the number of worker processes, None means the number of CPUs
+
+    Returns:
+        dict[str, object]: the return value of @task of each country, or the exception when it failed
+
+    Note:
+        A worker process which dies (e.g. out of memory) breaks the pool, and all the countries not finished fail.
+        Then the pool is rebuilt and only the countries not finished are submitted again.
+        If it breaks again, the remaining countries are run one by one in a pool of a single process,
+        so that only the country which kills its worker fails.
+    """
+    results = {}
+    countries = _run_pool(task, list(args_dict), args_dict, jhu_data, population_data, processes, results)
+    if countries:
+        countries = _run_pool(task, countries, args_dict, jhu_data, population_data, processes, results)
+    for country in countries:
+        _run_pool(task, [country], args_dict, jhu_data, population_data, 1, results)
+    return results
+
+
+def run_country(country, jhu_data, population_data, model=None, timeout=120, days=30, tail=7,
+                cache=None, previous_df=None, phases=None, trend_cache=None, **kwargs):
+    """
+    Run scenario analysis of a country.
+
+    Args:
+        country (str): country name
+        jhu_data (covsirphy.JHUData): records
+        population_data (covsirphy.PopulationData): population values
+        model (covsirphy.ModelBase or None): ODE model, None means covsirphy.SIRF
+        timeout (int): timeout of estimation of each phase [sec]
+        days (int): the number of days to simulate after the last record
+        tail (int): the number of the last simulated dates to return
+        cache (covid_model.cache.EstimateCache or None): cache of the estimates, or None (not used)
+        previous_df (pandas.DataFrame or None): summary of the last run to refresh incrementally, or None
+        phases (list[tuple(str, str)] or pandas.DataFrame or None): phases of covid_model.trend.detect_phases()
+            to use instead of S-R trend analysis, or None
+        trend_cache (covid_model.trend.PhaseCache or None): cache of the phases of S-R trend analysis, or None
+        kwargs: the other keyword arguments of covsirphy.Scenario.estimate()
+
+    Returns:
+        tuple(pandas.DataFrame, pandas.DataFrame): summary of phases and the last simulated records
+
+    Note:
+        With covid_model.profiling.tracing(), the stages (register, trend, estimate and simulate) are recorded
+        as spans of the country, with the trials and the runtime of the optimizer of each phase.
+    """
+    import covsirphy as cs
+    from covid_model.trend import apply_phases, trend_with_cache
+
+    with profiling.span("run_country", country=country):
+        with profiling.span("register"):
+            scenario = cs.Scenario(country=country)
+            scenario.register(jhu_data, population_data)
+        if previous_df is not None:
+            refresh(scenario, model or cs.SIRF, previous_df, timeout=timeout, **kwargs)
+        else:
+            with profiling.span("trend"):
+                if phases is None:
+                    trend_with_cache(scenario, country, trend_cache)
+                else:
+                    apply_phases(scenario, phases)
+            with profiling.span("estimate"):
+                if cache is None:
+                    scenario.estimate(model or cs.SIRF, timeout=timeout, **kwargs)
+                else:
+                    estimate_with_cache(scenario, country, model or cs.SIRF, cache, timeout=timeout, **kwargs)
+        summary_df = scenario.summary()
+        if profiling.enabled():
+            _trace_phases(summary_df)
+        with profiling.span("simulate"):
+            scenario.clear()
+            scenario.add(days=days)
+            sim_df = scenario.simulate(show_figure=False).tail(tail)
+    return summary_df, sim_df
+
+
+def _trace_phases(summary_df):
+    """
+    Record the trials and the runtime of the optimizer of each phase, as shown by Scenario.summary().
+    """
+    columns = [col for col in ("Trials", "Runtime", "RMSLE") if col in summary_df]
+    phase_dict = summary_df[columns].astype(str).to_dict("index")
+    profiling.annotate(phases=phase_dict)
+
+
+def _run_task(country, previous_df, kwargs, trace=None):
+    """
+    Run scenario analysis of a country in a worker process.
+
+    Args:
+        trace (dict or None): keyword arguments of covid_model.profiling.tracing(), or None (not traced)
+
+    Returns:
+        tuple(pandas.DataFrame or None, pandas.DataFrame or None, float, str or None, list[dict]):
+            summary, simulated records, elapsed time [sec], error message and spans of the country
+    """
+    with (profiling.tracing(**trace) if trace is not None else contextlib.nullcontext()) as tracer:
+        start = time.perf_counter()
+        try:
+            summary_df, sim_df = run_country(
+                country, _shared["jhu_data"], _shared["population_data"], previous_df=previous_df, **kwargs)
+            error = None
+        except Exception as e:
+            summary_df, sim_df, error = None, None, f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+    return summary_df, sim_df, elapsed, error, ([] if tracer is None else tracer.records())
+
+
+def _combine(country, summary_df, sim_df, elapsed, error):
+    """
+    Convert the result of a country to rows of the output of run_countries().
+    """
+    if error is not None:
+        return pd.DataFrame({"Country": [country], "Section": ["error"], "Elapsed": [elapsed], "Error": [error]})
+    summary_df = summary_df.rename_axis("Phase").reset_index()
+    summary_df.insert(0, "Section", "summary")
+    summary_df.insert(0, "Country", country)
+    sim_df = sim_df.drop("Country", axis=1, errors="ignore")
+    sim_df.insert(0, "Section", "simulation")
+    sim_df.insert(0, "Country", country)
+    df = pd.concat([summary_df, sim_df], ignore_index=True, sort=False)
+    df.insert(2, "Elapsed", elapsed)
+    df.insert(3, "Error", None)
+    return df
+
+
+def run_countries(countries, jhu_data, population_data, processes=None, previous_dict=None, phase_df=None,
+                  **kwargs):
+    """
+    Run scenario analysis of the countries in parallel.
+
+    Args:
+        countries (list[str]): country names
+        jhu_data (covsirphy.JHUData): records
+        population_data (covsirphy.PopulationData): population values
+        processes (int or None): the number of worker processes, None means the number of CPUs
+        previous_dict (dict[str, pandas.DataFrame] or None): summaries of the last run, as returned by summaries(),
+            the countries included are refreshed incrementally (refer to covid_model.incremental.refresh())
+        phase_df (pandas.DataFrame or None): phases returned by covid_model.trend.detect_phases(),
+            used instead of S-R trend analysis for the countries included
+        kwargs: keyword arguments of run_country(), like model, timeout, days, cache and trend_cache
+
+    Returns:
+        pandas.DataFrame:
+            Index
+                reset index
+            Columns
+                - Country (str): country name
+                - Section (str): "summary" (phases), "simulation" (the last simulated dates) or "error"
+                - Elapsed (float): runtime of the country [sec]
+                - Error (str or None): error message when the country failed
+                - Phase (str): phase name of summary rows
+                - columns of Scenario.summary() and Scenario.simulate()
+
+    Note:
+        @jhu_data and @population_data are sent once to each worker process, not with each country.
+
+    Note:
+        A failed country does not stop the others, it is returned as an "error" row.
+        When a worker process dies, the countries not finished are run again (refer to _map_countries()).
+
+    Note:
+        Optimization of each country runs with a single CPU (n_jobs=1) unless specified,
+        because the countries themselves are run in parallel.
+
+    Note:
+        When tracing is enabled with covid_model.profiling.tracing(), the countries are traced in the worker processes
+        and their spans are added to the active tracer.
+    """
+    kwargs.setdefault("n_jobs", 1)
+    tracer = profiling.current()
+    trace = None if tracer is None else {"memory": tracer.memory}
+    phase_dict = {} if phase_df is None else {
+        country: df for (country, df) in phase_df.loc[phase_df["Error"].isna()].groupby("Country")}
+    args_dict = {
+        country: (
+            country, (previous_dict or {}).get(country),
+            {**kwargs, "phases": phase_dict[country]} if country in phase_dict else kwargs, trace)
+        for country in countries
+    }
+    results = {}
+    for (country, result) in _map_countries(_run_task, args_dict, jhu_data, population_data, processes).items():
+        if isinstance(result, Exception):
+            # The worker process itself died, e.g. out of memory
+            results[country], spans = (None, None, float("nan"), f"{type(result).__name__}: {result}"), []
+        else:
+            *results[country], spans = result
+        if tracer is not None:
+            tracer.extend(spans)
+    dataframes = [_combine(country, *results[country]) for country in countries]
+    return pd.concat(dataframes, ignore_index=True, sort=False)
+
+
+def summaries(country_df):
+    """
+    Return the summaries of the countries from the output of run_countries().
+
+    Args:
+        country_df (pandas.DataFrame): output of run_countries()
+
+    Returns:
+        dict[str, pandas.DataFrame]: summary of phases (as Scenario.summary()) of the succeeded countries
+    """
+    df = country_df.loc[country_df["Section"] == "summary"]
+    df = df.drop(["Section", "Elapsed", "Error"], axis=1).set_index("Phase")
+    return {
+        country: country_df.drop("Country", axis=1).dropna(how="all", axis=1)
+        for (country, country_df) in df.groupby("Country")
+    }
@@ -0,0 +1,142 @@
+"""
+Time paths of R0, evaluated on whole arrays of time instead of one call per step.
+"""
+
+import numpy as np
+from numpy import exp
+
+
+# η is the speed at which restrictions are imposed
+def R0_mitigating(t, r0=3, η=1, r_bar=1.6):
+    R0 = r0 * exp(- η * t) + (1 - exp(- η * t)) * r_bar
+    return R0
+
+
+class RSchedule(object):
+    """
+    Base class of R(t) schedules.
+
+    Note:
+        Sub-classes are callable with a scalar or an array of times,
+        so they can be used as @R0 of F(), solve_path() and integrate().
+    """
+    # Times where R(t) is discontinuous
+    breakpoints = ()
+
+    def __call__(self, t):
+        raise NotImplementedError
+
+    def tabulate(self, t_vec):
+        """
+        Evaluate the schedule once on a time grid.
+
+        Args:
+            t_vec (numpy.ndarray): time grid
+
+        Returns:
+            covid_model.RSchedule: schedule interpolating the values on the grid
+        """
+        return Tabulated(t_vec, self(np.asarray(t_vec, dtype=np.float64)))
+
+    def segments(self, t_start, t_end):
+        """
+        Split the range of time at the breakpoints.
+
+        Args:
+            t_start (float): start time
+            t_end (float): end time
+
+        Returns:
+            list[tuple(float, float, float or callable)]: start, end and R0 of the segments,
+                R0 is a float when R(t) is constant in the segment
+        """
+        inner = [b for b in self.breakpoints if t_start < b < t_end]
+        edges = [t_start, *inner, t_end]
+        return [(start, end, self) for (start, end) in zip(edges[:-1], edges[1:])]
+
+
+class Constant(RSchedule):
+    """
+    Constant R0.
+
+    Args:
+        value (float): value of R0
+    """
+
+    def __init__(self, value):
+        self.value = float(value)
+
+    def __call__(self, t):
+        return np.full_like(t, self.value, dtype=np.float64) if np.ndim(t) else self.value
+
+    def tabulate(self, t_vec):
+        return self
+
+    def segments(self, t_start, t_end):
+        return [(t_start, t_end, self.value)]
+
+
+class Mitigating(RSchedule):
+    """
+    R0 decreasing exponentially from r0 to r_bar, refer to R0_mitigating().
+
+    Args:
+        r0 (float): initial value
+        η (float): speed at which restrictions are imposed
+        r_bar (float): long run value
+    """
+
+    def __init__(self, r0=3, η=1, r_bar=1.6):
+        self.r0, self.η, self.r_bar = r0, η, r_bar
+
+    def __call__(self, t):
+        return R0_mitigating(t, r0=self.r0, η=self.η, r_bar=self.r_bar)
+
+
+class Step(RSchedule):
+    """
+    Piecewise-constant R0, like lockdowns.
+
+    Args:
+        breakpoints (list[float]): times when R0 changes, in ascending order
+        values (list[float]): values of R0, one more than the breakpoints
+
+    Note:
+        Step((30,), (0.5, 2)) is the same as lambda t: 0.5 if t < 30 else 2.
+    """
+
+    def __init__(self, breakpoints, values):
+        if len(values) != len(breakpoints) + 1:
+            raise ValueError(
+                f"@values must have {len(breakpoints) + 1} elements, but {len(values)} were applied.")
+        self.breakpoints = tuple(float(b) for b in breakpoints)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    def __call__(self, t):
+        return self.values[np.searchsorted(self.breakpoints, t, side="right")]
+
+    def tabulate(self, t_vec):
+        return self
+
+    def segments(self, t_start, t_end):
+        return [(start, end, float(self((start + end) / 2))) for (start, end, _) in super().segments(t_start, t_end)]
+
+
+class Tabulated(RSchedule):
+    """
+    R0 linearly interpolated from values on a time grid.
+
+    Args:
+        t_vec (numpy.ndarray): time grid in ascending order
+        values (numpy.ndarray): values of R0 on the grid
+    """
+
+    def __init__(self, t_vec, values):
+        self.t_vec = np.asarray(t_vec, dtype=np.float64)
+        self.values = np.broadcast_to(np.asarray(values, dtype=np.float64), self.t_vec.shape)
+
+    def __call__(self, t):
+        return np.interp(t, self.t_vec, self.values)
+
+    def tabulate(self, t_vec):
+        return self
@@ -0,0 +1,362 @@
+"""
+SEIR model of the first section of the notebook.
+
+refer to https://python.quantecon.org/sir_model.html from Thomas J. Sargent & John Stachurski
+"""
+
+import numpy as np
+
+from covid_model import profiling
+from covid_model.integrators import rk4, seir_kernel, schedule_grid
+from covid_model.schedules import R0_mitigating, RSchedule
+
+pop_size = 3.3e8
+γ = 1 / 18 #recovery rate
+σ = 1 / 5.2 #infection rate
+
+def F(x, t, R0=1.6):
+    """
+    Time derivative of the state vector.
+
+        * x is the state vector (array_like)
+        * t is time (scalar)
+        * R0 is the effective transmission rate, defaulting to a constant
+
+    """
+    s, e, i = x
+
+    # New exposure of susceptibles
+    β = R0(t) * γ if callable(R0) else R0 * γ # model the transmission rate
+
+    # Time derivatives
+    ds = - β * s * i
+    de = β * s * i - σ * e
+    di = σ * e - γ * i
+
+    return ds, de, di
+
+i_0 = 1e-7
+e_0 = 4 * i_0
+s_0 = 1 - i_0 - e_0
+
+x_0 = s_0, e_0, i_0
+
+def F_vec(x, R0, γ=γ, σ=σ):
+    """
+    Time derivative of the state array for a value of R0 computed ahead of time.
+
+        * x is the state array with shape (3,) or (3, n_scenarios)
+        * R0 is the value(s) of the transmission rate at that time
+        * γ and σ are the rates, scalars or arrays with shape (n_scenarios,)
+
+    """
+    s, e, i = x
+    new_exposed = R0 * γ * s * i
+    return np.array((- new_exposed, new_exposed - σ * e, σ * e - γ * i))
+
+METHODS = ("odeint", "rk4", "rk45")
+
+def integrate(R0, t_vec, x_init=x_0, method="odeint"):
+    """
+    Solve for s(t), e(t) and i(t) via numerical integration,
+    given the time path for R0.
+
+    Args:
+        R0 (float or callable or covid_model.RSchedule): constant R0 or a function of time
+        t_vec (numpy.ndarray): time grid
+        x_init (array_like): initial state
+        method (str): integration backend
+            - "odeint": adaptive LSODA of scipy, R0 is called at every evaluation of F
+            - "rk4": fixed-step Runge-Kutta on t_vec, R0 is evaluated once on the grid
+            - "rk45": adaptive Runge-Kutta (Dormand-Prince) of scipy.integrate.solve_ivp(), sampled on t_vec
+
+    Returns:
+        numpy.ndarray: paths of s, e and i with shape (3, len(t_vec))
+
+    Note:
+        With RSchedule, integration is split at the breakpoints of the schedule,
+        and piecewise-constant segments are solved with a constant R0.
+    """
+    if isinstance(R0, RSchedule):
+        return _integrate_segments(R0, t_vec, x_init, method)
+    return _integrate(R0, t_vec, x_init, method)
+
+def _integrate(R0, t_vec, x_init, method):
+    """
+    Run the integration backend on a single segment.
+    """
+    if method == "odeint":
+        from scipy.integrate import odeint
+        G = profiling.counted(lambda x, t: F(x, t, R0), "F")
+        return odeint(G, x_init, t_vec).transpose()
+    if method == "rk4":
+        return _integrate_rk4(R0, t_vec, np.asarray(x_init, dtype=np.float64)[:, np.newaxis])[:, 0, :]
+    if method == "rk45":
+        return _integrate_rk45(lambda t, x: F(x, t, R0), t_vec, x_init)
+    raise ValueError(f"@method must be one of {METHODS}, but {method} was applied.")
+
+def _integrate_segments(schedule, t_vec, x_init, method):
+    """
+    Integrate segment by segment, restarting at the breakpoints of the schedule.
+    """
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+    paths = np.empty((3, len(t_vec)))
+    x = np.asarray(x_init, dtype=np.float64)
+    for (start, end, R0) in schedule.segments(t_vec[0], t_vec[-1]):
+        inside = (t_vec >= start) & (t_vec <= end)
+        t_seg = np.unique(np.concatenate(([start], t_vec[inside], [end])))
+        seg_paths = _integrate(R0, t_seg, x, method)
+        paths[:, inside] = seg_paths[:, np.isin(t_seg, t_vec[inside])]
+        x = seg_paths[:, -1]
+    return paths
+
+def _integrate_rk45(G, t_vec, x_init):
+    """
+    Run adaptive RK45 of scipy and return the states on t_vec with shape (len(x_init), len(t_vec)).
+    """
+    from scipy.integrate import solve_ivp
+
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+    sol = solve_ivp(
+        G, (t_vec[0], t_vec[-1]), np.asarray(x_init, dtype=np.float64), method="RK45", t_eval=t_vec,
+        rtol=1e-6, atol=1e-12)
+    profiling.count("F", sol.nfev)
+    if not sol.success:
+        raise RuntimeError(f"Integration with RK45 failed: {sol.message}")
+    return sol.y
+
+def _integrate_rk4(R0, t_vec, x_init, γ=γ, σ=σ):
+    """
+    Run the fixed-step Runge-Kutta backend for initial states with shape (3, n_scenarios).
+    The compiled kernel is used when numba is installed.
+    γ and σ may be arrays with shape (n_scenarios,).
+
+    Returns:
+        numpy.ndarray: paths with shape (3, n_scenarios, len(t_vec))
+    """
+    t_vec = np.asarray(t_vec, dtype=np.float64)
+    n = x_init.shape[1]
+    R = schedule_grid(R0, t_vec, n=n)
+    γ, σ = (np.ascontiguousarray(np.broadcast_to(np.asarray(v, dtype=np.float64), (n,))) for v in (γ, σ))
+    profiling.count("F", 4 * (len(t_vec) - 1))
+    rk4_seir = seir_kernel()
+    if rk4_seir is None:
+        paths = rk4(lambda x, r: F_vec(x, r, γ=γ, σ=σ), x_init, t_vec, R)
+    else:
+        paths = rk4_seir(np.ascontiguousarray(x_init), t_vec, np.ascontiguousarray(R), γ, σ)
+    return paths.transpose(1, 2, 0)
+
+@profiling.traced()
+def solve_path(R0, t_vec, x_init=x_0, method="odeint", summary=False, thresholds=()):
+    """
+    Solve for i(t) and c(t) via numerical integration,
+    given the time path for R0.
+
+    For the points of an adaptive solver instead of t_vec, use solve_adaptive().
+
+    With summary=True, the paths are not stored and a dict of the peak, the final values
+    and the times when c(t) reaches @thresholds is returned instead (refer to covid_model.events.summarize()).
+    The Runge-Kutta method is used on t_vec, so @method must be the default value.
+
+    """
+    if summary:
+        from covid_model.events import summarize
+        if method != "odeint":
+            raise ValueError(f"@method must be odeint (default) with summary=True, but {method} was applied.")
+        return {name: values[0] for (name, values) in summarize(R0, t_vec, x_init, thresholds=thresholds).items()}
+    s_path, e_path, i_path = integrate(R0, t_vec, x_init=x_init, method=method)
+
+    c_path = 1 - s_path - e_path       # cumulative cases
+    return i_path, c_path,
+
+class AdaptivePath(object):
+    """
+    Solution of solve_adaptive() on the points chosen by the adaptive solver.
+
+    Args:
+        segments (list[tuple(numpy.ndarray, numpy.ndarray, scipy.integrate.OdeSolution or None)]):
+            times, states with shape (3, n_points) and the dense output of the segments
+
+    Note:
+        The points are as many as the tolerance requires, dense in the growth and around breakpoints of R0,
+        sparse in the flat tails. With dense=True, the paths can also be sampled at any time with the instance.
+    """
+
+    def __init__(self, segments):
+        # The first point of a segment is the last point of the previous segment
+        self.t = np.concatenate([segments[0][0], *(t[1:] for (t, _, _) in segments[1:])])
+        self.x = np.concatenate([segments[0][1], *(x[:, 1:] for (_, x, _) in segments[1:])], axis=1)
+        self._ends = np.array([t[-1] for (t, _, _) in segments])
+        self._dense = [sol for (_, _, sol) in segments]
+
+    @property
+    def i_path(self):
+        """
+        numpy.ndarray: i(t) on the points of the solver
+        """
+        return self.x[2]
+
+    @property
+    def c_path(self):
+        """
+        numpy.ndarray: c(t) (cumulative cases) on the points of the solver
+        """
+        return 1 - self.x[0] - self.x[1]
+
+    def __call__(self, t):
+        """
+        Evaluate the states with the dense output.
+
+        Args:
+            t (float or numpy.ndarray): time(s) in the range of the solution
+
+        Returns:
+            numpy.ndarray: s, e and i with shape (3,) or (3, len(t))
+        """
+        if any(sol is None for sol in self._dense):
+            raise ValueError("Dense output is not available. Please set dense=True with solve_adaptive().")
+        t = np.asarray(t, dtype=np.float64)
+        index = np.minimum(np.searchsorted(self._ends, t, side="left"), len(self._ends) - 1)
+        if t.ndim == 0:
+            return self._dense[int(index)](t)
+        values = np.empty((3, len(t)))
+        for k in np.unique(index):
+            values[:, index == k] = self._dense[k](t[index == k])
+        return values
+
+    def sample(self, t_vec):
+        """
+        Return i(t) and c(t) on a grid, as solve_path() does.
+
+        Args:
+            t_vec (numpy.ndarray): time grid
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): i_path and c_path with shape (len(t_vec),)
+        """
+        s_path, e_path, i_path = self(t_vec)
+        return i_path, 1 - s_path - e_path
+
+
+@profiling.traced()
+def solve_adaptive(R0, t_span=(0, 550), x_init=x_0, rtol=1e-6, atol=1e-9, dense=False, solver="LSODA"):
+    """
+    Solve for s(t), e(t) and i(t) on the points chosen by an adaptive solver, instead of a fixed grid.
+
+    Args:
+        R0 (float or callable or covid_model.RSchedule): constant R0 or a function of time
+        t_span (tuple(float, float)): start and end time
+        x_init (array_like): initial state
+        rtol (float): relative tolerance, larger values return fewer points
+        atol (float): absolute tolerance, compared with the fractions of the population
+        dense (bool): if True, keep the dense output to sample the paths at any time
+        solver (str): method of scipy.integrate.solve_ivp(), like "LSODA", "RK45" and "DOP853"
+
+    Returns:
+        AdaptivePath: the points of the solver with .t, .i_path and .c_path
+
+    Note:
+        With RSchedule, integration is split at the breakpoints of the schedule as integrate() does,
+        so the solver restarts with small steps at a lockdown switch.
+    """
+    from scipy.integrate import solve_ivp
+
+    if isinstance(R0, RSchedule):
+        segments = R0.segments(*t_span)
+    else:
+        segments = [(t_span[0], t_span[1], R0)]
+    x = np.asarray(x_init, dtype=np.float64)
+    results = []
+    for (start, end, R_seg) in segments:
+        sol = solve_ivp(
+            lambda t, x: F(x, t, R_seg), (start, end), x, method=solver, rtol=rtol, atol=atol, dense_output=dense)
+        profiling.count("F", sol.nfev)
+        if not sol.success:
+            raise RuntimeError(f"Integration from t={start} to t={end} failed: {sol.message}")
+        results.append((sol.t, sol.y, sol.sol))
+        x = sol.y[:, -1]
+    return AdaptivePath(results)
+
+def F_batch(x, t, R0):
+    """
+    Time derivative of a stack of state vectors, one row per scenario.
+
+        * x is the flattened (n_scenarios, 3) state vector
+        * t is time (scalar)
+        * R0 is an array of n_scenarios transmission rates,
+          or a callable returning one for time t
+
+    """
+    x = x.reshape(-1, 3)
+    s, e, i = x[:, 0], x[:, 1], x[:, 2]
+
+    β = (R0(t) if callable(R0) else R0) * γ
+    new_exposed = β * s * i
+
+    dx = np.empty_like(x)
+    dx[:, 0] = - new_exposed
+    dx[:, 1] = new_exposed - σ * e
+    dx[:, 2] = σ * e - γ * i
+    return dx.ravel()
+
+@profiling.traced()
+def solve_paths(R0, t_vec, η=None, r_bar=1.6, x_init=x_0, method="odeint", summary=False, thresholds=()):
+    """
+    Solve for i(t) and c(t) of many scenarios in a single integration.
+
+    Args:
+        R0 (float or array_like): constant R0 of each scenario,
+            or the initial r0 of R0_mitigating() when η is given
+        t_vec (numpy.ndarray): time grid
+        η (float or array_like or None): speed of mitigation of each scenario, or None (constant R0)
+        r_bar (float or array_like): long run R0 of R0_mitigating()
+        x_init (array_like): initial state with shape (3,) or (n_scenarios, 3)
+        method (str): integration backend, "odeint", "rk4" or "rk45" (refer to integrate())
+        summary (bool): if True, summary metrics are returned instead of the paths
+        thresholds (list[float]): values of c(t) to find the crossing times of, used when summary=True
+
+    Returns:
+        tuple(numpy.ndarray, numpy.ndarray): i_paths and c_paths with shape (n_scenarios, len(t_vec)),
+            or dict[str, numpy.ndarray] of covid_model.events.summarize() with summary=True
+
+    Note:
+        Scalar arguments are broadcast against the others,
+        so solve_paths(R0_vals, t_vec) runs one scenario per value of R0_vals.
+
+    Note:
+        With summary=True, the Runge-Kutta method is used on t_vec and memory is (n_scenarios,),
+        not (n_scenarios, len(t_vec)). @method must be the default value.
+    """
+    x_init = np.asarray(x_init, dtype=np.float64)
+    if η is None:
+        R0 = np.asarray(R0, dtype=np.float64)
+        shape = np.broadcast_shapes(R0.shape, x_init.shape[:-1])
+        R = np.broadcast_to(R0, shape).ravel()
+    else:
+        params = [np.asarray(v, dtype=np.float64) for v in (R0, η, r_bar)]
+        shape = np.broadcast_shapes(*(v.shape for v in params), x_init.shape[:-1])
+        r0, η, r_bar = (np.broadcast_to(v, shape).ravel() for v in params)
+        R = lambda t: R0_mitigating(t, r0=r0, η=η, r_bar=r_bar)
+    n = int(np.prod(shape))
+    x = np.broadcast_to(x_init, (*shape, 3)).reshape(n, 3)
+
+    if summary:
+        from covid_model.events import summarize
+        if method != "odeint":
+            raise ValueError(f"@method must be odeint (default) with summary=True, but {method} was applied.")
+        return summarize(R, t_vec, x.T, thresholds=thresholds)
+    if method == "odeint":
+        from scipy.integrate import odeint
+        # Scenarios are independent, so the Jacobian is banded within each row of 3
+        paths = odeint(profiling.counted(F_batch, "F"), x.ravel(), t_vec, args=(R,), ml=2, mu=2)
+        s_paths, e_paths, i_paths = paths.reshape(len(t_vec), n, 3).transpose(2, 1, 0)
+    elif method == "rk4":
+        s_paths, e_paths, i_paths = _integrate_rk4(R, t_vec, x.T)
+    elif method == "rk45":
+        paths = _integrate_rk45(lambda t, x: F_batch(x, t, R), t_vec, x.ravel())
+        s_paths, e_paths, i_paths = paths.reshape(n, 3, len(t_vec)).transpose(1, 0, 2)
+    else:
+        raise ValueError(f"@method must be one of {METHODS}, but {method} was applied.")
+
+    c_paths = 1 - s_paths - e_paths       # cumulative cases
+    return i_paths, c_paths
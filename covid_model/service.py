@@ -0,0 +1,209 @@
+"""
+Asyncio front end which serves the latest projection of a country on demand.
+
+Requests of a country are answered from the last result while it is fresh. When it is stale, the last result is
+returned at once and the country is refreshed in the background. Concurrent requests of a country share one refresh,
+and refreshes run in a pool of processes as run_countries() does, with a bounded number of tasks in flight.
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import time
+
+from covid_model import profiling
+from covid_model.runner import _init_worker, _run_task
+
+
+class ServiceOverloaded(RuntimeError):
+    """
+    Raised when a request needs a refresh, but too many refreshes are waiting.
+    """
+
+
+class RefreshService(object):
+    """
+    Service of the projections of the countries.
+
+    Args:
+        jhu_data (covsirphy.JHUData): records
+        population_data (covsirphy.PopulationData): population values
+        processes (int): the number of worker processes, the max number of refreshes running at once
+        max_pending (int): the max number of refreshes waiting for a worker, requests beyond it raise ServiceOverloaded
+        max_age (float): seconds a result is fresh, stale results are returned while a refresh runs
+        incremental (bool): if True, the summary of the last result is refreshed incrementally
+            (refer to covid_model.incremental.refresh())
+        kwargs: keyword arguments of covid_model.runner.run_country(), like model, timeout, days and cache
+
+    Note:
+        Use it as an asynchronous context manager, so that the worker processes are shut down:
+            async with RefreshService(jhu_data, population_data) as service:
+                projection = await service.get("Italy")
+
+    Note:
+        A failed refresh keeps the last result, its error is saved in "error" of the next results.
+        Without results, the request raises RuntimeError with the error message.
+        When a worker process dies (e.g. out of memory), the refreshes running in the pool fail
+        and the pool is rebuilt for the next refreshes, as covid_model.runner._map_countries() does.
+    """
+
+    def __init__(self, jhu_data, population_data, processes=4, max_pending=64, max_age=3600, incremental=True,
+                 **kwargs):
+        kwargs.setdefault("n_jobs", 1)
+        self._kwargs = kwargs
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.incremental = incremental
+        self._initargs = (jhu_data, population_data)
+        self._processes = processes
+        self._executor = self._new_executor()
+        self._slots = asyncio.Semaphore(processes)
+        # Refreshes without a worker slot yet, and refreshes holding a slot
+        self._queued = 0
+        self._running = 0
+        # Results of the countries and the refreshes in flight
+        self._results = {}
+        self._errors = {}
+        self._inflight = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Wait for the refreshes in flight and shut down the worker processes.
+        """
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self._processes, initializer=_init_worker, initargs=self._initargs)
+
+    def _rebuild(self, executor):
+        """
+        Replace the broken pool with a new pool, unless another refresh has already replaced it.
+        """
+        if self._executor is executor:
+            executor.shutdown(wait=False)
+            self._executor = self._new_executor()
+
+    def status(self):
+        """
+        Return the status of the service.
+
+        Returns:
+            dict[str, object]:
+                - countries (list[str]): countries with results
+                - refreshing (list[str]): countries being refreshed or waiting for a worker
+                - pending (int): the number of refreshes waiting for a worker
+        """
+        return {"countries": sorted(self._results), "refreshing": sorted(self._inflight), "pending": self._waiting()}
+
+    def _waiting(self):
+        """
+        Return the number of refreshes waiting for a worker, without the refreshes about to take a free slot.
+        """
+        return max(0, self._queued - (self._processes - self._running))
+
+    async def get(self, country, max_age=None):
+        """
+        Return the latest projection of a country.
+
+        Args:
+            country (str): country name
+            max_age (float or None): seconds a result is fresh, None means the value set with RefreshService()
+
+        Returns:
+            dict[str, object]:
+                - country (str): country name
+                - summary (pandas.DataFrame): summary of phases, as Scenario.summary()
+                - simulation (pandas.DataFrame): the last simulated records, as Scenario.simulate()
+                - updated (float): time of the refresh, seconds since the epoch
+                - elapsed (float): runtime of the refresh [sec]
+                - stale (bool): whether the result is older than @max_age (a refresh is started unless overloaded)
+                - error (str or None): error message of the last refresh when it failed
+
+        Raises:
+            ServiceOverloaded: the country has no results and too many refreshes are waiting
+            RuntimeError: the country has no results and its refresh failed
+        """
+        max_age = self.max_age if max_age is None else max_age
+        result = self._results.get(country)
+        if result is None:
+            await self.refresh(country)
+            return self._response(country, stale=False)
+        if time.time() - result["updated"] <= max_age:
+            return self._response(country, stale=False)
+        # Stale-while-revalidate: the last result is returned at once, while the refresh runs
+        self.refresh(country, wait=False)
+        return self._response(country, stale=True)
+
+    def refresh(self, country, wait=True):
+        """
+        Start refreshing a country, or join the refresh in flight.
+
+        Args:
+            country (str): country name
+            wait (bool): if False, the refresh is not started when too many refreshes are waiting
+
+        Returns:
+            asyncio.Task or None: the refresh, or None when it was not started
+
+        Raises:
+            ServiceOverloaded: too many refreshes are waiting and @wait is True
+        """
+        if country in self._inflight:
+            return self._inflight[country]
+        waiting = self._waiting()
+        if self._queued + self._running >= self._processes and waiting >= self.max_pending:
+            if not wait:
+                return None
+            raise ServiceOverloaded(f"{waiting} refreshes are waiting, {country} was not accepted.")
+        self._queued += 1
+        task = asyncio.get_running_loop().create_task(self._refresh(country))
+        self._inflight[country] = task
+        task.add_done_callback(lambda _: self._inflight.pop(country, None))
+        return task
+
+    async def _refresh(self, country):
+        """
+        Refresh a country in a worker process, when a worker is available.
+        """
+        try:
+            await self._slots.acquire()
+        finally:
+            self._queued -= 1
+        self._running += 1
+        try:
+            previous_df = self._results[country]["summary"] if self.incremental and country in self._results else None
+            tracer = profiling.current()
+            trace = None if tracer is None else {"memory": tracer.memory}
+            executor = self._executor
+            try:
+                summary_df, sim_df, elapsed, error, spans = await asyncio.get_running_loop().run_in_executor(
+                    executor, _run_task, country, previous_df, self._kwargs, trace)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._rebuild(executor)
+                summary_df, sim_df, elapsed, error, spans = None, None, 0.0, f"{type(e).__name__}: {e}", []
+        finally:
+            self._running -= 1
+            self._slots.release()
+        if tracer is not None:
+            tracer.extend(spans)
+        self._errors[country] = error
+        if error is None:
+            self._results[country] = {
+                "summary": summary_df, "simulation": sim_df, "updated": time.time(), "elapsed": elapsed}
+        elif country not in self._results:
+            raise RuntimeError(f"Refresh of {country} failed: {error}")
+
+    def _response(self, country, stale):
+        """
+        Return the result of a country with the status.
+        """
+        return {"country": country, **self._results[country], "stale": stale, "error": self._errors.get(country)}
@@ -0,0 +1,306 @@
+"""
+Columnar store of the results of the runs: trajectories and phase summaries.
+
+Each append is saved as a chunk (uncompressed Feather file) with float32 compartments and
+dictionary-encoded (categorical) Country/Scenario keys, as covid_model.data saves the records.
+A manifest keeps the countries, scenarios and time range of the chunks, so that a query opens only the chunks
+it needs, and the chunks are memory-mapped and filtered before they are converted to pandas.
+"""
+
+import json
+import os
+from pathlib import Path
+import time
+import numpy as np
+import pandas as pd
+
+# Kinds of the results and the column of their time axis
+KINDS = {"simulation": "Date", "path": "Time", "phase": "Start"}
+KEY_COLS = ["Run", "Country", "Scenario"]
+
+
+class ResultStore(object):
+    """
+    Store of the results of the runs in a directory.
+
+    Args:
+        directory (str or pathlib.Path): directory to save the chunks
+
+    Note:
+        Kinds of results:
+            - "simulation": records of Scenario.simulate() (Date, Confirmed, Fatal, Infected, Recovered...)
+            - "path": paths of the first model on a time grid (Time, i_path, c_path, deaths...)
+            - "phase": summary of the phases of Scenario.summary() (Phase, Type, Start, End, parameters...)
+
+    Note:
+        pyarrow is required. Appends from more than one process at once are not supported.
+    """
+
+    def __init__(self, directory="kaggle/results"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self.directory.joinpath("manifest.json")
+        try:
+            with self._manifest_path.open("r") as fh:
+                self._manifest = json.load(fh)
+        except FileNotFoundError:
+            self._manifest = {"next_run": 0, "chunks": []}
+
+    def _save_manifest(self):
+        tmp_path = self._manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w") as fh:
+            json.dump(self._manifest, fh)
+        os.replace(tmp_path, self._manifest_path)
+
+    def new_run(self):
+        """
+        Return a new run ID, to save the results of a run with more than one append.
+
+        Returns:
+            int: run ID
+        """
+        run = self._manifest["next_run"]
+        self._manifest["next_run"] = run + 1
+        self._save_manifest()
+        return run
+
+    def append(self, kind, df, country=None, scenario=None, run=None):
+        """
+        Save results as a new chunk.
+
+        Args:
+            kind (str): "simulation", "path" or "phase"
+            df (pandas.DataFrame): results with the time column of the kind (Date, Time or Start),
+                and Country/Scenario columns unless @country/@scenario are specified
+            country (str or None): country name of all rows, or None (Country column of @df)
+            scenario (str or None): scenario name of all rows, or None (Scenario column of @df, else "Main")
+            run (int or None): run ID returned by new_run(), or None (new run)
+
+        Returns:
+            int: run ID
+        """
+        from pyarrow import feather
+
+        if kind not in KINDS:
+            raise ValueError(f"@kind must be one of {list(KINDS)}, but {kind} was applied.")
+        time_col = KINDS[kind]
+        if time_col not in df:
+            raise KeyError(f"@df must have {time_col} column for {kind} results.")
+        run = self.new_run() if run is None else int(run)
+        df = df.reset_index(drop=True).copy()
+        if country is not None:
+            df["Country"] = country
+        if "Country" not in df:
+            raise KeyError("@df must have Country column when @country is None.")
+        if scenario is not None or "Scenario" not in df:
+            df["Scenario"] = scenario or "Main"
+        df["Run"] = np.int32(run)
+        if kind == "phase":
+            df[time_col] = pd.to_datetime(df[time_col], format="%d%b%Y")
+            df["End"] = pd.to_datetime(df["End"], format="%d%b%Y")
+        elif kind == "simulation":
+            df[time_col] = pd.to_datetime(df[time_col]).astype("datetime64[s]")
+        for col in df.columns.drop(KEY_COLS):
+            if df[col].dtype == object or isinstance(df[col].dtype, pd.StringDtype):
+                df[col] = df[col].astype("category")
+            elif kind != "phase" and col != time_col and pd.api.types.is_numeric_dtype(df[col]):
+                # Compartments as float32, parameter values of phases keep their types
+                df[col] = df[col].astype(np.float32)
+        df[["Country", "Scenario"]] = df[["Country", "Scenario"]].astype(str).astype("category")
+        df = df.loc[:, [*KEY_COLS, *df.columns.drop(KEY_COLS)]]
+        filename = f"{kind}-{run:06d}-{len(self._manifest['chunks']):06d}.feather"
+        feather.write_feather(df, self.directory.joinpath(filename), compression="uncompressed")
+        # Time range of the chunk: phases from the first start date to the last end date
+        end_col = "End" if kind == "phase" else time_col
+        self._manifest["chunks"].append({
+            "kind": kind, "file": filename, "run": run, "rows": len(df), "created": time.time(),
+            "countries": sorted(df["Country"].cat.categories.tolist()),
+            "scenarios": sorted(df["Scenario"].cat.categories.tolist()),
+            "min": str(df[time_col].min()), "max": str(df[end_col].max()),
+        })
+        self._save_manifest()
+        return run
+
+    def append_simulation(self, sim_df, country, scenario="Main", run=None):
+        """
+        Save records of Scenario.simulate().
+
+        Args:
+            sim_df (pandas.DataFrame): records with Date column
+            country (str): country name
+            scenario (str): phase series name
+            run (int or None): run ID or None (new run)
+
+        Returns:
+            int: run ID
+        """
+        return self.append("simulation", sim_df.drop("Country", axis=1, errors="ignore"), country, scenario, run)
+
+    def append_summary(self, summary_df, country, scenario="Main", run=None):
+        """
+        Save the summary of phases of Scenario.summary().
+
+        Args:
+            summary_df (pandas.DataFrame): summary, index phase names
+            country (str): country name
+            scenario (str): phase series name
+            run (int or None): run ID or None (new run)
+
+        Returns:
+            int: run ID
+        """
+        df = summary_df.rename_axis("Phase").reset_index()
+        return self.append("phase", df, country, scenario, run)
+
+    def append_paths(self, path_dict, t_vec, scenarios, country="", run=None):
+        """
+        Save paths of the first model, like i_paths and c_paths of solve_paths().
+
+        Args:
+            path_dict (dict[str, numpy.ndarray]): names and values of the paths with shape (n_scenarios, len(t_vec))
+            t_vec (numpy.ndarray): time grid
+            scenarios (list[str]): scenario names, like the legend labels
+            country (str): country name (optional for the first model)
+            run (int or None): run ID or None (new run)
+
+        Returns:
+            int: run ID
+        """
+        t_vec = np.asarray(t_vec)
+        df = pd.DataFrame({
+            "Scenario": np.repeat(np.asarray(scenarios, dtype=object), len(t_vec)),
+            "Time": np.tile(t_vec.astype(np.float32), len(scenarios)),
+            **{name: np.asarray(paths, dtype=np.float32).ravel() for (name, paths) in path_dict.items()},
+        })
+        return self.append("path", df, country, None, run)
+
+    def append_countries(self, country_df, scenario="Main", run=None):
+        """
+        Save the output of covid_model.runner.run_countries(), summaries and simulated records of all countries.
+
+        Args:
+            country_df (pandas.DataFrame): output of run_countries()
+            scenario (str): phase series name
+            run (int or None): run ID or None (new run)
+
+        Returns:
+            int: run ID
+        """
+        run = self.new_run() if run is None else run
+        for (section, kind) in (("summary", "phase"), ("simulation", "simulation")):
+            df = country_df.loc[country_df["Section"] == section].drop(["Section", "Elapsed", "Error"], axis=1)
+            df = df.dropna(how="all", axis=1)
+            if not df.empty:
+                self.append(kind, df, scenario=scenario, run=run)
+        return run
+
+    def chunks(self, kind=None, country=None, scenario=None, runs=None, start=None, end=None):
+        """
+        Return the chunks which may have the rows, without opening the chunks.
+
+        Args:
+            kind, country, scenario, runs, start, end: refer to ResultStore.read()
+
+        Returns:
+            list[dict[str, object]]: entries of the manifest
+        """
+        countries = _as_set(country)
+        scenarios = _as_set(scenario)
+        runs = _as_set(runs)
+        selected = []
+        for entry in self._manifest["chunks"]:
+            if kind is not None and entry["kind"] != kind:
+                continue
+            if runs is not None and entry["run"] not in runs:
+                continue
+            if countries is not None and countries.isdisjoint(entry["countries"]):
+                continue
+            if scenarios is not None and scenarios.isdisjoint(entry["scenarios"]):
+                continue
+            convert = float if KINDS[entry["kind"]] == "Time" else pd.Timestamp
+            if start is not None and convert(entry["max"]) < convert(start):
+                continue
+            if end is not None and convert(entry["min"]) > convert(end):
+                continue
+            selected.append(entry)
+        return selected
+
+    def read(self, kind, country=None, scenario=None, runs=None, start=None, end=None, columns=None):
+        """
+        Read results, opening only the chunks with the rows.
+
+        Args:
+            kind (str): "simulation", "path" or "phase"
+            country (str or list[str] or None): country name(s) or None (all countries)
+            scenario (str or list[str] or None): scenario name(s) or None (all scenarios)
+            runs (int or list[int] or None): run ID(s) or None (all runs)
+            start (str or float or None): the first date (or time of paths) or None (no limit)
+            end (str or float or None): the last date (or time of paths) or None (no limit)
+                phases which overlap the period from @start to @end are selected
+            columns (list[str] or None): value columns to read or None (all columns)
+
+        Returns:
+            pandas.DataFrame:
+                Index
+                    reset index
+                Columns
+                    - Run (int): run ID
+                    - Country, Scenario (pandas.Category): keys
+                    - Date (simulation), Time (path) or Start/End (phase)
+                    - value columns (numpy.float32 compartments, phase parameters as saved)
+
+        Note:
+            The chunks are memory-mapped, and only the selected columns and rows are copied to pandas.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        from pyarrow import feather
+
+        if kind not in KINDS:
+            raise ValueError(f"@kind must be one of {list(KINDS)}, but {kind} was applied.")
+        time_col = KINDS[kind]
+        # Phases overlapping the period are selected: End >= start and Start <= end
+        end_col = "End" if kind == "phase" else time_col
+        time_cols = list(dict.fromkeys([time_col, end_col]))
+        tables = []
+        for entry in self.chunks(kind, country=country, scenario=scenario, runs=runs, start=start, end=end):
+            names = None if columns is None else list(dict.fromkeys([*KEY_COLS, *time_cols, *columns]))
+            table = feather.read_table(self.directory.joinpath(entry["file"]), columns=names, memory_map=True)
+            mask = pa.array(np.ones(table.num_rows, dtype=bool))
+            for (col, values) in (("Country", _as_set(country)), ("Scenario", _as_set(scenario))):
+                if values is not None:
+                    mask = pc.and_(mask, pc.is_in(pc.cast(table[col], pa.string()), pa.array(sorted(values))))
+            for (value, col, compare) in ((start, end_col, pc.greater_equal), (end, time_col, pc.less_equal)):
+                if value is not None:
+                    scalar = pa.scalar(float(value) if time_col == "Time" else pd.Timestamp(value), table[col].type)
+                    mask = pc.and_(mask, compare(table[col], scalar))
+            # Categories differ between chunks, so keys are decoded before concatenation
+            tables.append(table.filter(mask).to_pandas())
+        if not tables:
+            return pd.DataFrame(columns=list(dict.fromkeys([*KEY_COLS, *time_cols, *(columns or [])])))
+        df = pd.concat(tables, ignore_index=True, sort=False)
+        df[["Country", "Scenario"]] = df[["Country", "Scenario"]].astype(str).astype("category")
+        return df
+
+    def runs(self):
+        """
+        Return the chunks of the runs.
+
+        Returns:
+            pandas.DataFrame: the entries of the manifest without the file names
+        """
+        df = pd.DataFrame(self._manifest["chunks"], columns=[
+            "kind", "file", "run", "rows", "created", "countries", "scenarios", "min", "max"])
+        df["created"] = pd.to_datetime(df["created"], unit="s")
+        return df.drop("file", axis=1)
+
+
+def _as_set(values):
+    """
+    Return a set of the values, a single value or None (no filter).
+    """
+    if values is None:
+        return None
+    if isinstance(values, (str, int, np.integer)):
+        return {values}
+    return set(values)
@@ -0,0 +1,138 @@
+"""
+Synthetic datasets with the same layout as the datasets of covsirphy.DataLoader,
+so that benchmarks and examples run without network access or Google Drive.
+"""
+
+import numpy as np
+import pandas as pd
+from covid_model.seir import solve_paths
+
+
+def synthetic_records(n_countries=50, n_days=400, n_provinces=0, start_date="22Jan2020", seed=0):
+    """
+    Return synthetic records of countries with SEIR epidemics.
+
+    Args:
+        n_countries (int): the number of countries, named C000, C001,...
+        n_days (int): the number of dates
+        n_provinces (int): the number of provinces of each country, named P00, P01,...
+        start_date (str): the first date
+        seed (int): seed of random numbers
+
+    Returns:
+        pandas.DataFrame: as covsirphy.JHUData.cleaned()
+            Index
+                reset index
+            Columns
+                - Date (pandas.Timestamp): observation date
+                - ISO3, Country, Province (pandas.Category): area names, "-" for country level
+                - Confirmed, Infected, Fatal, Recovered, Population (int): the number of cases
+
+    Note:
+        Cumulative cases follow c_path of the SEIR model with random R0 values, start dates and
+        the reporting ratio, with noise. Fatal/Recovered are lagged portions of confirmed cases.
+    """
+    rng = np.random.default_rng(seed)
+    n_areas = n_countries * (1 + n_provinces)
+    t_vec = np.arange(n_days, dtype=np.float64)
+    _, c_paths = solve_paths(rng.uniform(1.2, 3.0, n_areas), t_vec)
+    delay = rng.integers(0, n_days // 4 + 1, n_areas)
+    population = rng.integers(100_000, 100_000_000, n_areas)
+    reported = rng.uniform(0.001, 0.02, n_areas)
+    rows = np.arange(n_days)[np.newaxis, :] - delay[:, np.newaxis]
+    c_paths = np.where(rows >= 0, np.take_along_axis(c_paths, rows.clip(0), axis=1), 0)
+    noise = np.maximum.accumulate(rng.lognormal(0, 0.05, c_paths.shape), axis=1)
+    confirmed = np.maximum.accumulate(
+        np.floor(c_paths * (population * reported)[:, np.newaxis] * noise), axis=1).astype(np.int64)
+    fatal = np.floor(np.roll(confirmed, 7, axis=1) * rng.uniform(0.005, 0.03, (n_areas, 1))).astype(np.int64)
+    recovered = np.floor(np.roll(confirmed, 14, axis=1) * 0.95).astype(np.int64)
+    fatal[:, :7], recovered[:, :14] = 0, 0
+    recovered = np.minimum(recovered, confirmed - fatal)
+    countries = np.repeat([f"C{i:03d}" for i in range(n_countries)], 1 + n_provinces)
+    provinces = np.tile(["-", *[f"P{i:02d}" for i in range(n_provinces)]], n_countries)
+    df = pd.DataFrame(
+        {
+            "Date": np.tile(pd.date_range(pd.to_datetime(start_date, format="%d%b%Y"), periods=n_days), n_areas),
+            "ISO3": pd.Categorical(np.repeat(np.char.replace(countries, "C", "X"), n_days)),
+            "Country": pd.Categorical(np.repeat(countries, n_days)),
+            "Province": pd.Categorical(np.repeat(provinces, n_days)),
+            "Confirmed": confirmed.ravel(),
+            "Infected": (confirmed - fatal - recovered).ravel(),
+            "Fatal": fatal.ravel(),
+            "Recovered": recovered.ravel(),
+            "Population": np.repeat(population, n_days),
+        }
+    )
+    return df
+
+
+def synthetic_mobility(n_regions=1000, n_neighbors=8, commuting=0.05, seed=0):
+    """
+    Return synthetic population and trips of regions, for covid_model.metapop.
+
+    Args:
+        n_regions (int): the number of regions
+        n_neighbors (int): the number of destinations of each region
+        commuting (float): the portion of the residents away from their region
+        seed (int): seed of random numbers
+
+    Returns:
+        tuple(numpy.ndarray, scipy.sparse.csr_matrix): population with shape (n_regions,) and
+            trips (people of region r in region q) with shape (n_regions, n_regions)
+
+    Note:
+        Regions are on a ring, the destinations are the regions nearby, weighted by their population.
+    """
+    from scipy import sparse
+
+    rng = np.random.default_rng(seed)
+    population = rng.lognormal(12, 1.2, n_regions).round().clip(1000)
+    rows = np.repeat(np.arange(n_regions), n_neighbors)
+    offsets = rng.integers(1, max(2 * n_neighbors, 2), rows.size) * rng.choice((-1, 1), rows.size)
+    cols = (rows + offsets) % n_regions
+    weights = population[cols]
+    weights /= np.bincount(rows, weights=weights, minlength=n_regions)[rows]
+    trips = sparse.csr_matrix((commuting * population[rows] * weights, (rows, cols)), shape=(n_regions, n_regions))
+    return population, trips
+
+
+class SyntheticPyramid(object):
+    """
+    Synthetic population pyramid with the interface of covsirphy.PopulationPyramidData.subset().
+
+    Args:
+        countries (list[str]): country names
+        max_age (int): the last age
+        seed (int): seed of random numbers
+    """
+
+    def __init__(self, countries, max_age=100, seed=0):
+        rng = np.random.default_rng(seed)
+        ages = np.arange(max_age + 1)
+        # Survival decreases with age, the slope and the population differ by country
+        slope = rng.uniform(0.01, 0.04, len(countries))
+        base = rng.integers(10_000, 1_000_000, len(countries))
+        values = base[:, np.newaxis] * np.exp(-slope[:, np.newaxis] * ages[np.newaxis, :])
+        self._ages = ages
+        self._values = dict(zip(countries, np.floor(values).astype(np.int64)))
+
+    def subset(self, country, year=None, sex=None):
+        """
+        Return the subset.
+
+        Args:
+            country (str): country name
+            year (int or None): ignored
+            sex (str or None): ignored
+
+        Returns:
+            pandas.DataFrame
+                Index
+                    reset index
+                Columns
+                    - Age (int): age
+                    - Population (int): population value
+                    - Per_total (float): portion of the total
+        """
+        values = self._values[country]
+        return pd.DataFrame({"Age": self._ages, "Population": values, "Per_total": values / values.sum()})
@@ -0,0 +1,212 @@
+"""
+S-R trend analysis (phase change points) of many countries in a pool of processes, cached by data fingerprint.
+
+Scenario.trend() is run once for each country and records. The phases are saved as start/end dates
+and set to scenarios with apply_phases(), so that Scenario.trend() is not called again in the notebook.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import pandas as pd
+
+from covid_model import profiling
+from covid_model.runner import _map_countries, _shared
+
+
+class PhaseCache(object):
+    """
+    Cache of the phases of S-R trend analysis, keyed by country, arguments of trend() and a fingerprint of the records.
+
+    Args:
+        directory (str or pathlib.Path): directory to save the entries
+
+    Note:
+        Each entry is a JSON file, as covid_model.cache.EstimateCache, so that the worker processes share the cache.
+    """
+
+    def __init__(self, directory="kaggle/phases"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(country, records_df, trend_kwargs=None):
+        """
+        Return the key of the records of a country.
+
+        Args:
+            country (str): country name
+            records_df (pandas.DataFrame): records, as Scenario.records(variables="all")
+            trend_kwargs (dict[str, object] or None): keyword arguments of Scenario.trend()
+
+        Returns:
+            str: hexadecimal digest
+        """
+        fingerprint = pd.util.hash_pandas_object(records_df, index=True).to_numpy().tobytes()
+        arguments = json.dumps(trend_kwargs or {}, sort_keys=True, default=str)
+        digest = hashlib.sha1(f"{country}|{arguments}|".encode("utf-8"))
+        digest.update(fingerprint)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory.joinpath(f"{key}.json")
+
+    def get(self, key):
+        """
+        Return the cached phases.
+
+        Args:
+            key (str): key returned by PhaseCache.key()
+
+        Returns:
+            list[tuple(str, str)] or None: start/end dates of the phases, or None when not cached
+        """
+        try:
+            with self._path(key).open("r") as fh:
+                return [tuple(phase) for phase in json.load(fh)["phases"]]
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, country, phases):
+        """
+        Save the phases.
+
+        Args:
+            key (str): key returned by PhaseCache.key()
+            country (str): country name
+            phases (list[tuple(str, str)]): start/end dates of the phases
+        """
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with tmp_path.open("w") as fh:
+            json.dump({"country": country, "phases": [list(phase) for phase in phases]}, fh)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(list(self.directory.glob("*.json")))
+
+
+def apply_phases(scenario, phases, name="Main"):
+    """
+    Set phases to a scenario, as Scenario.trend() does.
+
+    Args:
+        scenario (covsirphy.Scenario): scenario registered with the records
+        phases (list[tuple(str, str)] or pandas.DataFrame): start/end dates of the phases, like 01Apr2020,
+            or a dataframe with Start/End columns (like the rows of a country of detect_phases())
+        name (str): phase series name
+
+    Returns:
+        covsirphy.Scenario: @scenario with the phases (past phases only)
+
+    Raises:
+        ValueError: @phases has an error of detect_phases(), no phases or phases without start/end dates
+    """
+    if isinstance(phases, pd.DataFrame):
+        if "Error" in phases and phases["Error"].notna().any():
+            errors = phases["Error"].dropna().unique().tolist()
+            raise ValueError(f"@phases must not have errors of S-R trend analysis, but {errors} were included.")
+        phases = list(zip(phases["Start"], phases["End"]))
+    if not phases:
+        raise ValueError("@phases must have one or more phases, but no phases were applied.")
+    if any(pd.isna(start) or pd.isna(end) for (start, end) in phases):
+        raise ValueError(f"@phases must have start/end dates of all phases, but {phases} was applied.")
+    scenario.clear(name=name, include_past=True)
+    for (_, end) in phases:
+        scenario.add(name=name, end_date=end)
+    return scenario
+
+
+def trend_with_cache(scenario, country, cache, name="Main", **kwargs):
+    """
+    Perform Scenario.trend(), re-using the phases of the same records from the cache.
+
+    Args:
+        scenario (covsirphy.Scenario): scenario registered with the records
+        country (str): country name of the scenario
+        cache (PhaseCache or None): cache of the phases, or None (not used)
+        name (str): phase series name
+        kwargs: keyword arguments of Scenario.trend()
+
+    Returns:
+        list[tuple(str, str)]: start/end dates of the phases
+    """
+    if cache is not None:
+        trend_kwargs = {k: v for (k, v) in kwargs.items() if k != "show_figure"}
+        key = cache.key(country, scenario.records(variables="all", show_figure=False), trend_kwargs)
+        phases = cache.get(key)
+        if phases is not None:
+            profiling.annotate(cached=True)
+            apply_phases(scenario, phases, name=name)
+            return phases
+    kwargs.setdefault("show_figure", False)
+    scenario.trend(name=name, **kwargs)
+    df = scenario.summary(name=name)
+    df = df.loc[df["Type"] == "Past"]
+    phases = list(zip(df["Start"], df["End"]))
+    if cache is not None:
+        cache.put(key, country, phases)
+    return phases
+
+
+def _trend_task(country, cache, kwargs):
+    """
+    Detect the phases of a country in a worker process.
+
+    Returns:
+        tuple(list[tuple(str, str)] or None, str or None): phases and error message
+    """
+    import covsirphy as cs
+
+    try:
+        scenario = cs.Scenario(country=country)
+        scenario.register(_shared["jhu_data"], _shared["population_data"])
+        return trend_with_cache(scenario, country, cache, **kwargs), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def detect_phases(countries, jhu_data, population_data, cache=None, processes=None, **kwargs):
+    """
+    Perform S-R trend analysis of the countries in parallel.
+
+    Args:
+        countries (list[str]): country names
+        jhu_data (covsirphy.JHUData): records
+        population_data (covsirphy.PopulationData): population values
+        cache (PhaseCache or None): cache of the phases, or None (not used)
+        processes (int or None): the number of worker processes, None means the number of CPUs
+        kwargs: keyword arguments of Scenario.trend(), like min_size
+
+    Returns:
+        pandas.DataFrame:
+            Index
+                reset index
+            Columns
+                - Country (str): country name
+                - Phase (int): phase number, 0 means the 0th phase, -1 for errors
+                - Start (str or None): start date, like 01Apr2020
+                - End (str or None): end date
+                - Error (str or None): error message when the country failed
+
+    Note:
+        @jhu_data and @population_data are sent once to each worker process, as run_countries() does.
+        When a worker process dies, the pool is rebuilt and only the countries not finished are submitted again
+        (refer to covid_model.runner._map_countries()).
+        The phases can be set with apply_phases(scenario, df.loc[df["Country"] == country]).
+    """
+    args_dict = {country: (country, cache, kwargs) for country in countries}
+    results = _map_countries(_trend_task, args_dict, jhu_data, population_data, processes=processes)
+    rows = []
+    for country in countries:
+        result = results[country]
+        if isinstance(result, Exception):
+            # The worker process itself died, e.g. out of memory
+            result = (None, f"{type(result).__name__}: {result}")
+        phases, error = result
+        if error is not None:
+            rows.append((country, -1, None, None, error))
+            continue
+        rows.extend((country, k, start, end, None) for (k, (start, end)) in enumerate(phases))
+    return pd.DataFrame(rows, columns=["Country", "Phase", "Start", "End", "Error"])
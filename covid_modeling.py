@@ -16,122 +16,54 @@ refer to https://python.quantecon.org/sir_model.html from Thomas J. Sargent & Jo
 import matplotlib.pyplot as plt
 plt.rcParams["figure.figsize"] = (11, 5)  #set default figure size
 import numpy as np
-from numpy import exp
-from scipy.integrate import odeint
 
-pop_size = 3.3e8
-γ = 1 / 18 #recovery rate
-σ = 1 / 5.2 #infection rate
+from covid_model.seir import pop_size, γ, σ, F, x_0, R0_mitigating, integrate, solve_path, solve_paths
+from covid_model.schedules import Step
+from covid_model.plotting import plot_paths
 
-def F(x, t, R0=1.6):
-    """
-    Time derivative of the state vector.
-
-        * x is the state vector (array_like)
-        * t is time (scalar)
-        * R0 is the effective transmission rate, defaulting to a constant
-
-    """
-    s, e, i = x
-
-    # New exposure of susceptibles
-    β = R0(t) * γ if callable(R0) else R0 * γ # model the transmission rate
-
-    # Time derivatives
-    ds = - β * s * i
-    de = β * s * i - σ * e
-    di = σ * e - γ * i
-
-    return ds, de, di
-
-i_0 = 1e-7
-e_0 = 4 * i_0
-s_0 = 1 - i_0 - e_0
-
-x_0 = s_0, e_0, i_0
-
-def test(R0, t_vec, x_init=x_0):
+def test(R0, t_vec, x_init=x_0, method="odeint"):
     """
     Solve for i(t) and c(t) via numerical integration,
     given the time path for R0.
 
     """
-    G = lambda x, t: F(x, t, R0)
-    s_path, e_path, i_path = odeint(G, x_init, t_vec).transpose()
+    s_path, e_path, i_path = integrate(R0, t_vec, x_init=x_init, method=method)
     r_path = 1-s_path -e_path-i_path
     c_path = 1 - s_path - e_path       # cumulative cases
     return s_path, e_path, i_path, r_path
 
-def te(paths, label, xlabel,times=t_vec):
-
-    fig, ax = plt.subplots()
-
-    for path, label in zip(paths, label):
-        ax.plot(times, path, label=label)
-
-    ax.legend(loc='upper left')
-    plt.xlabel('time in days')
-    plt.ylabel(xlabel)
-
-    plt.show()
-
 mm = ['Susceptible','Exposed','Infected','Recovered']
 paths = [s_path, e_path, i_path, r_path]
-te(paths, mm,'percentage in population')
+plot_paths(paths, mm, 'percentage in population', t_vec)
 
 s_path, e_path, i_path, r_path = test(r, t_vec)
 
-def solve_path(R0, t_vec, x_init=x_0):
-    """
-    Solve for i(t) and c(t) via numerical integration,
-    given the time path for R0.
-
-    """
-    G = lambda x, t: F(x, t, R0)
-    s_path, e_path, i_path = odeint(G, x_init, t_vec).transpose()
-
-    c_path = 1 - s_path - e_path       # cumulative cases
-    return i_path, c_path,
-
 t_length = 550
 grid_size = 1000
 t_vec = np.linspace(0, t_length, grid_size)
 
-def plot_paths(paths, labels, xlabel,times=t_vec):
-
-    fig, ax = plt.subplots()
-
-    for path, label in zip(paths, labels):
-        ax.plot(times, path, label=label)
-
-    ax.legend(loc='upper left')
-    plt.xlabel('time in days')
-    plt.ylabel(xlabel)
-
-    plt.show()
-
 R0_vals = np.linspace(1.6, 3.0, 6)
 labels = [f'$R0 = {r:.2f}$' for r in R0_vals]
-i_paths, c_paths = [], []
+# All R0 values are integrated at once as a stacked state
+i_paths, c_paths = solve_paths(R0_vals, t_vec)
 
-for r in R0_vals:
-    i_path, c_path = solve_path(r, t_vec)
-    i_paths.append(i_path)
-    c_paths.append(c_path)
+plot_paths(i_paths, labels, 'percentage in population', t_vec)
 
-plot_paths(i_paths, labels, 'percentage in population')
+plot_paths(c_paths, labels, 'cumulative infected percentage', t_vec)
 
-plot_paths(c_paths, labels, 'cumulative infected percentage')
+# Peak, the day half of the population is infected and the final size, without storing the paths
+# s(t) at the peak is 1/R0 (herd immunity)
+summary = solve_paths(R0_vals, t_vec, summary=True, thresholds=(0.5,))
+for (r, peak_s, peak_t, t_half, final_c) in zip(
+        R0_vals, summary["peak_s"], summary["peak_t"], summary["t_cross"][:, 0], summary["final_c"]):
+    print(f"R0={r:.2f}: s at peak {peak_s:.3f} (1/R0={1 / r:.3f}), peak day {peak_t:.0f}, "
+          f"c>=0.5 on day {t_half:.0f}, final size {final_c:.3f}")
 
 """## With intervention
 
 """
 
 # η is the speed at which restrictions are imposed
-def R0_mitigating(t, r0=3, η=1, r_bar=1.6):
-    R0 = r0 * exp(- η * t) + (1 - exp(- η * t)) * r_bar
-    return R0
-
 η_vals = 1/5, 1/10, 1/20, 1/50, 1/100
 labels = [fr'$\eta = {η:.2f}$' for η in η_vals]
 
@@ -145,17 +77,11 @@ plt.xlabel('time in days')
 plt.ylabel('R(t)')
 plt.show()
 
-i_paths, c_paths = [], []
-
-for η in η_vals:
-    R0 = lambda t: R0_mitigating(t, η=η)
-    i_path, c_path = solve_path(R0, t_vec)
-    i_paths.append(i_path)
-    c_paths.append(c_path)
+i_paths, c_paths = solve_paths(3, t_vec, η=η_vals)
 
-plot_paths(i_paths, labels, 'percentage in population')
+plot_paths(i_paths, labels, 'percentage in population', t_vec)
 
-plot_paths(c_paths, labels,'infected percentage')
+plot_paths(c_paths, labels,'infected percentage', t_vec)
 
 """## Lockdown Simulation
 
@@ -167,8 +93,9 @@ e_0 = 75_000 / pop_size
 s_0 = 1 - i_0 - e_0
 x_0 = s_0, e_0, i_0
 
-R0_paths = (lambda t: 0.5 if t < 30 else 2,
-            lambda t: 0.5 if t < 120 else 2)
+# Lockdowns lifted at t=30 and t=120, integration restarts at the switch
+R0_paths = (Step(breakpoints=(30,), values=(0.5, 2)),
+            Step(breakpoints=(120,), values=(0.5, 2)))
 
 labels = [f'scenario {i}' for i in (1, 2)]
 
@@ -179,15 +106,42 @@ for R0 in R0_paths:
     i_paths.append(i_path)
     c_paths.append(c_path)
 
-plot_paths(i_paths, labels,'active infected percentage')
+plot_paths(i_paths, labels,'active infected percentage', t_vec)
+
+# Points chosen by an adaptive solver: dense around the switches, sparse in the flat tails
+from covid_model.seir import solve_adaptive
+adaptive_paths = [solve_adaptive(R0, (0, t_length), x_init=x_0, rtol=1e-6) for R0 in R0_paths]
+print([len(path.t) for path in adaptive_paths], "points instead of", grid_size)
+plot_paths([path.i_path for path in adaptive_paths], labels, 'active infected percentage',
+           [path.t for path in adaptive_paths])
 
 ν = 0.01
 
 paths = [path * ν * pop_size for path in c_paths]
-plot_paths(paths, labels, 'cummulative number of deaths')
+plot_paths(paths, labels, 'cummulative number of deaths', t_vec)
 
 paths = [path * ν * γ * pop_size for path in i_paths]
-plot_paths(paths, labels, 'daily deaths')
+plot_paths(paths, labels, 'daily deaths', t_vec)
+
+"""## Uncertainty bands
+
+γ, σ, R0 and the initial conditions are sampled, and the 5/50/95 percentiles are estimated while integrating
+"""
+
+from covid_model.ensemble import run_ensemble
+
+η_draw = lambda rng, n: rng.uniform(1/100, 1/5, n)
+bands = run_ensemble(100_000, t_vec, draws={"R0": 3.0, "η": η_draw, "ν": ν}, seed=0)
+
+for name, label in zip(["i_path", "deaths"], ["active infected percentage", "cummulative number of deaths"]):
+    fig, ax = plt.subplots()
+    low, median, high = bands[name]
+    ax.fill_between(t_vec, low, high, alpha=0.3, label='5-95%')
+    ax.plot(t_vec, median, label='median')
+    ax.legend(loc='upper left')
+    plt.xlabel('time in days')
+    plt.ylabel(label)
+    plt.show()
 
 
 
@@ -228,13 +182,21 @@ data_loader = cs.DataLoader(directory="kaggle/input")
 # Retrieve the dataset of the number of COVID-19 cases
 # Kaggle platform: covid19dh.csv will be saved in /output/kaggle/working/input
 # Local env: covid19dh.csv will be saved in kaggle/input
-jhu_data = data_loader.jhu()
+from pathlib import Path
+from covid_model.data import load_jhu
+if not Path("kaggle/input/covid19dh.csv").exists():
+    data_loader.jhu()
+# Read in chunks with compact data types, next sessions memory-map kaggle/input/covid19dh.feather
+jhu_data = load_jhu("kaggle/input/covid19dh.csv", directory="kaggle/input")
 
-jhu_data.cleaned().tail()
+# Records sorted by area and date, subsets are sliced and totals are memoized
+from covid_model.records import RecordIndex
+record_index = RecordIndex(jhu_data)
+record_index.cleaned().tail()
 
-jhu_data.subset("Japan", province=None).tail()
+record_index.subset("Japan", province=None).tail()
 
-df = jhu_data.cleaned()
+df = record_index.cleaned()
 jhu_first_date, jhu_last_date = df["Date"].min(), df["Date"].max()
 jhu_elapsed = (jhu_last_date - jhu_first_date).days
 print(f"{jhu_elapsed} days have passed from the date of the first record.")
@@ -247,69 +209,16 @@ population_data.value("Japan", province=None)
 """## population pyramid"""
 
 pyramid_data = data_loader.pyramid()
+# Population of the age groups, saved as an array table and looked up without calculation
+from covid_model.pyramid import load_pyramid
+pyramid_table = load_pyramid("kaggle/input/pyramid.npz", pyramid_data, countries=["Italy"])
 
-#the number of days persons of each age group usually go out.
-_period_of_life_list = [
-    "nursery", "nursery school", "elementary school", "middle school",
-    "high school", "university/work", "work", "work", "work", "work",
-    "retired", "retired", "retired"
-]
-df = pd.DataFrame(
-    {
-        "Age_first": [0, 3, 6, 11, 14, 19, 26, 36, 46, 56, 66, 76, 86],
-        "Age_last": [2, 5, 10, 13, 18, 25, 35, 45, 55, 65, 75, 85, 95],
-        "Period_of_life": _period_of_life_list,
-        "Days": [3, 5, 6, 6, 7, 7, 6, 5, 5, 5, 4, 3, 2]
-    }
-)
-# Adjustment by author
-df["Types"] = df["Period_of_life"].replace(
-    {
-        "nursery": "school",
-        "nursery school": "school",
-        "elementary school": "school",
-        "middle school": "school",
-        "high school": "school",
-        "university/work": "school/work"
-    }
-)
-df["School"] = df[["Types", "Days"]].apply(lambda x: x[1] if "school" in x[0] else 0, axis=1)
-df["Office"] = df[["Types", "Days"]].apply(lambda x: x[1] if "work" in x[0] else 0, axis=1)
-df["Others"] = df["Days"] - df[["School", "Office"]].sum(axis=1)
-df.loc[df["Others"] < 0, "Others"] = 0
-df.loc[df.index[1:5], "School"] -= 1
-df.loc[df.index[1:5], "Others"] += 1
-df.loc[df.index[5], ["School", "Office", "Others"]] = [3, 3, 1]
-df[["School", "Office", "Others"]] = df[["Days", "School", "Office", "Others"]].apply(
-    lambda x: x[1:] / sum(x[1:]) * x[0], axis=1
-).astype(np.int64)
-df.loc[df.index[6:10], "Others"] += 1
-df = df.drop(["Days", "Types"], axis=1)
-# Show dataset
-_out_df = df.copy()
+# The number of days persons of each age group usually go out
+from covid_model.mobility import out_days, go_out
+_out_df = out_days()
 _out_df
 
-def go_out(country, pyramid_data=pyramid_data):
-
-    """
-    Return the estimated number of days people usually go out.
-    Args:
-        country (str): coutry name
-        pyramid_data (covsirphy.PopulationPyramidData): pyramid dataset
-    
-    Returns:
-        pandas.DataFrame
-    """
-    p_df = pyramid_data.subset(country)
-    p_df["Cumsum"] = p_df["Population"].cumsum()
-    df = pd.merge(_out_df, p_df, left_on="Age_last", right_on="Age", how="left")
-    df["Population"] = df["Cumsum"].diff()
-    df.loc[df.index[0], "Population"] = df.loc[df.index[0], "Cumsum"]
-    df["Population"] = df["Population"].astype(np.int64)
-    df["Portion"] = df["Population"] / df["Population"].sum()
-    return df.drop(["Per_total", "Cumsum"], axis=1)
-
-go_out("Italy")
+go_out("Italy", pyramid_table)
 
 ita_action_raw = pd.read_excel(
     "kaggle/input/Dataset_Italy_COVID_19.xlsx",
@@ -323,7 +232,7 @@ ita_action_raw.head()
 
 data_cols = ["Infected", "Fatal", "Recovered"]
 rate_cols = ["Fatal per Confirmed", "Recovered per Confirmed", "Fatal per (Fatal or Recovered)"]
-total_df = jhu_data.total()
+total_df = record_index.total()
 total_df = total_df.loc[total_df.index <= jhu_last_date, :]
 total_df.tail()
 
@@ -343,17 +252,11 @@ Where C is the number of confirmed cases,
   Growth Factor =ΔCn/ΔCn−1
 """
 
-covid_df = jhu_data.cleaned()
-df = covid_df.pivot_table(
-    index="Date", columns="Country", values="Confirmed", aggfunc="sum"
-).fillna(method="ffill").fillna(0)
-# Growth factor: (delta Number_n) / (delta Number_n)
-df = df.diff() / df.diff().shift(freq="D")
-df = df.replace(np.inf, np.nan).fillna(1.0)
-# Rolling mean (window: 7 days)
-df = df.rolling(7).mean().dropna().loc[:covid_df["Date"].max(), :]
-# round: 0.01
-growth_value_df = df.round(2)
+from covid_model.growth import growth_factor, classify_groups
+
+covid_df = record_index.cleaned()
+# Growth factor: (delta Number_n) / (delta Number_n), rolling mean (window: 7 days), round: 0.01
+growth_value_df = growth_factor(covid_df, window=7)
 growth_value_df.tail()
 
 """Grouping countires based on growth factor
@@ -365,23 +268,8 @@ Stopping: growth factor: < 1 for the last 7 days
 At a crossroad: the others
 """
 
-df = growth_value_df.copy()
-df = df.iloc[-7:, :].T
-day_cols = df.columns.strftime("%d%b%Y")
-df.columns = day_cols
-last_date = day_cols[-1]
-# Grouping
-more_col, less_col = "GF > 1 [straight days]", "GF < 1 [straight days]"
-df[more_col] = (growth_value_df > 1).iloc[::-1].cumprod().sum(axis=0)
-df[less_col] = (growth_value_df < 1).iloc[::-1].cumprod().sum(axis=0)
-df["Group"] = df[[more_col, less_col]].apply(
-    lambda x: "Outbreaking" if x[0] >= 7 else "Stopping" if x[1] >= 7 else "Crossroad",
-    axis=1
-)
-# Sorting
-df = df.loc[:, ["Group", more_col, less_col, *day_cols]]
-df = df.sort_values(["Group", more_col, less_col], ascending=False)
-growth_df = df.copy()
+# Grouping and sorting
+growth_df = classify_groups(growth_value_df, days=7)
 growth_df.head()
 
 df = pd.merge(covid_df, growth_df["Group"].reset_index(), on="Country")
@@ -394,8 +282,7 @@ df = growth_df.loc[growth_df["Group"] == "Outbreaking", :]
 ", ".join(df.index.tolist()) + "."
 growth_df.loc[growth_df["Group"] == "Outbreaking", :].head()
 
-df = covid_df.loc[covid_df["Group"] == "Outbreaking", ["Date", *data_cols]]
-df = df.groupby("Date").sum()
+df = record_index.group_total(growth_df["Group"], "Outbreaking")[data_cols]
 df = df.iloc[:-1, :]
 if not df.empty:
     cs.line_plot(df, "Group 1 (Outbreaking): Cases over time", y_integer=True)
@@ -405,7 +292,7 @@ df = growth_df.loc[growth_df["Group"] == "Stopping", :]
 ", ".join(df.index.tolist()) + "."
 growth_df.loc[growth_df["Group"] == "Stopping", :].head()
 
-df = covid_df.loc[covid_df["Group"] == "Stopping", ["Date", *data_cols]].groupby("Date").sum()
+df = record_index.group_total(growth_df["Group"], "Stopping")[data_cols]
 if not df.empty:
     cs.line_plot(df, "Group 2 (Stopping): Cases over time", y_integer=True)
     df.tail()
@@ -414,7 +301,7 @@ df = growth_df.loc[growth_df["Group"] == "Crossroad", :]
 ", ".join(df.index.tolist()) + "."
 growth_df.loc[growth_df["Group"] == "Crossroad", :].head()
 
-df = covid_df.loc[covid_df["Group"] == "Crossroad", ["Date", *data_cols]].groupby("Date").sum()
+df = record_index.group_total(growth_df["Group"], "Crossroad")[data_cols]
 cs.line_plot(df, "Group 3 (At a crossroad): Cases over time", y_integer=True)
 df.tail()
 
@@ -523,29 +410,8 @@ setting_dict = {
 df = df.append(pd.Series(setting_dict, name="setting"))
 df.fillna("-")
 
-# Commented out IPython magic to ensure Python compatibility.
-from collections import defaultdict
-from datetime import timedelta
-from dateutil.relativedelta import relativedelta
-import functools
-from IPython.display import display, Markdown
-import math
-import os
-from pprint import pprint
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import matplotlib
-from matplotlib.ticker import ScalarFormatter
-# %matplotlib inline
-import numpy as np
-import pandas as pd
-import dask.dataframe as dd
+from IPython.display import display
 pd.plotting.register_matplotlib_converters()
-import seaborn as sns
-import scipy as sci
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-import sympy as sym
 
 sirf_snl.estimate_accuracy("0th")
 
@@ -596,26 +462,44 @@ display(record_df.tail())
 rho_before = cs.SIRF.EXAMPLE["param_dict"]["rho"]
 rho_before
 
-eg_out_df = go_out("Italy")
+eg_out_df = go_out("Italy", pyramid_table)
 eg_out_df
 
-gs_before = (eg_out_df[["School", "Office", "Others"]].sum(axis=1) * eg_out_df["Portion"]).sum()
+gs_before = pyramid_table.gs("Italy", days=eg_out_df)
 gs_before
 
-df = eg_out_df.copy()
-df.loc[df["School"] + df["Office"] > 0, "Others"] += 1
-df["School"] = 0
-df["Office"] *= 0.5
-eg_out_df_after = df.copy()
+# Lockdown: schools closed, office x0.5, +1 day to go out for the other reasons (people going to school/office),
+# and 10% of the rate of hospitalization
+from covid_model.policies import PolicySet, evaluate_policies
+lockdown = PolicySet({"Lockdown": {"School": 0, "Office": "*0.5", "Others": "+1 if commuting", "h_bar": "*0.1"}})
+eg_out_df_after = lockdown.frames(eg_out_df)["Lockdown"]
 eg_out_df_after
 
-df = eg_out_df_after.copy()
-gs_after = (df[["School", "Office", "Others"]].sum(axis=1) * df["Portion"]).sum()
-gs_after
+policy_df = evaluate_policies(
+    lockdown, pyramid_table, ["Italy"], rho_before, preset_dict["sigma"], h_bar=0.5, s_bar=0.5, out_df=eg_out_df)
+policy_df
 
-rho_after = rho_before * (gs_after / gs_before)
+gs_after = policy_df.loc[("Italy", "Lockdown"), "gs_after"]
+rho_after = policy_df.loc[("Italy", "Lockdown"), "rho"]
 rho_after / rho_before
 
+# Age-structured SEIR model of the first section, with the go-out days before/after the lockdown
+from covid_model.age_seir import contact_matrix, solve_age_paths
+contacts = np.stack([contact_matrix(eg_out_df), contact_matrix(eg_out_df_after, baseline_df=eg_out_df)])
+age_paths = solve_age_paths(3.0, t_vec, contacts, eg_out_df["Portion"].to_numpy())
+plot_paths(age_paths["i_path"], ["before lockdown", "after lockdown"], 'active infected percentage', t_vec)
+
+# Metapopulation SEIR model: 3,000 regions (like counties) coupled by commuters, the epidemic starts in one region
+from covid_model.metapop import coupling_matrix, solve_meta_paths
+from covid_model.synthetic import synthetic_mobility
+region_population, trips = synthetic_mobility(n_regions=3000, n_neighbors=8, commuting=0.05)
+region_x_0 = np.zeros((3, 3000))
+region_x_0[0] = 1
+region_x_0[:, 0] = (1 - 5e-5, 4e-5, 1e-5)
+meta_paths = solve_meta_paths(R0_mitigating, t_vec, coupling_matrix(trips, region_population), region_population,
+                              x_init=region_x_0)
+plot_paths(meta_paths["i_paths"][:5], [f"region {k}" for k in range(5)], 'active infected percentage', t_vec)
+
 """## Prediction"""
 
 # Set 0th phase from 02Jan2020 to 31Jan2020 with preset parameter values
@@ -632,6 +516,23 @@ _ = snl.simulate(name="Main")
 
 snl.describe()
 
+# Many lockdown variants branched from the 0th phase, which is integrated only once
+from covid_model.branching import simulate_branches, summarize_branches, policy_branches
+variants = PolicySet({
+    f"Office x{scale:.1f}": {"School": 0, "Office": f"*{scale:.1f}", "Others": "+1 if commuting", "h_bar": "*0.1"}
+    for scale in np.linspace(0, 1, 11)
+})
+variant_df = evaluate_policies(
+    variants, pyramid_table, ["Italy"], rho_before, preset_dict["sigma"], h_bar=0.5, s_bar=0.5, out_df=eg_out_df)
+snl_base = cs.Scenario(example_data, population_data, tau=1440, **area)
+snl_base.clear(include_past=True)
+snl_base.add(end_date="31Jan2020", model=cs.SIRF, **preset_dict)
+branch_df = simulate_branches(snl_base, {"Main": {"end_date": "31Dec2020"}, **policy_branches(variant_df, "Italy", "31Dec2020")})
+branch_df.pivot_table(index="Date", columns="Branch", values="Infected").plot(legend=False)
+
+# Only the peak and the date of 1 million confirmed cases of the branches
+summarize_branches(snl_base, policy_branches(variant_df, "Italy", "31Dec2020"), thresholds=(1_000_000,))
+
 sigma_before = preset_dict["sigma"]
 kappa_before = preset_dict["kappa"]
 (sigma_before, kappa_before)
@@ -639,24 +540,26 @@ kappa_before = preset_dict["kappa"]
 h_bar_before, s_bar_before = 0.5, 0.5
 
 
-h_bar_after = h_bar_before * 0.1
-s_bar_after = s_bar_before
+h_bar_after, s_bar_after = (values[0] for values in lockdown.sigma_parameters(h_bar_before, s_bar_before))
 (h_bar_after, s_bar_after)
 
-sigma_after = sigma_before * (1 - h_bar_after * s_bar_after) / (1 - h_bar_before * s_bar_before)
+sigma_after = policy_df.loc[("Italy", "Lockdown"), "sigma"]
 sigma_after
 
+# S-R trend analysis of the countries below in a pool of processes,
+# the phases of unchanged records are read from the cache when the notebook is re-run
+from covid_model.trend import PhaseCache, apply_phases, detect_phases
+phase_cache = PhaseCache("kaggle/phases")
+phase_df = detect_phases(["Italy", "Japan", "China", "United States"], jhu_data, population_data, cache=phase_cache)
+phase_df
+
 """### Italy"""
 
 ita_scenario = cs.Scenario(country="Italy")
 ita_scenario.register(jhu_data, population_data)
-_ = ita_scenario.trend()
-
-# ita_scenario = cs.Scenario(country="Italy")
-# ita_scenario.register(jhu_data, population_data)
 ita_scenario.records().tail()
 
-_ = ita_scenario.trend()
+_ = apply_phases(ita_scenario, phase_df.loc[phase_df["Country"] == "Italy"])
 
 ita_scenario.estimate(cs.SIRF, timeout=120)
 
@@ -674,10 +577,9 @@ plt.show()
 
 ita_scenario.get("Start", name="Main", phase="3rd")
 c_before, c_after = 1.0, 0.81
-ita_out_df = go_out("Italy")
+ita_out_df = go_out("Italy", pyramid_table)
 
-df = ita_out_df.copy()
-gs_before = (df[["School", "Office", "Others"]].sum(axis=1) * df["Portion"]).sum()
+gs_before = pyramid_table.gs("Italy", days=ita_out_df)
 print(f"{round(gs_before, 1)} days in a week susceptible people go out.")
 
 rho_before = ita_scenario.get("rho", name="Main", phase="1st")
@@ -685,16 +587,13 @@ rho_after = ita_scenario.get("rho", name="Main", phase="3rd")
 gs_after = rho_after / rho_before / c_after * gs_before * c_before
 print(f"{round(gs_after, 1)} days in a week susceptible people go out after lockdown.")
 
-df = ita_out_df.copy()
-df["School"] = 0
-df.loc[df["Office"] > 0, "Office"] = 1
-sum_so = (df[["School", "Office"]].sum(axis=1) * df["Portion"]).sum()
-df.loc[df["Others"] > 0, "Others"] = round(gs_after - sum_so, 1)
-ita_out_after_df = df.copy()
+ita_lockdown = {"School": 0, "Office": "=1 if going"}
+sum_so = pyramid_table.gs("Italy", days=PolicySet({"SO": {**ita_lockdown, "Others": 0}}).days(ita_out_df)[0])
+ita_policies = PolicySet({"Lockdown": {**ita_lockdown, "Others": f"={round(gs_after - sum_so, 1)} if going"}})
+ita_out_after_df = ita_policies.frames(ita_out_df)["Lockdown"]
 ita_out_after_df
 
-df = ita_out_after_df.copy()
-gs_after2 = (df[["School", "Office", "Others"]].sum(axis=1) * df["Portion"]).sum()
+gs_after2 = pyramid_table.gs("Italy", days=ita_out_after_df)
 print(f"{round(gs_after2, 1)} days in a week susceptible people go out after lockdown.")
 
 ita_scenario.clear()
@@ -707,12 +606,9 @@ ita_scenario.simulate().tail(7).style.background_gradient(axis=0)
 
 j_scenario = cs.Scenario(country="Japan")
 j_scenario.register(jhu_data, population_data)
-_ = ita_scenario.trend()
-# ita_scenario = cs.Scenario(country="Italy")
-# ita_scenario.register(jhu_data, population_data)
 j_scenario.records().tail()
 
-_ = j_scenario.trend()
+_ = apply_phases(j_scenario, phase_df.loc[phase_df["Country"] == "Japan"])
 
 j_scenario.estimate(cs.SIRF, timeout=120)
 
@@ -724,12 +620,9 @@ j_scenario.simulate().tail(7).style.background_gradient(axis=0)
 
 c_scenario = cs.Scenario(country="China")
 c_scenario.register(jhu_data, population_data)
-_ = ita_scenario.trend()
-# ita_scenario = cs.Scenario(country="Italy")
-# ita_scenario.register(jhu_data, population_data)
 c_scenario.records().tail()
 
-_ = c_scenario.trend()
+_ = apply_phases(c_scenario, phase_df.loc[phase_df["Country"] == "China"])
 
 c_scenario.estimate(cs.SIRF, timeout=120)
 c_scenario.clear()
@@ -740,20 +633,73 @@ c_scenario.simulate().tail(7).style.background_gradient(axis=0)
 
 us_scenario = cs.Scenario(country="United States")
 us_scenario.register(jhu_data, population_data)
-_ = ita_scenario.trend()
-# ita_scenario = cs.Scenario(country="Italy")
-# ita_scenario.register(jhu_data, population_data)
-
-us_scenario = cs.Scenario(country="United States")
-us_scenario.register(jhu_data, population_data)
-_ = us_scenario.trend()
-# ita_scenario = cs.Scenario(country="Italy")
-# ita_scenario.register(jhu_data, population_data)
 us_scenario.records().tail()
 
-_ = us_scenario.trend()
+_ = apply_phases(us_scenario, phase_df.loc[phase_df["Country"] == "United States"])
 
 us_scenario.estimate(cs.SIRF, timeout=120)
 us_scenario.clear()
 us_scenario.add(days=30)
-us_scenario.simulate().tail(7).style.background_gradient(axis=0)
\ No newline at end of file
+us_scenario.simulate().tail(7).style.background_gradient(axis=0)
+
+"""### All countries
+
+The same steps as the sections above, run for many countries in a pool of processes
+"""
+
+from covid_model.cache import EstimateCache
+from covid_model.runner import run_countries, summaries
+
+# Phases with unchanged records are not estimated again when the notebook is re-run,
+# and the phases of S-R trend analysis above are re-used
+# Time of the stages of each country is traced, open kaggle/trace.json with https://ui.perfetto.dev
+from covid_model.profiling import tracing
+estimate_cache = EstimateCache("kaggle/estimates")
+countries = ["Italy", "Japan", "China", "United States"]
+with tracing(memory=True) as tracer:
+    country_df = run_countries(
+        countries, jhu_data, population_data, timeout=120, days=30, cache=estimate_cache, phase_df=phase_df)
+tracer.to_chrome_trace("kaggle/trace.json")
+country_df.loc[country_df["Section"] != "summary"]
+
+# Results are kept in a columnar store, dashboards read only the chunks of the countries/dates they show
+from covid_model.store import ResultStore
+result_store = ResultStore("kaggle/results")
+result_store.append_countries(country_df)
+result_store.read("simulation", country=["Italy", "Japan"], start="01Jan2021").tail()
+
+# When a new day of records arrives, phases of the last run are kept
+# and only the last phase is fitted again from the last parameter values
+country_df = run_countries(
+    countries, jhu_data, population_data, days=30, previous_dict=summaries(country_df))
+country_df.loc[country_df["Section"] != "summary"]
+
+# Projections on demand: requests of a country share a refresh, and stale results are returned while it runs
+from covid_model.service import RefreshService
+
+async def latest_projections(countries):
+    async with RefreshService(jhu_data, population_data, processes=4, max_age=6 * 3600, days=30) as service:
+        return await asyncio.gather(*(service.get(country) for country in countries))
+
+import asyncio
+projections = await latest_projections(countries + ["Italy", "Japan"])
+pd.concat({p["country"]: p["simulation"] for p in projections})
+
+# SEIR model of the first section fitted to the records, without the estimation of CovsirPhy
+from covid_model.fitting import fit_seir
+fit_df = pd.DataFrame({
+    country: fit_seir(
+        record_index.subset(country), population=population_data.value(country), schedule="mitigating")
+    for country in countries
+}).T
+fit_df
+
+# Charts of the simulated records, saved without displaying them
+from covid_model.plotting import render_many
+Path("kaggle/figures").mkdir(parents=True, exist_ok=True)
+sim_df = country_df.loc[country_df["Section"] == "simulation"]
+jobs = [
+    dict(df=df.set_index("Date")[data_cols], filename=f"kaggle/figures/{country}.png", title=f"{country}: simulated cases")
+    for (country, df) in sim_df.groupby("Country")
+]
+render_many(jobs, workers=4, executor="process")
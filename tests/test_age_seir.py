@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.age_seir import contact_matrix, solve_age_paths
+from covid_model.schedules import R0_mitigating
+from covid_model.seir import solve_path
+
+
+@pytest.fixture
+def uniform_df():
+    # 13 age groups which go out the same days, with different portions of the population
+    portion = np.random.default_rng(0).uniform(0.5, 1.5, 13)
+    return pd.DataFrame({"School": 1.0, "Office": 2.0, "Others": 3.0, "Portion": portion / portion.sum()})
+
+
+@pytest.mark.parametrize("method", ["rk4", "odeint"])
+@pytest.mark.parametrize("R0", [1.6, 3.0, lambda t: R0_mitigating(t, r0=3, η=0.05, r_bar=1.2)])
+def test_uniform_days_match_solve_path(uniform_df, method, R0):
+    t_vec = np.linspace(0, 550, 1001)
+    contacts = contact_matrix(uniform_df)
+    result = solve_age_paths(R0, t_vec, contacts, uniform_df["Portion"].to_numpy(), method=method)
+    i_path, c_path = solve_path(R0, t_vec, method=method)
+    atol = 1e-10 if method == "rk4" else 1e-6
+    np.testing.assert_allclose(result["i_path"], i_path, atol=atol)
+    np.testing.assert_allclose(result["c_path"], c_path, atol=atol)
+    # Every group follows the path of the total population
+    np.testing.assert_allclose(result["i_paths"], np.broadcast_to(i_path, result["i_paths"].shape), atol=atol)
+
+
+def test_batch_of_countries_match_single_countries(uniform_df):
+    t_vec = np.linspace(0, 300, 601)
+    out_df = uniform_df.assign(School=np.linspace(0, 2, 13), Office=np.linspace(3, 0, 13))
+    matrices = np.stack([contact_matrix(uniform_df), contact_matrix(out_df, baseline_df=uniform_df)])
+    portion = uniform_df["Portion"].to_numpy()
+    result = solve_age_paths(np.array([2.0, 3.0]), t_vec, matrices, portion)
+    for (k, R0) in enumerate([2.0, 3.0]):
+        single = solve_age_paths(R0, t_vec, matrices[k], portion)
+        np.testing.assert_allclose(result["i_paths"][k], single["i_paths"], atol=1e-12)
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.branching import _branch_records, _daily, _solve_phases, simulate_branches, summarize_branches
+
+
+class _SIRF:
+    """
+    Time derivative of the SIR-F model with the variables in the order of covsirphy.SIRF.
+    """
+    VARIABLES = ["Susceptible", "Infected", "Recovered", "Fatal"]
+
+    def __init__(self, population, theta, kappa, rho, sigma):
+        self.population, self.theta, self.kappa, self.rho, self.sigma = population, theta, kappa, rho, sigma
+
+    def __call__(self, t, X):
+        s, i, *_ = X
+        dsdt = 0 - self.rho * s * i / self.population
+        drdt = self.sigma * i
+        dfdt = self.kappa * i + (0 - dsdt) * self.theta
+        return np.array([dsdt, 0 - dsdt - drdt - dfdt, drdt, dfdt])
+
+
+PARAM_DICT = {"theta": 0.002, "kappa": 0.005, "rho": 0.2, "sigma": 0.075}
+Y0 = np.array([999_000, 1000, 0, 0])
+
+
+def test_daily_takes_last_step_of_dates():
+    steps = np.arange(13)[:, np.newaxis]
+    assert _daily(steps, 360)[:, 0].tolist() == [3, 7, 11, 12]
+    assert _daily(steps, 1440)[:, 0].tolist() == list(range(13))
+
+
+@pytest.mark.parametrize("tau", [360, 1440])
+def test_branch_records_continue_base_series(tau):
+    first = pd.Timestamp("01Jan2020")
+    base = [(pd.Timestamp("31Jan2020"), PARAM_DICT, Y0)]
+    future = [
+        (pd.Timestamp("29Feb2020"), {**PARAM_DICT, "rho": 0.1}, None),
+        (pd.Timestamp("31Mar2020"), {**PARAM_DICT, "rho": 0.05}, None),
+    ]
+    expected = _daily(_solve_phases(_SIRF, tau, first, base + future), tau)
+    base_steps = _solve_phases(_SIRF, tau, first, base)
+    records = _branch_records(_SIRF, tau, pd.Timestamp("31Jan2020"), base_steps[-1], future)
+    assert len(expected) == 91
+    np.testing.assert_array_equal(records, expected[30:])
+
+
+class _Scenario:
+    """
+    Scenario with the summary of phases only.
+    """
+
+    def __init__(self, summary_df):
+        self.summary_df = summary_df
+
+    def summary(self, name):
+        return self.summary_df
+
+
+@pytest.mark.parametrize("summary_df", [
+    pd.DataFrame({"ODE": ["SIR-F", "SIR"], "tau": 1440, "rho": 0.2, "sigma": 0.075}),
+    pd.DataFrame({"ODE": ["SIR", "SIR"], "tau": 1440, "rho": 0.2, "sigma": 0.075}),
+    pd.DataFrame({"tau": [1440], "rho": [0.2], "sigma": [0.075]}),
+])
+def test_models_other_than_sirf_are_rejected(summary_df):
+    # covsirphy is not imported before the model is checked
+    for func in (simulate_branches, summarize_branches):
+        with pytest.raises(ValueError, match="SIR-F"):
+            func(_Scenario(summary_df), {"Lockdown": {"days": 30}})
+
+
+@pytest.fixture
+def scenario():
+    cs = pytest.importorskip("covsirphy")
+    model = cs.SIRF
+    area = {"country": "Theoretical"}
+    example_data = cs.ExampleData(tau=1440, start_date="01Jan2020")
+    example_data.add(model, step_n=30, **area)
+    population_data = cs.PopulationData(filename=None)
+    population_data.update(model.EXAMPLE["population"], **area)
+    snl = cs.Scenario(example_data, population_data, tau=1440, **area)
+    snl.clear(include_past=True)
+    snl.add(end_date="31Jan2020", model=model, **model.EXAMPLE["param_dict"])
+    return snl
+
+
+def test_branches_match_scenario_simulate(scenario):
+    branches = {"Lockdown": [{"end_date": "29Feb2020", "rho": 0.1}, {"days": 30, "sigma": 0.1}]}
+    scenario.clear(name="Lockdown", template="Main")
+    scenario.add(end_date="29Feb2020", name="Lockdown", rho=0.1)
+    scenario.add(days=30, name="Lockdown", sigma=0.1)
+    expected = scenario.simulate(name="Lockdown", show_figure=False).reset_index(drop=True)
+    df = simulate_branches(scenario, branches).drop(columns="Branch")
+    pd.testing.assert_frame_equal(df, expected.loc[:, df.columns], check_dtype=False)
+    summary = summarize_branches(scenario, branches).loc["Lockdown"]
+    assert summary["Peak_Infected"] == expected["Infected"].max()
+    assert summary["End_Date"] == expected["Date"].iloc[-1]
+
+
+def test_workers_do_not_change_branches(scenario):
+    branches = {f"B{k}": {"end_date": "31Mar2020", "rho": rho} for (k, rho) in enumerate([0.05, 0.1, 0.2, 0.3])}
+    serial = simulate_branches(scenario, branches)
+    parallel = simulate_branches(scenario, branches, batch_size=1, workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
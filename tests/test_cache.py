@@ -0,0 +1,73 @@
+import os
+
+import pandas as pd
+import pytest
+
+from covid_model.cache import EstimateCache
+
+
+class _Model:
+    NAME = "SIR-F"
+
+
+class _OtherModel:
+    NAME = "SIR"
+
+
+@pytest.fixture
+def records_df():
+    dates = pd.date_range("01Apr2020", periods=30)
+    return pd.DataFrame({"Confirmed": range(100, 130), "Fatal": range(30), "Recovered": range(0, 60, 2)}, index=dates)
+
+
+def test_round_trip(tmp_path, records_df):
+    cache = EstimateCache(tmp_path)
+    key = cache.key("Italy", _Model, None, records_df)
+    assert cache.get(key) is None
+    param_dict = {"theta": 0.002, "kappa": 0.005, "rho": 0.2, "sigma": 0.075}
+    cache.put(key, "Italy", _Model, 1440, param_dict)
+    assert cache.get(key) == {"country": "Italy", "model": "SIR-F", "tau": 1440, "param": param_dict}
+    # A new instance reads the same directory, as the worker processes do
+    assert EstimateCache(tmp_path).get(key)["param"] == param_dict
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_key_changes_with_records_and_settings(records_df):
+    key = EstimateCache.key("Italy", _Model, None, records_df)
+    assert EstimateCache.key("Italy", _Model, None, records_df.copy()) == key
+    changed_df = records_df.copy()
+    changed_df.iloc[-1, 0] += 1
+    others = [
+        EstimateCache.key("Italy", _Model, None, changed_df),
+        EstimateCache.key("Italy", _Model, None, records_df.iloc[:-1]),
+        EstimateCache.key("Japan", _Model, None, records_df),
+        EstimateCache.key("Italy", _OtherModel, None, records_df),
+        EstimateCache.key("Italy", _Model, 720, records_df),
+    ]
+    assert len({key, *others}) == 6
+
+
+def test_invalidate(tmp_path, records_df):
+    cache = EstimateCache(tmp_path)
+    for (country, model) in [("Italy", _Model), ("Italy", _OtherModel), ("Japan", _Model)]:
+        cache.put(cache.key(country, model, None, records_df), country, model, 1440, {"rho": 0.2})
+    assert len(cache) == 3
+    assert cache.invalidate(country="Italy", model=_Model) == 1
+    assert cache.get(cache.key("Italy", _Model, None, records_df)) is None
+    assert cache.invalidate(country="Italy") == 1
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, records_df):
+    cache = EstimateCache(tmp_path, max_entries=2)
+    keys = [cache.key(country, _Model, None, records_df) for country in ("A", "B", "C")]
+    for (k, (key, country)) in enumerate(zip(keys[:2], "AB")):
+        cache.put(key, country, _Model, 1440, {"rho": 0.2})
+        os.utime(cache._path(key), (k, k))
+    # Reading A makes B the least recently used entry
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], "C", _Model, 1440, {"rho": 0.2})
+    assert len(cache) == 2
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
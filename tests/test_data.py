@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.data import load_records, read_records
+from covid_model.synthetic import synthetic_records
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    df = synthetic_records(n_countries=4, n_days=60, n_provinces=2, seed=3)
+    df = df.drop(columns="Infected")
+    # Country level records of China are replaced with the total of the provinces
+    df["Country"] = df["Country"].cat.rename_categories({"C001": "China"})
+    # Missing values are forward-filled in each area
+    df.loc[df.index[5::17], "Confirmed"] = np.nan
+    path = tmp_path.joinpath("covid19dh.csv")
+    df.sample(frac=1, random_state=0).sort_values("Date", kind="stable").to_csv(path, index=False)
+    return path
+
+
+def test_chunks_do_not_change_records(csv_path):
+    expected = read_records(csv_path, chunksize=1_000_000)
+    df = read_records(csv_path, chunksize=97)
+    pd.testing.assert_frame_equal(df, expected)
+    china_df = df.loc[(df["Country"] == "China") & (df["Province"] == "-")].set_index("Date")
+    provinces_df = df.loc[(df["Country"] == "China") & (df["Province"] != "-")].groupby("Date")[["Confirmed"]].sum()
+    pd.testing.assert_frame_equal(china_df[["Confirmed"]], provinces_df, check_dtype=False)
+
+
+def test_cache_round_trip(csv_path):
+    expected = read_records(csv_path)
+    df = load_records(csv_path, chunksize=200)
+    cache_path = csv_path.with_suffix(".feather")
+    assert cache_path.exists()
+    pd.testing.assert_frame_equal(df, expected)
+    # The second call reads the cache without parsing the CSV file
+    mtime = cache_path.stat().st_mtime_ns
+    cached_df = load_records(csv_path)
+    assert cache_path.stat().st_mtime_ns == mtime
+    pd.testing.assert_frame_equal(cached_df, expected)
+    # Columns of counts are read-only views of the memory-mapped file
+    assert not cached_df["Confirmed"].to_numpy().flags.writeable
+
+
+def test_cache_is_invalidated_when_csv_is_newer(csv_path):
+    first = load_records(csv_path)["Confirmed"].sum()
+    cache_path = csv_path.with_suffix(".feather")
+    df = pd.read_csv(csv_path)
+    df["Confirmed"] = df["Confirmed"] + 1
+    df.to_csv(csv_path, index=False)
+    stamp = cache_path.stat().st_mtime + 10
+    os.utime(csv_path, (stamp, stamp))
+    df_new = load_records(csv_path)
+    assert df_new["Confirmed"].sum() > first
+    pd.testing.assert_frame_equal(df_new, read_records(csv_path))
+    # force=True parses the CSV file again, even if the cache is newer
+    before = load_records(csv_path)["Confirmed"].sum()
+    df["Confirmed"] = df["Confirmed"] + 1
+    df.to_csv(csv_path, index=False)
+    os.utime(csv_path, (0, 0))
+    assert load_records(csv_path)["Confirmed"].sum() == before
+    assert load_records(csv_path, force=True)["Confirmed"].sum() > before
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from covid_model.ensemble import StreamingQuantiles, run_ensemble, sample
+
+T_VEC = np.linspace(0, 300, 301)
+
+
+@pytest.mark.parametrize("draws", [None, {"η": lambda rng, n: rng.uniform(0.01, 0.1, n)}])
+def test_quantiles_do_not_depend_on_workers(draws):
+    kwargs = {"draws": draws, "batch_size": 64, "seed": 42}
+    expected = run_ensemble(500, T_VEC, workers=1, **kwargs)
+    for workers in (2, 3):
+        result = run_ensemble(500, T_VEC, workers=workers, **kwargs)
+        for name in ("i_path", "c_path", "deaths"):
+            np.testing.assert_array_equal(result[name], expected[name])
+
+
+def test_streaming_quantiles_match_numpy():
+    values = np.random.default_rng(0).lognormal(0, 1, (5000, 20))
+    estimator = StreamingQuantiles(probs=(0.05, 0.5, 0.95), bins=2048)
+    for batch in np.array_split(values, 7):
+        estimator.update(batch)
+    expected = np.quantile(values, (0.05, 0.5, 0.95), axis=0)
+    width = (values[:715].max(axis=0) - values[:715].min(axis=0)) * 1.5 / 2048
+    assert estimator.n == 5000
+    assert np.all(np.abs(estimator.quantiles() - expected) <= 2 * width)
+
+
+def test_sample_rejects_unknown_parameters():
+    with pytest.raises(ValueError, match="@draws"):
+        sample(10, draws={"β": 0.1})
+    param_dict = sample(10, draws={"i_0": 1e-6}, rng=np.random.default_rng(0))
+    np.testing.assert_array_equal(param_dict["e_0"], np.full(10, 4e-6))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from covid_model.schedules import R0_mitigating, Step
+from covid_model.seir import solve_path, solve_paths
+
+T_VEC = np.linspace(0, 550, 1101)
+THRESHOLDS = (0.01, 0.3, 0.99)
+
+
+def _check_summary(summary, i_path, c_path):
+    """
+    Compare the summary metrics with idxmax() and the crossings of the full paths on T_VEC.
+    """
+    h = T_VEC[1] - T_VEC[0]
+    k = np.argmax(i_path)
+    # The peak is interpolated between grid points, so it is not lower than the max on the grid
+    assert i_path[k] <= summary["peak_i"] <= i_path[k] * (1 + 1e-3)
+    assert abs(summary["peak_t"] - T_VEC[k]) <= h
+    np.testing.assert_allclose(summary["final_c"], c_path[-1], rtol=1e-10)
+    np.testing.assert_allclose(summary["final_i"], i_path[-1], rtol=1e-8, atol=1e-15)
+    for (threshold, t_cross) in zip(THRESHOLDS, summary["t_cross"]):
+        reached = np.flatnonzero(c_path >= threshold)
+        if not reached.size:
+            assert np.isnan(t_cross)
+            continue
+        assert T_VEC[reached[0]] - h < t_cross <= T_VEC[reached[0]]
+
+
+@pytest.mark.parametrize("R0", [
+    1.6, 3.0, 0.8,
+    lambda t: R0_mitigating(t, r0=3, η=0.05, r_bar=1.2),
+    Step(breakpoints=(30, 120), values=(3, 0.5, 2)),
+    Step(breakpoints=(30.2, 120.35), values=(3, 0.5, 2)),
+], ids=["1.6", "3.0", "0.8", "mitigating", "step", "step-between-points"])
+def test_summary_of_solve_path(R0):
+    summary = solve_path(R0, T_VEC, summary=True, thresholds=THRESHOLDS)
+    i_path, c_path = solve_path(R0, T_VEC, method="rk4")
+    _check_summary(summary, i_path, c_path)
+
+
+@pytest.mark.parametrize("η", [None, np.array([0.01, 0.05, 0.1])])
+def test_summary_of_solve_paths(η):
+    R0 = np.array([1.6, 3.0, 0.8]) if η is None else 3.0
+    summary = solve_paths(R0, T_VEC, η=η, summary=True, thresholds=THRESHOLDS)
+    i_paths, c_paths = solve_paths(R0, T_VEC, η=η, method="rk4")
+    assert summary["t_cross"].shape == (3, len(THRESHOLDS))
+    for k in range(3):
+        _check_summary({name: values[k] for (name, values) in summary.items()}, i_paths[k], c_paths[k])
+
+
+def test_summary_rejects_method():
+    with pytest.raises(ValueError, match="@method"):
+        solve_path(1.6, T_VEC, method="rk45", summary=True)
+    with pytest.raises(ValueError, match="@method"):
+        solve_paths([1.6, 3.0], T_VEC, method="rk4", summary=True)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.fitting import fit_seir
+from covid_model.schedules import R0_mitigating
+from covid_model.seir import solve_path, γ, σ
+
+POPULATION = 1_000_000
+
+
+def _records(R0, n_days):
+    """
+    Return records with the columns of synthetic_records() which follow the SEIR model with known parameters.
+    """
+    x_init = (1 - 5e-5, 4e-5, 1e-5)
+    i_path, c_path = solve_path(R0, np.arange(n_days, dtype=np.float64), x_init=x_init, method="rk4")
+    df = pd.DataFrame({
+        "Date": pd.date_range("01Mar2020", periods=n_days),
+        "Confirmed": np.round(c_path * POPULATION).astype(np.int64),
+        "Infected": np.round(i_path * POPULATION).astype(np.int64),
+    })
+    df["Susceptible"] = POPULATION - df["Confirmed"]
+    return df
+
+
+def test_constant_r0_is_recovered():
+    # Records before the first case are not used
+    df = pd.concat([_records(0, 10).assign(Confirmed=0, Infected=0), _records(2.5, 150)], ignore_index=True)
+    df["Date"] = pd.date_range("20Feb2020", periods=len(df))
+    param_dict = fit_seir(df.sample(frac=1, random_state=0), population=POPULATION)
+    assert param_dict["R0"] == pytest.approx(2.5, rel=0.02)
+    assert param_dict["γ"] == pytest.approx(γ, rel=0.01)
+    assert param_dict["σ"] == pytest.approx(σ, rel=0.1)
+    assert param_dict["β"] == pytest.approx(param_dict["R0"] * param_dict["γ"])
+    assert param_dict["rmsle"] < 0.01
+    # Population is Susceptible + Confirmed at the first date by default
+    assert fit_seir(df)["R0"] == pytest.approx(param_dict["R0"], rel=1e-3)
+
+
+def test_mitigating_schedule_is_recovered():
+    df = _records(lambda t: R0_mitigating(t, r0=3, η=0.05, r_bar=1.2), 200)
+    param_dict = fit_seir(df, population=POPULATION, schedule="mitigating")
+    assert param_dict["r0"] == pytest.approx(3, rel=0.03)
+    assert param_dict["η"] == pytest.approx(0.05, rel=0.03)
+    assert param_dict["r_bar"] == pytest.approx(1.2, rel=0.03)
+    assert param_dict["β"] == pytest.approx(param_dict["r0"] * param_dict["γ"])
+
+
+def test_invalid_records_and_schedule():
+    df = _records(2.5, 30).assign(Infected=0)
+    with pytest.raises(ValueError, match="@records_df must have at least one date with Infected > 0."):
+        fit_seir(df, population=POPULATION)
+    with pytest.raises(ValueError, match="@schedule"):
+        fit_seir(_records(2.5, 30), schedule="step")
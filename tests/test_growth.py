@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.growth import classify_groups, confirmed_values, growth_factor
+
+
+@pytest.fixture
+def covid_df():
+    # Cumulative cases of countries with provinces, some of them without records on some dates
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("01Mar2020", periods=60)
+    areas = [("Italy", "-"), ("Japan", "-"), ("Japan", "Tokyo"), ("Japan", "Osaka"), ("Chile", "-")]
+    dataframes = []
+    for (k, (country, province)) in enumerate(areas):
+        new_cases = rng.poisson(rng.uniform(0.5, 50), len(dates)) * (rng.uniform(size=len(dates)) > 0.2)
+        df = pd.DataFrame({"Date": dates, "Country": country, "Province": province, "Confirmed": np.cumsum(new_cases)})
+        dataframes.append(df.iloc[k:].sample(frac=0.9, random_state=k))
+    df = pd.concat(dataframes, ignore_index=True)
+    df["Country"], df["Province"] = df["Country"].astype("category"), df["Province"].astype("category")
+    return df
+
+
+def _baseline_growth(covid_df):
+    # The pipeline of the notebook before covid_model.growth
+    df = covid_df.pivot_table(
+        index="Date", columns="Country", values="Confirmed", aggfunc="sum", observed=True).ffill().fillna(0)
+    df = df.diff() / df.diff().shift(freq="D")
+    df = df.replace(np.inf, np.nan).fillna(1.0)
+    df = df.rolling(7).mean().dropna().loc[:covid_df["Date"].max(), :]
+    return df.round(2)
+
+
+def _baseline_groups(growth_value_df):
+    df = growth_value_df.iloc[-7:, :].T
+    df.columns = df.columns.strftime("%d%b%Y")
+    more_col, less_col = "GF > 1 [straight days]", "GF < 1 [straight days]"
+    df[more_col] = (growth_value_df > 1).iloc[::-1].cumprod().sum(axis=0)
+    df[less_col] = (growth_value_df < 1).iloc[::-1].cumprod().sum(axis=0)
+    df["Group"] = np.where(df[more_col] >= 7, "Outbreaking", np.where(df[less_col] >= 7, "Stopping", "Crossroad"))
+    return df
+
+
+def test_confirmed_values_match_pivot(covid_df):
+    expected = covid_df.pivot_table(
+        index="Date", columns="Country", values="Confirmed", aggfunc="sum", observed=True).ffill().fillna(0)
+    df = confirmed_values(covid_df)
+    expected.columns = expected.columns.astype(str)
+    pd.testing.assert_frame_equal(df, expected.astype(np.float64), check_names=False, check_freq=False)
+    pd.testing.assert_frame_equal(confirmed_values(covid_df, n_dates=10), df.iloc[-10:], check_freq=False)
+
+
+def test_growth_factor_matches_baseline(covid_df):
+    expected = _baseline_growth(covid_df)
+    df = growth_factor(covid_df, window=7)
+    assert df.index.equals(expected.index)
+    assert df.columns.astype(str).tolist() == expected.columns.astype(str).tolist()
+    # Rounding to 0.01 may differ in the last digit
+    np.testing.assert_allclose(df.to_numpy(), expected.to_numpy(), atol=0.0101)
+    # Only the last dates
+    np.testing.assert_allclose(growth_factor(covid_df, window=7, days=5).to_numpy(), df.iloc[-5:].to_numpy())
+
+
+def test_classify_groups_matches_baseline(covid_df):
+    growth_value_df = _baseline_growth(covid_df)
+    expected = _baseline_groups(growth_value_df)
+    df = classify_groups(growth_value_df, days=7)
+    for col in ["Group", "GF > 1 [straight days]", "GF < 1 [straight days]"]:
+        assert df[col].to_dict() == expected[col].to_dict()
+    assert df.columns[3:].tolist() == expected.columns[:7].tolist()
+
+
+def test_province_level(covid_df):
+    df = confirmed_values(covid_df, level="Province")
+    assert df.columns.tolist() == ["Japan/Osaka", "Japan/Tokyo"]
+    with pytest.raises(ValueError, match="@level"):
+        confirmed_values(covid_df, level="City")
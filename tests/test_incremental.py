@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+
+from covid_model import incremental
+from covid_model.incremental import refresh
+
+
+class _Model:
+    PARAMETERS = ["theta", "kappa", "rho", "sigma"]
+
+
+class _Scenario:
+    """
+    Records the calls of Scenario.clear(), Scenario.add() and Scenario.estimate(), with the phases of Scenario.trend().
+    """
+
+    def __init__(self, last_date, trend_phases=()):
+        self.records_df = pd.DataFrame({"Date": pd.date_range("01Mar2020", last_date)})
+        self.trend_phases = list(trend_phases)
+        self.phases = []
+        self.calls = []
+
+    def records(self, variables, show_figure):
+        return self.records_df
+
+    def trend(self, name, show_figure):
+        self.phases = list(self.trend_phases)
+
+    def summary(self, name):
+        ordinals = ["0th", "1st", "2nd", "3rd"]
+        return pd.DataFrame(
+            {"Type": "Past", "Start": [start for (start, _) in self.phases], "End": [end for (_, end) in self.phases]},
+            index=ordinals[:len(self.phases)])
+
+    def clear(self, name, include_past):
+        self.phases = []
+        self.calls.append(("clear", {"name": name, "include_past": include_past}))
+
+    def add(self, name, end_date, model, tau, **kwargs):
+        start = self.phases[-1][1] if self.phases else "01Mar2020"
+        self.phases.append((start, end_date))
+        self.calls.append(("add", {"end_date": end_date, "tau": tau, **kwargs}))
+
+    def estimate(self, model, phases, name, **kwargs):
+        self.calls.append(("estimate", {"phases": phases, **kwargs}))
+
+
+def _params(k):
+    return {"theta": 0.001 * k, "kappa": 0.002 * k, "rho": 0.1 * k, "sigma": 0.01 * k}
+
+
+@pytest.fixture
+def previous_df():
+    phases = [("01Mar2020", "20Mar2020"), ("21Mar2020", "10Apr2020"), ("11Apr2020", "30Apr2020")]
+    return pd.DataFrame(
+        [{"Type": "Past", "Start": start, "End": end, "tau": 720, **_params(k + 1)}
+         for (k, (start, end)) in enumerate(phases)] + [
+            {"Type": "Future", "Start": "01May2020", "End": "31Dec2020", "tau": 720, **_params(9)}],
+        index=["0th", "1st", "2nd", "3rd"])
+
+
+@pytest.fixture
+def refits(monkeypatch):
+    calls = []
+
+    def _refit_phase(model, data_df, tau, seed_dict, max_nfev=200):
+        calls.append({"dates": (data_df["Date"].min(), data_df["Date"].max()), "tau": tau, "seed": seed_dict})
+        return _params(7)
+
+    monkeypatch.setattr(incremental, "refit_phase", _refit_phase)
+    return calls
+
+
+def test_only_the_last_phase_is_refit(previous_df, refits):
+    scenario = refresh(_Scenario("10May2020"), _Model, previous_df)
+    # The last past phase is extended to the last record and fitted from its last values
+    assert refits == [
+        {"dates": (pd.Timestamp("11Apr2020"), pd.Timestamp("10May2020")), "tau": 720, "seed": _params(3)}]
+    assert scenario.calls == [
+        ("clear", {"name": "Main", "include_past": True}),
+        ("add", {"end_date": "20Mar2020", "tau": 720, **_params(1)}),
+        ("add", {"end_date": "10Apr2020", "tau": 720, **_params(2)}),
+        ("add", {"end_date": "10May2020", "tau": 720, **_params(7)}),
+    ]
+
+
+def test_changed_phases_are_estimated_after_retrend(previous_df, refits):
+    trend_phases = [("01Mar2020", "20Mar2020"), ("21Mar2020", "05Apr2020"), ("06Apr2020", "10May2020")]
+    scenario = refresh(_Scenario("10May2020", trend_phases), _Model, previous_df, retrend=True, timeout=10)
+    assert refits[0]["dates"] == (pd.Timestamp("06Apr2020"), pd.Timestamp("10May2020"))
+    adds = [kwargs for (call, kwargs) in scenario.calls if call == "add"]
+    # The unchanged phase keeps its values, the changed phase starts from the last values of the last run
+    assert adds == [
+        {"end_date": "20Mar2020", "tau": 720, **_params(1)},
+        {"end_date": "05Apr2020", "tau": 720, **_params(3)},
+        {"end_date": "10May2020", "tau": 720, **_params(7)},
+    ]
+    assert scenario.calls[-1] == ("estimate", {"phases": ["1st"], "timeout": 10})
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from covid_model.metapop import coupling_matrix, solve_meta_paths
+from covid_model.schedules import R0_mitigating
+from covid_model.seir import solve_path
+from covid_model.synthetic import synthetic_mobility
+
+T_VEC = np.linspace(0, 550, 1101)
+
+
+def test_identity_coupling_matches_single_population():
+    R0_values = np.array([0.8, 1.6, 3.0])
+    population = np.array([1e4, 1e6, 1e5])
+    result = solve_meta_paths(R0_values, T_VEC, sparse.identity(3), population)
+    for (k, R0) in enumerate(R0_values):
+        i_path, c_path = solve_path(R0, T_VEC, method="rk4")
+        np.testing.assert_allclose(result["i_paths"][k], i_path, atol=1e-10)
+        np.testing.assert_allclose(result["c_paths"][k], c_path, atol=1e-10)
+    weights = population / population.sum()
+    np.testing.assert_allclose(result["i_path"], weights @ result["i_paths"])
+
+
+def test_identity_coupling_with_schedule():
+    R0 = lambda t: R0_mitigating(t, r0=3, η=0.05, r_bar=1.2)
+    result = solve_meta_paths(R0, T_VEC, sparse.identity(2), [1e5, 1e6])
+    i_path, _ = solve_path(R0, T_VEC, method="rk4")
+    np.testing.assert_allclose(result["i_paths"], np.stack([i_path, i_path]), atol=1e-10)
+
+
+def test_coupling_matrix():
+    population, trips = synthetic_mobility(n_regions=50, seed=1)
+    coupling = coupling_matrix(trips, population)
+    np.testing.assert_allclose(np.asarray(coupling.sum(axis=1)).ravel(), 1)
+    # Without trips, the regions are independent
+    no_trips = coupling_matrix(sparse.csr_matrix((50, 50)), population)
+    np.testing.assert_allclose(no_trips.toarray(), np.eye(50))
+    with pytest.raises(ValueError):
+        coupling_matrix(trips * 100, population)
+
+
+def test_blocks_in_processes_match_single_process():
+    population, trips = synthetic_mobility(n_regions=200, seed=2)
+    coupling = coupling_matrix(trips, population)
+    x_init = np.tile(np.array([[1.0], [0.0], [0.0]]), 200)
+    x_init[:, 0] = (1 - 1e-3, 5e-4, 5e-4)
+    t_vec = T_VEC[:201]
+    serial = solve_meta_paths(2.0, t_vec, coupling, population, x_init=x_init)
+    blocks = solve_meta_paths(2.0, t_vec, coupling, population, x_init=x_init, processes=3)
+    for name in ("i_paths", "c_paths"):
+        np.testing.assert_allclose(blocks[name], serial[name], rtol=0, atol=1e-15)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.policies import PolicySet, evaluate_policies, parse_rule
+from covid_model.pyramid import PyramidTable
+from covid_model.synthetic import SyntheticPyramid
+
+
+@pytest.mark.parametrize("rule, expected", [
+    (0, (0.0, 0.0, "all")),
+    ("=1", (0.0, 1.0, "all")),
+    ("*0.5", (0.5, 0.0, "all")),
+    ("+1 if commuting", (1.0, 1.0, "commuting")),
+    ("-1", (1.0, -1.0, "all")),
+    ("=-0.3 if going", (0.0, -0.3, "going")),
+    ("=+0.3", (0.0, 0.3, "all")),
+    ("*-2", (-2.0, 0.0, "all")),
+])
+def test_parse_rule(rule, expected):
+    assert parse_rule(rule) == expected
+
+
+@pytest.mark.parametrize("rule", ["=1 if sometimes", "x1", "=", "=1.0.0"])
+def test_parse_rule_invalid(rule):
+    with pytest.raises(ValueError):
+        parse_rule(rule)
+
+
+@pytest.fixture
+def table():
+    return PyramidTable.from_pyramid(SyntheticPyramid(["Italy", "Japan"], seed=2), ["Italy", "Japan"])
+
+
+def _gs(df):
+    return (df[["School", "Office", "Others"]].sum(axis=1) * df["Portion"]).sum()
+
+
+def test_lockdown_matches_baseline(table):
+    # The lockdown example of the notebook, before PolicySet
+    rho_before, sigma_before, h_bar, s_bar = 0.2, 0.075, 0.5, 0.5
+    policies = {"Lockdown": {"School": 0, "Office": "*0.5", "Others": "+1 if commuting", "h_bar": "*0.1"}}
+    policy_df = evaluate_policies(
+        policies, table, ["Italy", "Japan"], rho_before, sigma_before, h_bar=h_bar, s_bar=s_bar)
+    for country in ["Italy", "Japan"]:
+        out_df = table.go_out(country)
+        df = out_df.copy()
+        df.loc[df["School"] + df["Office"] > 0, "Others"] += 1
+        df["School"] = 0
+        df["Office"] *= 0.5
+        gs_before, gs_after = _gs(out_df), _gs(df)
+        sigma_after = sigma_before * (1 - h_bar * 0.1 * s_bar) / (1 - h_bar * s_bar)
+        row = policy_df.loc[(country, "Lockdown")]
+        assert row["gs_before"] == pytest.approx(gs_before)
+        assert row["gs_after"] == pytest.approx(gs_after)
+        assert row["rho"] == pytest.approx(rho_before * gs_after / gs_before)
+        assert row["sigma"] == pytest.approx(sigma_after)
+        after_df = PolicySet(policies).frames(out_df)["Lockdown"]
+        pd.testing.assert_frame_equal(after_df, df, check_dtype=False)
+
+
+def test_italy_lockdown_matches_baseline(table):
+    # The lockdown of Italy in the notebook, before PolicySet
+    out_df = table.go_out("Italy")
+    # Days are int64, a float value is assigned after casting (pandas 3 rejects the upcast with .loc)
+    df = out_df.astype({"Others": np.float64})
+    df["School"] = 0
+    df.loc[df["Office"] > 0, "Office"] = 1
+    df.loc[df["Others"] > 0, "Others"] = 2.3
+    policies = PolicySet({"Lockdown": {"School": 0, "Office": "=1 if going", "Others": "=2.3 if going"}})
+    pd.testing.assert_frame_equal(policies.frames(out_df)["Lockdown"], df, check_dtype=False)
+    policy_df = evaluate_policies(policies, table, ["Italy"], 0.2, 0.075, out_df=out_df)
+    assert policy_df.loc[("Italy", "Lockdown"), "gs_after"] == pytest.approx(_gs(df))
+    assert policy_df.loc[("Italy", "Lockdown"), "sigma"] == pytest.approx(0.075)
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from covid_model import profiling
+from covid_model.seir import solve_path
+
+
+@profiling.traced("stage")
+def _stage(n):
+    profiling.count("F", n)
+    profiling.annotate(trials=n)
+    return n
+
+
+def test_spans_are_nested():
+    with profiling.tracing(memory=True) as tracer:
+        with tracer.span("run_country", country="Italy") as outer:
+            with tracer.span("estimate", phase="1st") as inner:
+                tracer.count("F", 3)
+                tracer.count("F")
+                tracer.annotate(trials=10)
+                values = list(range(100_000))
+                del values
+            tracer.count("F")
+    assert inner["country"] == "Italy" and inner["args"] == {"phase": "1st", "trials": 10}
+    assert inner["counters"] == {"F": 4} and outer["counters"] == {"F": 1}
+    assert outer["start"] <= inner["start"] and inner["duration"] <= outer["duration"]
+    # The peak of the inner span is included in the peak of the outer span
+    assert inner["peak_memory"] > 100_000 * 8
+    assert outer["peak_memory"] >= inner["peak_memory"]
+    assert [span["name"] for span in tracer.records()] == ["run_country", "estimate"]
+    assert all(not key.startswith("_") for span in tracer.records() for key in span)
+
+
+def test_spans_by_country():
+    tracer = profiling.Tracer()
+    for country in ("Italy", "Japan"):
+        with tracer.span("run_country", country=country):
+            with tracer.span("trend"):
+                pass
+    with tracer.span("merge"):
+        pass
+    country_dict = tracer.by_country()
+    assert {country: [span["name"] for span in spans] for (country, spans) in country_dict.items()} == {
+        "Italy": ["run_country", "trend"], "Japan": ["run_country", "trend"], None: ["merge"]}
+    assert list(json.loads(tracer.to_json())) == ["Italy", "Japan", "None"]
+    # Each thread has its stack of spans, so the country is not inherited from another thread
+
+    def _trend():
+        with tracer.span("trend"):
+            pass
+
+    with tracer.span("run_country", country="Spain"):
+        thread = threading.Thread(target=_trend)
+        thread.start()
+        thread.join()
+    assert [span["name"] for span in tracer.by_country()["Spain"]] == ["run_country"]
+    assert [span["name"] for span in tracer.by_country()[None]] == ["merge", "trend"]
+    # Spans of another tracer, like the tracer of a worker process, are merged
+    other = profiling.Tracer()
+    with other.span("estimate", country="Spain"):
+        pass
+    tracer.extend(other.records())
+    assert [span["name"] for span in tracer.by_country()["Spain"]] == ["run_country", "estimate"]
+
+
+def test_chrome_trace(tmp_path):
+    with profiling.tracing() as tracer:
+        with profiling.span("run_country", country="Italy"):
+            assert _stage(5) == 5
+    trace = tracer.to_chrome_trace()
+    assert trace["displayTimeUnit"] == "ms"
+    outer, inner = trace["traceEvents"]
+    for event in (outer, inner):
+        assert set(event) == {"name", "cat", "ph", "ts", "dur", "pid", "tid", "args"}
+        assert event["ph"] == "X" and event["cat"] == "Italy" and event["pid"] == os.getpid()
+    assert inner["name"] == "stage"
+    assert inner["args"] == {"country": "Italy", "F": 5, "trials": 5}
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] + 1
+    filename = tmp_path.joinpath("trace.json")
+    tracer.to_chrome_trace(filename)
+    with filename.open() as fh:
+        assert json.load(fh) == json.loads(json.dumps(trace))
+
+
+def test_hooks_are_no_ops_outside_of_tracing():
+    assert not profiling.enabled() and profiling.current() is None
+    assert profiling.span("run_country", country="Italy") is profiling.span("trend")
+    with profiling.span("run_country") as span:
+        assert span is None
+    assert _stage(3) == 3
+    func = lambda x: x
+    assert profiling.counted(func, "F") is func
+    with profiling.tracing() as tracer:
+        assert profiling.current() is tracer
+        solve_path(1.6, np.linspace(0, 10, 11), method="rk4")
+    assert not profiling.enabled()
+    assert tracer.records()[0]["name"] == "solve_path"
+    assert tracer.records()[0]["counters"] == {"F": 40}
+    # The spans after tracing are not recorded
+    _stage(3)
+    assert len(tracer.records()) == 1
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model import mobility
+from covid_model.pyramid import PyramidTable
+from covid_model.synthetic import SyntheticPyramid
+
+COUNTRIES = ["Italy", "Japan", "Chile"]
+
+
+@pytest.fixture
+def pyramid_data():
+    return SyntheticPyramid(COUNTRIES, seed=1)
+
+
+@pytest.fixture
+def table(pyramid_data):
+    return PyramidTable.from_pyramid(pyramid_data, COUNTRIES)
+
+
+@pytest.mark.parametrize("country", COUNTRIES)
+def test_go_out_matches_mobility(pyramid_data, table, country):
+    expected = mobility.go_out(country, pyramid_data)
+    df = table.go_out(country)
+    pd.testing.assert_frame_equal(df.loc[:, expected.columns], expected, check_dtype=False)
+    pd.testing.assert_frame_equal(mobility.go_out(country, table), df)
+
+
+def test_gs_matches_notebook(table):
+    gs = table.gs()
+    for (k, country) in enumerate(COUNTRIES):
+        out_df = table.go_out(country)
+        expected = (out_df[["School", "Office", "Others"]].sum(axis=1) * out_df["Portion"]).sum()
+        assert gs[k] == pytest.approx(expected)
+    days = np.stack([mobility.out_days()[["School", "Office", "Others"]].to_numpy()] * 2) * [[[1]], [[0.5]]]
+    np.testing.assert_allclose(table.gs("Japan", days), gs[1] * np.array([1, 0.5]))
+
+
+def test_save_and_load(table, tmp_path):
+    table.save(tmp_path / "pyramid.npz")
+    loaded = PyramidTable.load(tmp_path / "pyramid.npz")
+    assert loaded.countries == COUNTRIES
+    np.testing.assert_array_equal(loaded.populations, table.populations)
+    with pytest.raises(KeyError, match="Peru"):
+        loaded.go_out("Peru")
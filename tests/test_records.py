@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.records import VALUE_COLS, RecordIndex
+from covid_model.synthetic import synthetic_records
+
+
+@pytest.fixture
+def records_df():
+    df = synthetic_records(n_countries=5, n_days=40, n_provinces=2, seed=4)
+    # Unsorted records with string area names, as the records of covsirphy
+    df[["ISO3", "Country", "Province"]] = df[["ISO3", "Country", "Province"]].astype(str)
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def test_subset(records_df):
+    index = RecordIndex(records_df)
+    assert index.countries() == sorted(records_df["Country"].unique())
+    for (country, province) in [("C002", None), ("C002", "P01"), ("X003", None)]:
+        iso3 = records_df["ISO3"] == country
+        selected = (iso3 | (records_df["Country"] == country)) & (records_df["Province"] == (province or "-"))
+        expected = records_df.loc[selected].sort_values("Date").drop(["ISO3", "Country", "Province"], axis=1)
+        pd.testing.assert_frame_equal(index.subset(country, province), expected.reset_index(drop=True))
+    df = index.subset("C001", start_date="05Feb2020", end_date="10Feb2020")
+    expected = records_df.loc[
+        (records_df["Country"] == "C001") & (records_df["Province"] == "-")
+        & records_df["Date"].between("05Feb2020", "10Feb2020")].sort_values("Date")
+    pd.testing.assert_frame_equal(df, expected.drop(["ISO3", "Country", "Province"], axis=1).reset_index(drop=True))
+    assert df["Date"].tolist() == pd.date_range("05Feb2020", "10Feb2020").tolist()
+    with pytest.raises(ValueError, match="No records"):
+        index.subset("Unknown")
+
+
+def test_total(records_df):
+    total_df = RecordIndex(records_df).total()
+    expected = records_df.loc[records_df["Province"] == "-"].groupby("Date")[VALUE_COLS].sum()
+    pd.testing.assert_frame_equal(total_df[VALUE_COLS], expected)
+    np.testing.assert_allclose(total_df["Fatal per Confirmed"], expected["Fatal"] / expected["Confirmed"])
+    np.testing.assert_allclose(
+        total_df["Fatal per (Fatal or Recovered)"], expected["Fatal"] / (expected["Fatal"] + expected["Recovered"]))
+
+
+def test_group_total(records_df):
+    index = RecordIndex(records_df)
+    groups = pd.Series({"C000": "Fast", "C001": "Slow", "C003": "Fast", "Other": "Slow"})
+    merged_df = records_df.merge(groups.rename("Group"), left_on="Country", right_index=True)
+    for group in ("Fast", "Slow"):
+        expected = merged_df.loc[merged_df["Group"] == group].groupby("Date")[VALUE_COLS].sum()
+        pd.testing.assert_frame_equal(index.group_total(groups, group), expected)
+    empty_df = index.group_total(groups, "None")
+    assert empty_df.empty and empty_df.columns.tolist() == VALUE_COLS
+
+
+def test_update_clears_memoized_views(records_df):
+    index = RecordIndex(records_df)
+    groups = pd.Series({"C000": "Fast"})
+    before_total, before_group = index.total(), index.group_total(groups, "Fast")
+    # The memoized views are returned while the records are the same
+    assert index.total()["Confirmed"].sum() == before_total["Confirmed"].sum()
+    new_df = records_df.assign(Confirmed=records_df["Confirmed"] * 2)
+    index.update(new_df)
+    pd.testing.assert_series_equal(index.total()["Confirmed"], before_total["Confirmed"] * 2)
+    pd.testing.assert_series_equal(index.group_total(groups, "Fast")["Confirmed"], before_group["Confirmed"] * 2)
+    # Records of a new country are found after the update
+    index.update(pd.concat([new_df, new_df.loc[new_df["Country"] == "C000"].assign(Country="New", ISO3="NEW")]))
+    assert "New" in index.countries()
+    assert len(index.subset("NEW")) == 40
@@ -0,0 +1,22 @@
+import os
+
+from covid_model.runner import _map_countries, _shared
+
+
+def _task(country):
+    if country == "Crash":
+        # A worker killed like an out-of-memory kill, the pool is broken
+        os._exit(1)
+    if country == "Raise":
+        raise ValueError(country)
+    return country, _shared["jhu_data"]
+
+
+def test_map_countries_rebuilds_broken_pool():
+    countries = ["A", "B", "Crash", "C", "Raise", "D", "E", "F"]
+    results = _map_countries(_task, {country: (country,) for country in countries}, "jhu", "population", processes=2)
+    assert set(results) == set(countries)
+    for country in ("A", "B", "C", "D", "E", "F"):
+        assert results[country] == (country, "jhu")
+    assert isinstance(results["Raise"], ValueError)
+    assert type(results["Crash"]).__name__ == "BrokenProcessPool"
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from covid_model.schedules import Constant, Mitigating, R0_mitigating, Step, Tabulated
+from covid_model.seir import integrate
+
+T_VEC = np.linspace(0, 200, 401)
+# Errors against RK4 with a 0.005 step which has the breakpoints in its grid
+ATOL = {"odeint": 2e-6, "rk4": 1e-11, "rk45": 1e-9}
+
+
+def test_step():
+    step = Step(breakpoints=(30, 120), values=(0.5, 2, 1.2))
+    np.testing.assert_array_equal(step(np.array([0, 29.9, 30, 119, 120, 500])), [0.5, 0.5, 2, 2, 1.2, 1.2])
+    assert step(30) == 2
+    assert step.segments(0, 200) == [(0, 30.0, 0.5), (30.0, 120.0, 2.0), (120.0, 200, 1.2)]
+    # Breakpoints outside of the range are ignored
+    assert step.segments(40, 100) == [(40, 100, 2.0)]
+    with pytest.raises(ValueError, match="@values"):
+        Step(breakpoints=(30,), values=(0.5,))
+
+
+def test_tabulated_and_mitigating():
+    mitigating = Mitigating(r0=3, η=0.05, r_bar=1.2)
+    np.testing.assert_array_equal(mitigating(T_VEC), R0_mitigating(T_VEC, r0=3, η=0.05, r_bar=1.2))
+    assert mitigating.segments(0, 200) == [(0, 200, mitigating)]
+    tabulated = mitigating.tabulate(T_VEC)
+    assert isinstance(tabulated, Tabulated)
+    np.testing.assert_allclose(tabulated(T_VEC), mitigating(T_VEC))
+    # Linear interpolation between the points of the grid, and the end values outside
+    np.testing.assert_allclose(tabulated(0.25), (mitigating(0) + mitigating(0.5)) / 2)
+    assert tabulated(-1) == mitigating(0) and tabulated(300) == mitigating(200)
+    assert Tabulated([0, 10], [1, 3])(np.array([5])).tolist() == [2]
+    constant = Constant(1.6)
+    assert constant(3) == 1.6 and constant(T_VEC).shape == T_VEC.shape
+    assert constant.segments(0, 200) == [(0, 200, 1.6)]
+
+
+@pytest.mark.parametrize("method", ["odeint", "rk4", "rk45"])
+@pytest.mark.parametrize("breakpoints", [(30, 120), (30.2, 120.35)], ids=["on-grid", "between-grid"])
+def test_integration_restarts_at_breakpoints(method, breakpoints):
+    step = Step(breakpoints=breakpoints, values=(3, 0.5, 2))
+    paths = integrate(step, T_VEC, method=method)
+    fine = np.unique(np.concatenate((np.linspace(0, 200, 40001), breakpoints)))
+    expected = integrate(step, fine, method="rk4")[:, np.isin(fine, T_VEC)]
+    np.testing.assert_allclose(paths, expected, rtol=0, atol=ATOL[method])
+    # Before the first breakpoint, R0 is constant
+    before = T_VEC <= breakpoints[0]
+    np.testing.assert_allclose(paths[:, before], integrate(3, T_VEC[before], method=method), rtol=0, atol=1e-12)
+    if method == "rk4":
+        # Without the split, the steps across the breakpoints use R0 of both sides
+        unsplit = integrate(lambda t: step(t), T_VEC, method=method)
+        assert np.abs(unsplit - expected).max() > 1e3 * ATOL[method]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from covid_model.schedules import R0_mitigating, Step
+from covid_model.seir import METHODS, solve_adaptive, solve_path, solve_paths
+
+T_VEC = np.linspace(0, 550, 1101)
+# Scenarios of a batch share the step sizes of the adaptive solvers, so they differ within the tolerances.
+# With its default tolerances, odeint is up to 1.2e-3 off i(t) of RK4 with a 0.05 step for R0=4.
+ATOL = {"odeint": 2e-3, "rk4": 1e-12, "rk45": 1e-6}
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_r0_sweep_matches_solve_path(method):
+    R0_vals = np.linspace(0.8, 4.0, 5)
+    i_paths, c_paths = solve_paths(R0_vals, T_VEC, method=method)
+    assert i_paths.shape == c_paths.shape == (5, len(T_VEC))
+    for (k, R0) in enumerate(R0_vals):
+        i_path, c_path = solve_path(R0, T_VEC, method=method)
+        np.testing.assert_allclose(i_paths[k], i_path, rtol=0, atol=ATOL[method])
+        np.testing.assert_allclose(c_paths[k], c_path, rtol=0, atol=ATOL[method])
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_η_sweep_matches_solve_path(method):
+    η_vals = np.array([1 / 5, 1 / 10, 1 / 20, 1 / 50, 1 / 100])
+    i_paths, c_paths = solve_paths(3, T_VEC, η=η_vals, r_bar=1.6, method=method)
+    for (k, η) in enumerate(η_vals):
+        i_path, c_path = solve_path(lambda t: R0_mitigating(t, r0=3, η=η, r_bar=1.6), T_VEC, method=method)
+        np.testing.assert_allclose(i_paths[k], i_path, rtol=0, atol=ATOL[method])
+        np.testing.assert_allclose(c_paths[k], c_path, rtol=0, atol=ATOL[method])
+
+
+def test_initial_states_are_broadcast():
+    x_init = np.array([[1 - 5e-7, 4e-7, 1e-7], [1 - 5e-5, 4e-5, 1e-5]])
+    i_paths, _ = solve_paths(2.0, T_VEC, x_init=x_init, method="rk4")
+    for k in range(2):
+        np.testing.assert_allclose(i_paths[k], solve_path(2.0, T_VEC, x_init=x_init[k], method="rk4")[0], atol=1e-12)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError, match="@method"):
+        solve_paths([1.6, 3.0], T_VEC, method="euler")
+    with pytest.raises(ValueError, match="@method"):
+        solve_path(1.6, T_VEC, method="euler")
+
+
+@pytest.mark.parametrize("breakpoints", [(30, 120), (30.2, 120.35)], ids=["on-grid", "between-grid"])
+def test_adaptive_path_matches_solve_path(breakpoints):
+    step = Step(breakpoints=breakpoints, values=(0.5, 3, 1.2))
+    path = solve_adaptive(step, rtol=1e-6, atol=1e-12, dense=True)
+    i_path, c_path = solve_path(step, T_VEC, method="rk4")
+    np.testing.assert_allclose(path.sample(T_VEC), (i_path, c_path), rtol=0, atol=1e-6)
+    # Segments are split at the breakpoints, which are points of the solution shared by both segments
+    assert np.all(np.isin(breakpoints, path.t))
+    assert np.all(np.diff(path.t) > 0)
+    assert (path.t[0], path.t[-1]) == (0, 550)
+    np.testing.assert_allclose(path.i_path, path.x[2])
+    np.testing.assert_allclose(path.c_path, 1 - path.x[0] - path.x[1])
+    # A looser tolerance returns fewer points
+    assert len(solve_adaptive(step, rtol=1e-3, atol=1e-12).t) < len(path.t)
+
+
+def test_adaptive_dense_output():
+    step = Step(breakpoints=(30.2,), values=(0.5, 2))
+    dense = solve_adaptive(step, t_span=(0, 300), dense=True)
+    points = solve_adaptive(step, t_span=(0, 300))
+    np.testing.assert_array_equal(dense.t, points.t)
+    np.testing.assert_array_equal(dense.x, points.x)
+    # The dense output of each segment passes through the points of the solver
+    np.testing.assert_allclose(dense(dense.t), dense.x, rtol=0, atol=1e-14)
+    np.testing.assert_allclose(dense(30.2), dense.x[:, np.flatnonzero(dense.t == 30.2)[0]], rtol=0, atol=1e-14)
+    with pytest.raises(ValueError, match="dense=True"):
+        points(10.0)
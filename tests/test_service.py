@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+import pytest
+
+from covid_model import service as service_module
+from covid_model.service import RefreshService, ServiceOverloaded
+
+
+def _task(country, previous_df, kwargs, trace=None):
+    """
+    Task of the worker processes instead of runner._run_task(), which kills its worker when the file exists.
+    """
+    if os.path.exists(kwargs["crash_file"]):
+        os._exit(1)
+    return country, os.getpid(), 0.1, None, []
+
+
+def test_requests_with_free_slots_are_not_pending():
+
+    async def check():
+        service = RefreshService(None, None, processes=2, max_pending=1)
+        tasks = [service.refresh(country) for country in ("A", "B")]
+        # Both refreshes take a free slot, so none of them is waiting
+        assert service.status()["pending"] == 0
+        tasks.append(service.refresh("C"))
+        assert service.status()["pending"] == 1
+        # The refresh in flight is joined
+        assert service.refresh("C") is tasks[-1]
+        with pytest.raises(ServiceOverloaded):
+            service.refresh("D")
+        assert service.refresh("D", wait=False) is None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        service._executor.shutdown(wait=True)
+
+    asyncio.run(check())
+
+
+def test_pool_is_rebuilt_after_a_worker_dies(tmp_path, monkeypatch):
+    monkeypatch.setattr(service_module, "_run_task", _task)
+    crash_file = tmp_path.joinpath("crash")
+
+    async def check():
+        async with RefreshService(None, None, processes=1, max_age=0, crash_file=str(crash_file)) as service:
+            first = await service.get("Italy")
+            assert first["error"] is None
+            crash_file.touch()
+            # The last result is kept, with the error of the failed refresh
+            await service.refresh("Italy")
+            failed = await service.get("Italy", max_age=float("inf"))
+            assert failed["error"].startswith("BrokenProcessPool")
+            assert failed["simulation"] == first["simulation"]
+            with pytest.raises(RuntimeError, match="Japan"):
+                await service.get("Japan")
+            crash_file.unlink()
+            # The next refreshes run in a new pool
+            await service.refresh("Italy")
+            refreshed = await service.get("Italy", max_age=float("inf"))
+            assert refreshed["error"] is None
+            assert refreshed["simulation"] != first["simulation"]
+            assert (await service.get("Japan"))["error"] is None
+
+    asyncio.run(check())
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from covid_model.store import ResultStore
+
+pytest.importorskip("pyarrow")
+
+
+def _simulation_df(n_days=10, start_date="01Mar2020", offset=0):
+    return pd.DataFrame({
+        "Date": pd.date_range(start_date, periods=n_days),
+        "Confirmed": np.arange(n_days) * 10.0 + offset,
+        "Infected": np.arange(n_days) * 2.0 + offset,
+    })
+
+
+def _summary_df():
+    return pd.DataFrame({
+        "Type": ["Past", "Past", "Future"],
+        "Start": ["01Mar2020", "11Mar2020", "21Mar2020"],
+        "End": ["10Mar2020", "20Mar2020", "31Mar2020"],
+        "rho": [0.2, 0.1, 0.05],
+    }, index=["0th", "1st", "2nd"])
+
+
+def test_round_trip_of_each_kind(tmp_path):
+    store = ResultStore(tmp_path)
+    sim_df = _simulation_df()
+    run = store.append_simulation(sim_df, "Italy", scenario="Lockdown")
+    df = store.read("simulation")
+    assert df["Run"].unique().tolist() == [run]
+    assert df["Country"].astype(str).unique().tolist() == ["Italy"]
+    assert df["Scenario"].astype(str).unique().tolist() == ["Lockdown"]
+    pd.testing.assert_frame_equal(
+        df[["Confirmed", "Infected"]], sim_df[["Confirmed", "Infected"]].astype(np.float32))
+    assert (df["Date"].to_numpy() == sim_df["Date"].to_numpy()).all()
+    # Phases keep the parameter values at full precision
+    store.append_summary(_summary_df(), "Italy", run=run)
+    phase_df = store.read("phase")
+    assert phase_df["Phase"].astype(str).tolist() == ["0th", "1st", "2nd"]
+    assert phase_df["rho"].tolist() == [0.2, 0.1, 0.05]
+    assert phase_df["End"].iloc[-1] == pd.Timestamp("31Mar2020")
+    # Paths on a time grid
+    t_vec = np.linspace(0, 9, 10)
+    i_paths = np.arange(20, dtype=np.float64).reshape(2, 10) / 100
+    store.append_paths({"i_path": i_paths}, t_vec, ["R0=1.6", "R0=3"], run=run)
+    path_df = store.read("path", scenario="R0=3")
+    np.testing.assert_array_equal(path_df["Time"], t_vec.astype(np.float32))
+    np.testing.assert_array_equal(path_df["i_path"], i_paths[1].astype(np.float32))
+    # A new instance reads the manifest
+    assert len(ResultStore(tmp_path).chunks()) == 3
+    assert store.new_run() == run + 1
+
+
+def test_chunks_are_pruned(tmp_path):
+    store = ResultStore(tmp_path)
+    runs = [
+        store.append_simulation(_simulation_df(), "Italy"),
+        store.append_simulation(_simulation_df(start_date="01Apr2020"), "Japan"),
+        store.append_simulation(_simulation_df(start_date="01May2020"), "Italy"),
+    ]
+    assert [entry["run"] for entry in store.chunks(country="Italy")] == [runs[0], runs[2]]
+    assert [entry["run"] for entry in store.chunks(runs=runs[1])] == [runs[1]]
+    assert [entry["run"] for entry in store.chunks(start="05Apr2020")] == runs[1:]
+    assert [entry["run"] for entry in store.chunks(end="05Apr2020")] == runs[:2]
+    assert store.chunks(country="Italy", start="15Apr2020", end="20Apr2020") == []
+    assert store.chunks(kind="phase") == []
+    df = store.read("simulation", country=["Italy", "Japan"], start="05Mar2020", end="03Apr2020")
+    assert df["Date"].min() == pd.Timestamp("05Mar2020")
+    assert df["Date"].max() == pd.Timestamp("03Apr2020")
+    assert df.groupby("Country", observed=True).size().to_dict() == {"Italy": 6, "Japan": 3}
+
+
+def test_phases_overlapping_the_period_are_read(tmp_path):
+    store = ResultStore(tmp_path)
+    store.append_summary(_summary_df(), "Italy")
+    df = store.read("phase", start="05Mar2020")
+    assert df["Phase"].astype(str).tolist() == ["0th", "1st", "2nd"]
+    df = store.read("phase", start="15Mar2020", end="21Mar2020")
+    assert df["Phase"].astype(str).tolist() == ["1st", "2nd"]
+    # The chunk is selected with the end date of the last phase
+    assert len(store.chunks(start="25Mar2020")) == 1
+    assert store.read("phase", start="01Apr2020").empty
+
+
+def test_columns_are_selected(tmp_path):
+    store = ResultStore(tmp_path)
+    store.append_simulation(_simulation_df(), "Italy")
+    df = store.read("simulation", columns=["Infected"])
+    assert df.columns.tolist() == ["Run", "Country", "Scenario", "Date", "Infected"]
+    store.append_summary(_summary_df(), "Italy")
+    df = store.read("phase", columns=["rho"])
+    assert df.columns.tolist() == ["Run", "Country", "Scenario", "Start", "End", "rho"]
+
+
+def test_empty_result(tmp_path):
+    store = ResultStore(tmp_path)
+    assert store.read("path").columns.tolist() == ["Run", "Country", "Scenario", "Time"]
+    store.append_simulation(_simulation_df(), "Italy")
+    df = store.read("simulation", country="Japan", columns=["Infected"])
+    assert df.empty
+    assert df.columns.tolist() == ["Run", "Country", "Scenario", "Date", "Infected"]
+    # Rows are filtered out of a selected chunk
+    assert store.read("simulation", start="05Mar2020", end="04Mar2020").empty
+    with pytest.raises(ValueError, match="@kind"):
+        store.read("records")
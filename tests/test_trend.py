@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from covid_model.trend import apply_phases
+
+
+class _Scenario:
+    """
+    Records the calls of Scenario.clear() and Scenario.add().
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def clear(self, **kwargs):
+        self.calls.append(("clear", kwargs))
+
+    def add(self, **kwargs):
+        self.calls.append(("add", kwargs))
+
+
+def _rows(*phases, error=None):
+    return pd.DataFrame(
+        [("Italy", k, start, end, error) for (k, (start, end)) in enumerate(phases)],
+        columns=["Country", "Phase", "Start", "End", "Error"])
+
+
+def test_apply_phases_adds_end_dates():
+    scenario = apply_phases(_Scenario(), _rows(("01Mar2020", "31Mar2020"), ("01Apr2020", "30Apr2020")))
+    assert scenario.calls == [
+        ("clear", {"name": "Main", "include_past": True}),
+        ("add", {"name": "Main", "end_date": "31Mar2020"}),
+        ("add", {"name": "Main", "end_date": "30Apr2020"}),
+    ]
+
+
+@pytest.mark.parametrize("phases", [
+    _rows((None, None), error="KeyError: 'Italy'"),
+    _rows(("01Mar2020", None)),
+    [("01Mar2020", "31Mar2020"), ("01Apr2020", None)],
+    _rows(),
+    [],
+])
+def test_apply_phases_rejects_failed_or_incomplete_phases(phases):
+    scenario = _Scenario()
+    with pytest.raises(ValueError, match="@phases"):
+        apply_phases(scenario, phases)
+    assert scenario.calls == []